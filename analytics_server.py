@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Analytics Server
+Small local asyncio HTTP service that serves trading analytics to the dashboard.
+
+Endpoints (all GET, JSON):
+    /api/version    current data version
+    /api/summary    headline metrics and per-broker breakdown
+    /api/positions  position history
+    /api/coins      per-asset analytics
+    /api/day        day-of-week analytics
+    /api/hour       hour-of-day analytics
+    /api/weekend    weekend vs weekday analytics
+
+Every endpoint accepts ?broker=, ?asset=, ?start= and ?end= filters. Analytics
+are SQL aggregates over the SQLite trade store (TradeStore.summary_stats,
+coin_trade_stats, time_analytics), so a cache miss never loads the full ledger.
+Responses are cached in memory per data version and carry an ETag, so the
+React app gets 304s until new trades land. The unfiltered endpoints are
+precomputed whenever the data version changes (polled in the background), and
+the store caches bootstrap intervals per version and filters.
+
+Usage:
+    python analytics_server.py [--port 8765] [--db trading_data.db] [-q | -v]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import pandas as pd
+
+from data_converter import dumps_dashboard_json
+from run_log import event, get_logger, run_logging
+from trade_store import DEFAULT_DB_PATH, TradeStore
+
+log = get_logger('server')
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+FILTER_PARAMS = ('broker', 'asset', 'start', 'end')
+MAX_CACHE_ENTRIES = 512
+VERSION_POLL_SECONDS = 2.0
+
+STATUS_TEXT = {
+    200: 'OK',
+    204: 'No Content',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+
+def frame_to_records(df: pd.DataFrame, index: bool = False, index_label: Optional[str] = None):
+    """DataFrame -> list of JSON-ready dicts"""
+    if df is None or df.empty:
+        return []
+    if index:
+        df = df.rename_axis(df.index.name or index_label).reset_index()
+    df = df.astype(object).where(pd.notnull(df), None)
+    return df.to_dict('records')
+
+
+class AnalyticsService:
+    """Computes and caches analytics responses for the HTTP layer"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        # Requests are computed on executor threads, serialized by the server's lock
+        self.store = TradeStore(db_path, check_same_thread=False)
+        self.data_version = self.store.data_version()
+        self._cache: Dict[Tuple, Tuple[str, bytes]] = {}
+        self.endpoints = {
+            '/api/version': self.version,
+            '/api/summary': self.summary,
+            '/api/positions': self.positions,
+            '/api/coins': self.coins,
+            '/api/day': self.day_analysis,
+            '/api/hour': self.hour_analysis,
+            '/api/weekend': self.weekend_analysis,
+        }
+        self.precompute()
+
+    def close(self):
+        self.store.close()
+
+    def refresh(self):
+        """Drop cached responses and precompute again when the store has moved to a new data version"""
+        current_version = self.store.data_version()
+        if current_version != self.data_version:
+            self.data_version = current_version
+            self._cache.clear()
+            self.precompute()
+
+    def precompute(self):
+        """Fill the cache with every unfiltered endpoint for the current data version"""
+        started = time.perf_counter()
+        for path in self.endpoints:
+            self._cached(path, {})
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        log.debug(f"Precomputed {len(self.endpoints)} endpoints for data version {self.data_version} in {elapsed_ms:.0f} ms",
+                  extra=event('precomputed', data_version=self.data_version, endpoints=len(self.endpoints),
+                              elapsed_ms=round(elapsed_ms, 1)))
+
+    def get(self, path: str, filters: Dict[str, str]) -> Tuple[str, bytes]:
+        """Return (etag, body) for an endpoint, computing it on a cache miss"""
+        self.refresh()
+        return self._cached(path, filters)
+
+    def _cached(self, path: str, filters: Dict[str, str]) -> Tuple[str, bytes]:
+        key = (self.data_version, path, tuple(sorted(filters.items())))
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        payload = self.endpoints[path](**filters)
+        body = dumps_dashboard_json(payload).encode('utf-8')
+        etag = f'"v{self.data_version}-{hashlib.sha1(body).hexdigest()[:16]}"'
+
+        if len(self._cache) >= MAX_CACHE_ENTRIES:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[key] = (etag, body)
+        return etag, body
+
+    def version(self, **filters):
+        return {'data_version': self.data_version}
+
+    def summary(self, **filters):
+        summary = self.store.summary_stats(**filters)
+        if not summary:
+            return {}
+        by_broker = summary.pop('By Broker', None)
+        summary['By Broker'] = frame_to_records(by_broker, index=True)
+        return summary
+
+    def positions(self, **filters):
+        return frame_to_records(self.store.load_positions(**filters))
+
+    def coins(self, asset: Optional[str] = None, **filters):
+        coin_stats = self.store.coin_trade_stats(**filters)
+        broker_stats = self.store.coin_broker_stats(**filters)
+        if asset is not None:
+            coin_stats = coin_stats[coin_stats.index == asset]
+        records = frame_to_records(coin_stats, index=True)
+        for record in records:
+            record['Broker Breakdown'] = frame_to_records(broker_stats.loc[record['Asset']], index=True)
+        return records
+
+    def _time_table(self, table: str, **filters):
+        time_analytics = self.store.time_analytics(**filters)
+        return frame_to_records(time_analytics.get(table), index=True, index_label='Period')
+
+    def day_analysis(self, **filters):
+        return self._time_table('By Day of Week', **filters)
+
+    def hour_analysis(self, **filters):
+        return self._time_table('By Hour of Day', **filters)
+
+    def weekend_analysis(self, **filters):
+        return self._time_table('Weekend vs Weekday', **filters)
+
+
+class AnalyticsServer:
+    """Minimal HTTP/1.1 front end (keep-alive, ETag/If-None-Match, CORS)"""
+
+    def __init__(self, service: AnalyticsService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        self.service = service
+        self.host = host
+        self.port = port
+        self._lock = asyncio.Lock()
+
+    async def serve_forever(self):
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        log.info(f"🌐 Analytics server listening on http://{self.host}:{self.port} (data version {self.service.data_version})",
+                 extra=event('listening', host=self.host, port=self.port, data_version=self.service.data_version))
+        version_poll = asyncio.create_task(self.poll_data_version())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            version_poll.cancel()
+
+    async def poll_data_version(self):
+        """Precompute a new data version's unfiltered endpoints before the dashboard asks for them"""
+        while True:
+            await asyncio.sleep(VERSION_POLL_SECONDS)
+            try:
+                async with self._lock:
+                    await asyncio.get_running_loop().run_in_executor(None, self.service.refresh)
+            except Exception as e:
+                log.error(f"❌ Error refreshing analytics: {e}")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._send(writer, 400, b'{"error": "malformed request line"}')
+                    break
+
+                headers = await self._read_headers(reader)
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                await self.handle_request(writer, method, target, headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, writer, method: str, target: str, headers: Dict[str, str], keep_alive: bool):
+        started = time.perf_counter()
+        url = urlsplit(target)
+
+        if method == 'OPTIONS':
+            await self._send(writer, 204, b'', keep_alive=keep_alive)
+            return
+        if method not in ('GET', 'HEAD'):
+            await self._send(writer, 405, b'{"error": "method not allowed"}', keep_alive=keep_alive)
+            return
+        if url.path not in self.service.endpoints:
+            await self._send(writer, 404, b'{"error": "unknown endpoint"}', keep_alive=keep_alive)
+            return
+
+        filters = {key: value for key, value in parse_qsl(url.query) if key in FILTER_PARAMS and value}
+        try:
+            _validate_filters(filters)
+        except ValueError as e:
+            await self._send(writer, 400, json.dumps({'error': str(e)}).encode('utf-8'), keep_alive=keep_alive)
+            return
+
+        try:
+            # Cache misses do real work; keep them off the event loop, one at a time
+            async with self._lock:
+                etag, body = await asyncio.get_running_loop().run_in_executor(
+                    None, self.service.get, url.path, filters
+                )
+        except Exception as e:
+            log.error(f"❌ Error serving {target}: {e}", extra=event('request_failed', target=target, error=str(e)))
+            await self._send(writer, 500, b'{"error": "internal error"}', keep_alive=keep_alive)
+            return
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if etag in _parse_etags(headers.get('if-none-match', '')):
+            await self._send(writer, 304, b'', etag=etag, elapsed_ms=elapsed_ms, keep_alive=keep_alive)
+        else:
+            await self._send(writer, 200, body if method == 'GET' else b'', etag=etag, elapsed_ms=elapsed_ms,
+                             keep_alive=keep_alive, content_length=len(body))
+
+    @staticmethod
+    async def _read_headers(reader: asyncio.StreamReader) -> Dict[str, str]:
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                return headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, status: int, body: bytes, etag: Optional[str] = None,
+                    elapsed_ms: Optional[float] = None, keep_alive: bool = False,
+                    content_length: Optional[int] = None):
+        lines = [
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body) if content_length is None else content_length}",
+            "Cache-Control: no-cache",
+            "Access-Control-Allow-Origin: *",
+            "Access-Control-Allow-Headers: If-None-Match",
+            "Access-Control-Expose-Headers: ETag",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if etag:
+            lines.append(f"ETag: {etag}")
+        if elapsed_ms is not None:
+            lines.append(f"Server-Timing: app;dur={elapsed_ms:.2f}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+        writer.write(head + (body if status not in (204, 304) else b''))
+        await writer.drain()
+
+
+def _validate_filters(filters: Dict[str, str]):
+    """Reject unparseable date filters up front"""
+    for key in ('start', 'end'):
+        if key in filters:
+            try:
+                pd.Timestamp(filters[key])
+            except (ValueError, TypeError):
+                raise ValueError(f"invalid {key} date: {filters[key]}")
+
+
+def _parse_etags(header_value: str):
+    return {tag.strip() for tag in header_value.split(',') if tag.strip()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local analytics HTTP service for the trading dashboard")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Trade store written by trading_performance_analyzer.py")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('-q', '--quiet', action='store_const', const='quiet', dest='log_level', default='normal')
+    verbosity.add_argument('-v', '--verbose', action='store_const', const='verbose', dest='log_level')
+    args = parser.parse_args()
+
+    with run_logging(args.log_level):
+        service = AnalyticsService(args.db)
+        try:
+            asyncio.run(AnalyticsServer(service, args.host, args.port).serve_forever())
+        except KeyboardInterrupt:
+            log.info("\n👋 Analytics server stopped")
+        finally:
+            service.close()
+
+
+if __name__ == "__main__":
+    main()
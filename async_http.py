@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Async HTTP
+Minimal asyncio HTTP/1.1 client used by the local tooling (dashboard probe,
+broker statement fetcher).
+
+Standard library only. It measures time to first byte separately from the
+full download, which the blocking `requests` API doesn't expose cleanly.
+
+ConnectionPool keeps a bounded set of keep-alive connections to one host
+(http or https) and hands them to concurrent requests; RateLimiter is a token
+bucket shared by everything talking to a rate-limited API.
+"""
+
+import asyncio
+import ssl
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_TIMEOUT = 10.0  # seconds
+
+
+@dataclass
+class HttpResponse:
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b''
+    ttfb_ms: float = 0.0   # request sent -> status line received
+    total_ms: float = 0.0  # request sent -> body fully read
+
+
+async def http_get(url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 5.0) -> HttpResponse:
+    """GET a URL on a fresh connection and time it"""
+    return await asyncio.wait_for(_http_get(url, headers or {}), timeout=timeout)
+
+
+async def _http_get(url: str, headers: Dict[str, str]) -> HttpResponse:
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', ''):
+        raise ValueError(f"Only plain http:// URLs are supported: {url}")
+    host = parts.hostname or 'localhost'
+    port = parts.port or 80
+    target = parts.path or '/'
+    if parts.query:
+        target += f"?{parts.query}"
+
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        request_headers = {'Host': f"{host}:{port}", 'Accept': '*/*', 'Connection': 'close', **headers}
+        return await send_request(reader, writer, 'GET', target, request_headers)
+    finally:
+        writer.close()
+
+
+async def send_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, method: str, target: str,
+                       headers: Dict[str, str], body: bytes = b'') -> HttpResponse:
+    """Write one request on an open connection and read its full response"""
+    started = time.perf_counter()
+    if body:
+        headers = {**headers, 'Content-Length': str(len(body))}
+    request = f"{method} {target} HTTP/1.1\r\n" + ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+    writer.write((request + "\r\n").encode('latin-1') + body)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    ttfb_ms = (time.perf_counter() - started) * 1000
+    if not status_line:
+        raise ConnectionError(f"Empty response to {method} {target}")
+    status = int(status_line.split()[1])
+
+    response_headers = await read_headers(reader)
+    response_body = b'' if method == 'HEAD' or status in (204, 304) else await read_body(reader, response_headers)
+    total_ms = (time.perf_counter() - started) * 1000
+    return HttpResponse(status, response_headers, response_body, ttfb_ms, total_ms)
+
+
+async def read_headers(reader: asyncio.StreamReader) -> Dict[str, str]:
+    """Read header lines up to the blank line; names are lower-cased"""
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            return headers
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+
+async def read_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+    """Read a response body framed by Content-Length, chunked encoding or EOF"""
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b';')[0].strip() or b'0', 16)
+            if size == 0:
+                await reader.readline()  # trailing CRLF after the last chunk
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+    if 'content-length' in headers:
+        return await reader.readexactly(int(headers['content-length']))
+    return await reader.read()
+
+
+class ConnectionPool:
+    """Bounded pool of keep-alive HTTP/1.1 connections to one origin
+
+    At most `max_connections` requests are in flight; the rest wait for a
+    connection. Idle connections are reused, so a paginated crawl pays for
+    the TCP (and TLS) handshake once per connection rather than per page.
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 4, timeout: float = DEFAULT_TIMEOUT,
+                 ssl_context: Optional[ssl.SSLContext] = None):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Only http:// and https:// URLs are supported: {base_url}")
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.ssl = (ssl_context or ssl.create_default_context()) if parts.scheme == 'https' else None
+        self.timeout = timeout
+        self.base_path = parts.path.rstrip('/')
+        self.connections_opened = 0
+        self.requests_sent = 0
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def __aenter__(self) -> 'ConnectionPool':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def request(self, method: str, path: str, headers: Optional[Dict[str, str]] = None,
+                      body: bytes = b'') -> HttpResponse:
+        """Send a request for `path` (with any query string) on a pooled connection"""
+        request_headers = {'Host': self.host if self.port in (80, 443) else f"{self.host}:{self.port}",
+                           'Accept': '*/*', 'Connection': 'keep-alive', **(headers or {})}
+        target = self.base_path + path
+        async with self._slots:
+            connection, reused = await self._checkout()
+            try:
+                response = await asyncio.wait_for(
+                    send_request(*connection, method, target, request_headers, body), timeout=self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                connection[1].close()
+                if not reused:
+                    raise
+                # The server dropped an idle keep-alive connection; retry once on a fresh one
+                connection, _ = await self._checkout(fresh=True)
+                try:
+                    response = await asyncio.wait_for(
+                        send_request(*connection, method, target, request_headers, body), timeout=self.timeout)
+                except BaseException:
+                    connection[1].close()
+                    raise
+            except BaseException:
+                connection[1].close()
+                raise
+            self.requests_sent += 1
+            if response.headers.get('connection', '').lower() == 'close':
+                connection[1].close()
+            else:
+                self._idle.append(connection)
+            return response
+
+    async def get(self, path: str, headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+        return await self.request('GET', path, headers)
+
+    async def _checkout(self, fresh: bool = False):
+        while self._idle and not fresh:
+            reader, writer = self._idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return (reader, writer), True
+            writer.close()
+        connection = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl), timeout=self.timeout)
+        self.connections_opened += 1
+        return connection, False
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class RateLimiter:
+    """Token bucket: `rate` requests per second with bursts of up to `burst`
+
+    back_off() halves the rate, so a client configured above the server's real
+    limit settles below it instead of burning its retries on 429s.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.waited_seconds = 0.0
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait for a token; waiters are served in arrival order"""
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                self.waited_seconds += delay
+                await asyncio.sleep(delay)
+                self._refill()
+            self._tokens -= 1
+
+    def try_acquire(self) -> float:
+        """Take a token without waiting; returns 0 on success, else seconds until one is free"""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def back_off(self, seconds: float, min_rate: float = 0.1):
+        """The server said we're too fast (429): halve the rate and pause for Retry-After"""
+        self.rate = max(self.rate / 2, min_rate)
+        self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Atomic Output Helpers
+Temp-file-plus-rename publishing and a cross-process run lock.
+
+Readers (the dashboard, Excel, the analytics server) only ever see a complete
+old file or a complete new file, never a half-written one: outputs are written
+to a temp file in the same folder, flushed to disk, then swapped into place with
+os.replace. The run lock stops two regenerations (e.g. the .bat and .ps1 update
+scripts started together) from interleaving their writes.
+"""
+
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from run_log import get_logger
+
+DEFAULT_LOCK_FILE = '.trading_report.lock'
+DEFAULT_LOCK_TIMEOUT = 600.0  # seconds
+
+# Windows refuses to replace a file another process has open; readers hold it briefly
+REPLACE_ATTEMPTS = 20
+REPLACE_RETRY_DELAY = 0.1
+
+log = get_logger('atomic_io')
+
+
+def _process_umask() -> int:
+    # os.umask can only be read by setting it; done once here, before any writer threads exist
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Published files get the mode a plain open() would have given them, not mkstemp's 0600
+NEW_FILE_MODE = 0o666 & ~_process_umask()
+
+
+class RunLockTimeout(RuntimeError):
+    """Raised when another regeneration holds the run lock for too long"""
+
+
+def _publish_mode(path: str) -> int:
+    """Permission bits for a file about to replace `path`: the existing file's, else the umask default"""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return NEW_FILE_MODE
+
+
+def replace_with_retry(source: str, destination: str):
+    """os.replace that rides out transient sharing violations on Windows"""
+    for attempt in range(REPLACE_ATTEMPTS):
+        try:
+            os.replace(source, destination)
+            return
+        except PermissionError:
+            if attempt == REPLACE_ATTEMPTS - 1:
+                raise
+            time.sleep(REPLACE_RETRY_DELAY)
+
+
+@contextmanager
+def atomic_output_path(path: str) -> Iterator[str]:
+    """Yield a temp path next to `path`; publish it over `path` if the block succeeds"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    base, extension = os.path.splitext(os.path.basename(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{base}.", suffix=f".tmp{extension}", dir=directory)
+    os.close(fd)
+    try:
+        yield temp_path
+        _fsync_path(temp_path)
+        os.chmod(temp_path, _publish_mode(path))
+        replace_with_retry(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = 'w', encoding: Optional[str] = 'utf-8'):
+    """Open a temp file for writing; it replaces `path` only once fully written"""
+    with atomic_output_path(path) as temp_path:
+        with open(temp_path, mode, encoding=None if 'b' in mode else encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def atomic_write_text(path: str, content: str, encoding: str = 'utf-8'):
+    """Atomically replace a text file"""
+    with atomic_write(path, 'w', encoding=encoding) as f:
+        f.write(content)
+
+
+def _fsync_path(path: str):
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+class RunLock:
+    """Exclusive cross-process lock around a report regeneration
+
+    Uses an OS-level file lock (fcntl on POSIX, msvcrt on Windows), so a lock
+    held by a crashed run is released by the OS and never goes stale.
+    """
+
+    def __init__(self, lock_file: str = DEFAULT_LOCK_FILE, timeout: float = DEFAULT_LOCK_TIMEOUT,
+                 poll_interval: float = 0.5):
+        self.lock_file = lock_file
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._handle = None
+
+    def acquire(self):
+        handle = open(self.lock_file, 'a+')
+        deadline = time.monotonic() + self.timeout
+        announced = False
+        while True:
+            if _try_lock(handle):
+                break
+            if not announced:
+                log.info(f"⏳ Another report regeneration is running - waiting for {self.lock_file}...")
+                announced = True
+            if time.monotonic() >= deadline:
+                handle.close()
+                raise RunLockTimeout(f"Timed out after {self.timeout:.0f}s waiting for {self.lock_file}")
+            time.sleep(self.poll_interval)
+
+        handle.seek(0)
+        handle.truncate()
+        handle.write(f"{os.getpid()}\n")
+        handle.flush()
+        self._handle = handle
+
+    def release(self):
+        if self._handle is not None:
+            _unlock(self._handle)
+            self._handle.close()
+            self._handle = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
+
+
+if os.name == 'nt':
+    import msvcrt
+
+    def _try_lock(handle) -> bool:
+        handle.seek(0)
+        try:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(handle):
+        handle.seek(0)
+        try:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+else:
+    import fcntl
+
+    def _try_lock(handle) -> bool:
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(handle):
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Batch Accounts
+Runs the trading report pipeline for many accounts in parallel.
+
+Each account root holds its own blofin/, edgex/ and breakout/ statement
+folders (or an "account statements" folder containing them), and optionally
+its own trading_journal.json and candles/ folder. Every account gets its own
+processor, trade store and outputs under <output-dir>/<account>/, with the
+pipeline's console output captured in that folder's analysis.log. An account
+without a journal or candles gets no journal matches or MAE/MFE; nothing is
+borrowed from the current directory.
+
+Accounts run in a process pool whose workers are reused, so the initializer's
+imports of pandas, pdfplumber, openpyxl and the analyzer happen once per
+worker. The OS peak RSS is a high-water mark for the life of a process, so each
+account resets it first (run_profiler.reset_peak_rss); where that isn't
+possible its timer samples the current RSS instead. Either way an account's
+peak_rss_mb and memory budget are its own. When all
+accounts finish, a combined cross-account summary is written as
+batch_summary.json and batch_summary.xlsx.
+
+Usage:
+    python batch_accounts.py accounts/alice accounts/bob --workers 4 --output-dir batch_reports
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from atomic_io import RunLock, atomic_output_path, atomic_write_text
+from run_log import LOGGER_NAME, EventLogHandler, event, get_logger, run_logging
+from streaming_excel import StreamingExcelWriter
+
+DEFAULT_OUTPUT_DIR = 'batch_reports'
+SUMMARY_FILE = 'batch_summary'
+ACCOUNT_LOG = 'analysis.log'
+
+log = get_logger('batch')
+
+_worker_ready = False
+
+
+def init_worker():
+    """Pool initializer: load the heavy modules once per worker process"""
+    global _worker_ready
+    # Under fork a worker inherits the batch's event log handler; its output belongs in the account log
+    batch_logger = logging.getLogger(LOGGER_NAME)
+    for handler in [handler for handler in batch_logger.handlers if isinstance(handler, EventLogHandler)]:
+        batch_logger.removeHandler(handler)
+    import openpyxl  # noqa: F401
+    import pdfplumber  # noqa: F401
+    import data_converter  # noqa: F401
+    import trading_performance_analyzer  # noqa: F401
+    _worker_ready = True
+
+
+def statements_root(account_root: str) -> str:
+    """The folder holding an account's broker subfolders"""
+    nested = os.path.join(account_root, 'account statements')
+    return nested if os.path.isdir(nested) else account_root
+
+
+def account_names(account_roots: Sequence[str]) -> List[str]:
+    """Folder-based names for each account, made unique where folders share a name"""
+    names = [os.path.basename(os.path.normpath(root)) or 'account' for root in account_roots]
+    counts = Counter(names)
+    seen: Counter = Counter()
+    unique = []
+    for name in names:
+        seen[name] += 1
+        unique.append(f"{name}-{seen[name]}" if counts[name] > 1 else name)
+    return unique
+
+
+def process_account(name: str, account_root: str, output_dir: str, outputs: Sequence[str],
+                    memory_budget_mb: Optional[float] = None) -> Dict:
+    """Run the full pipeline for one account; returns its summary row"""
+    from candle_store import DEFAULT_CANDLES_DIR
+    from run_profiler import MemoryBudgetExceeded, StageTimer, reset_peak_rss
+    from trading_performance_analyzer import DEFAULT_JOURNAL_FILE, run_analysis
+
+    account_dir = os.path.join(output_dir, name)
+    os.makedirs(account_dir, exist_ok=True)
+    result = {'account': name, 'root': account_root, 'output_dir': account_dir, 'status': 'ok',
+              'worker_pid': os.getpid(), 'worker_initialized': _worker_ready}
+    # The worker ran earlier accounts; measure this one's peak from here
+    timer = StageTimer(enabled=True, memory_budget_mb=memory_budget_mb, sampled_peak=not reset_peak_rss())
+    started = time.perf_counter()
+
+    with open(os.path.join(account_dir, ACCOUNT_LOG), 'w', encoding='utf-8') as account_log, \
+            contextlib.redirect_stdout(account_log), run_logging('normal'):
+        try:
+            with RunLock(os.path.join(account_dir, '.trading_report.lock')):
+                processor = run_analysis(
+                    timer,
+                    db_path=os.path.join(account_dir, 'trading_data.db'),
+                    statements_root=statements_root(account_root),
+                    outputs=outputs,
+                    excel_file=os.path.join(account_dir, 'trading_performance_report.xlsx'),
+                    json_dir=os.path.join(account_dir, 'data'),
+                    parquet_dir=account_dir,
+                    candles_dir=os.path.join(account_root, DEFAULT_CANDLES_DIR),
+                    journal_file=os.path.join(account_root, DEFAULT_JOURNAL_FILE),
+                )
+            result.update(account_summary(processor))
+        except (Exception, MemoryBudgetExceeded) as e:
+            log.error(f"❌ Account failed: {e}", extra=event('account_failed', account=name, error=str(e)))
+            result.update(status='failed', error=str(e) or type(e).__name__)
+
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    result['peak_rss_mb'] = timer.report()['peak_rss_mb']
+    return result
+
+
+def account_summary(processor) -> Dict:
+    """Headline metrics plus per-asset totals for one processed account"""
+    ledger = processor.consolidated_data
+    if ledger is None or ledger.empty:
+        return {'transactions': 0, 'assets': []}
+
+    summary = processor.generate_summary_stats()
+    assets = ledger.groupby('Asset').agg(Trades=('PNL', 'size'), PNL=('PNL', 'sum'), Fees=('Fee', 'sum'))
+    assets['Net PNL'] = assets['PNL'] - assets['Fees']
+    return {
+        'transactions': int(summary.get('Total Transactions', 0)),
+        'brokers': ', '.join(sorted(ledger['Broker'].unique())),
+        'total_pnl': round(float(summary.get('Total PNL', 0)), 2),
+        'total_fees': round(float(summary.get('Total Fees', 0)), 2),
+        'net_pnl': round(float(summary.get('Net PNL', 0)), 2),
+        'closed_positions': int(summary.get('Total Closed Positions', 0)),
+        'position_win_rate': round(float(summary.get('Position Win Rate', 0)), 1),
+        'trade_win_rate': round(float(summary.get('Trade Win Rate', 0)), 1),
+        'assets': assets.reset_index().round(2).to_dict('records'),
+    }
+
+
+def combine_results(results: List[Dict]) -> Dict:
+    """Cross-account summary: one row per account, totals, and per-asset totals"""
+    succeeded = [result for result in results if result['status'] == 'ok']
+    accounts = pd.DataFrame([{key: value for key, value in result.items() if key != 'assets'} for result in results])
+
+    asset_rows = [dict(asset, Account=result['account']) for result in succeeded for asset in result.get('assets', [])]
+    if asset_rows:
+        assets = pd.DataFrame(asset_rows).groupby('Asset').agg(
+            Accounts=('Account', 'nunique'), Trades=('Trades', 'sum'), PNL=('PNL', 'sum'),
+            Fees=('Fees', 'sum'), **{'Net PNL': ('Net PNL', 'sum')},
+        ).round(2).sort_values('Net PNL', ascending=False)
+    else:
+        assets = pd.DataFrame()
+
+    totals = {
+        'accounts': len(results),
+        'succeeded': len(succeeded),
+        'failed': len(results) - len(succeeded),
+        'transactions': sum(result.get('transactions', 0) for result in succeeded),
+        'total_pnl': round(sum(result.get('total_pnl', 0) for result in succeeded), 2),
+        'total_fees': round(sum(result.get('total_fees', 0) for result in succeeded), 2),
+        'net_pnl': round(sum(result.get('net_pnl', 0) for result in succeeded), 2),
+        'closed_positions': sum(result.get('closed_positions', 0) for result in succeeded),
+    }
+    return {'totals': totals, 'accounts': accounts, 'assets': assets}
+
+
+def write_summary(combined: Dict, output_dir: str, wall_seconds: float) -> List[str]:
+    """Write the combined summary as JSON (for tooling) and Excel (for people)"""
+    json_file = os.path.join(output_dir, f"{SUMMARY_FILE}.json")
+    excel_file = os.path.join(output_dir, f"{SUMMARY_FILE}.xlsx")
+
+    payload = {
+        'generated_at': datetime.now().isoformat(),
+        'wall_seconds': round(wall_seconds, 3),
+        'totals': combined['totals'],
+        # Empty accounts leave gaps; write them as null rather than NaN (not valid JSON)
+        'accounts': combined['accounts'].astype(object).where(combined['accounts'].notna(), None).to_dict('records'),
+        'assets': combined['assets'].reset_index().to_dict('records') if not combined['assets'].empty else [],
+    }
+    atomic_write_text(json_file, json.dumps(payload, indent=2, default=str))
+
+    with atomic_output_path(excel_file) as temp_file, StreamingExcelWriter(temp_file) as writer:
+        writer.write_rows('Totals', [[key.replace('_', ' ').title(), value]
+                                     for key, value in combined['totals'].items()], header=['Metric', 'Value'])
+        writer.write_dataframe(combined['accounts'], 'Accounts')
+        if not combined['assets'].empty:
+            writer.write_dataframe(combined['assets'], 'Assets', index=True)
+    return [json_file, excel_file]
+
+
+def run_batch(account_roots: Sequence[str], output_dir: str = DEFAULT_OUTPUT_DIR, workers: Optional[int] = None,
+              outputs: Sequence[str] = ('xlsx', 'json'), memory_budget_mb: Optional[float] = None) -> Dict:
+    """Process every account in a process pool and write the combined summary"""
+    os.makedirs(output_dir, exist_ok=True)
+    names = account_names(account_roots)
+    workers = workers or min(len(account_roots), os.cpu_count() or 1)
+
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        futures = {
+            pool.submit(process_account, name, root, output_dir, list(outputs), memory_budget_mb): name
+            for name, root in zip(names, account_roots)
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result['status'] == 'ok':
+                log.info(f"✅ {result['account']}: {result.get('transactions', 0)} transactions, "
+                         f"net PNL ${result.get('net_pnl', 0):.2f} ({result['seconds']:.1f}s)",
+                         extra=event('account_done', **{key: value for key, value in result.items() if key != 'assets'}))
+            else:
+                log.error(f"❌ {result['account']}: {result['error']} (see {os.path.join(result['output_dir'], ACCOUNT_LOG)})",
+                          extra=event('account_failed', account=result['account'], error=result['error']))
+
+    # Report accounts in the order they were given, not completion order
+    results.sort(key=lambda result: names.index(result['account']))
+    combined = combine_results(results)
+    files = write_summary(combined, output_dir, time.perf_counter() - started)
+    combined['files'] = files
+    return combined
+
+
+def main(argv=None) -> int:
+    from trading_performance_analyzer import DEFAULT_OUTPUTS, OUTPUT_FORMATS
+
+    parser = argparse.ArgumentParser(description="Run the trading report for many accounts in parallel")
+    parser.add_argument('accounts', nargs='+', help="Account root folders")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per account, up to CPU count)")
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help="Where per-account outputs go (default %(default)s)")
+    parser.add_argument('--outputs', nargs='+', choices=OUTPUT_FORMATS, default=list(DEFAULT_OUTPUTS),
+                        help=f"Outputs per account (default: {' '.join(DEFAULT_OUTPUTS)})")
+    parser.add_argument('--memory-budget', type=float, metavar='MB', help="Per-account peak RSS budget")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('-q', '--quiet', action='store_const', const='quiet', dest='log_level', default='normal',
+                           help="Only print warnings and errors")
+    verbosity.add_argument('-v', '--verbose', action='store_const', const='verbose', dest='log_level',
+                           help="Also print debug detail")
+    parser.add_argument('--event-log', metavar='PATH', help="Write a JSON-lines log of the batch's events")
+    args = parser.parse_args(argv)
+
+    missing = [root for root in args.accounts if not os.path.isdir(root)]
+    if missing:
+        parser.error(f"account folder not found: {', '.join(missing)}")
+
+    with run_logging(args.log_level, args.event_log):
+        log.info(f"🚀 Processing {len(args.accounts)} accounts...")
+        combined = run_batch(args.accounts, args.output_dir, args.workers, args.outputs, args.memory_budget)
+
+        totals = combined['totals']
+        log.info(f"\n📊 Combined: {totals['succeeded']}/{totals['accounts']} accounts, "
+                 f"{totals['transactions']} transactions, net PNL ${totals['net_pnl']:.2f}",
+                 extra=event('batch_summary', **totals))
+        log.info(f"📋 Summary saved to: {', '.join(combined['files'])}")
+    return 1 if totals['failed'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
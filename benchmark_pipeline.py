@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmark
+Times and memory-profiles every stage of the analyzer at increasing ledger sizes.
+
+For each size, synthetic statements are generated into a scratch folder and
+the full pipeline (discovery, parsing, store ingest, analytics, Excel export,
+JSON conversion) runs there. The cold run ingests everything; the warm run
+re-runs with the store populated, which is the everyday incremental case.
+Per-stage seconds, row counts and tracemalloc peaks go to a JSON report.
+
+Breakout PDFs parse orders of magnitude slower than CSVs, so their size is
+capped separately (--breakout-max) to keep large runs practical.
+
+Usage:
+    python benchmark_pipeline.py --sizes 1000 10000 100000 [--no-memory] [--keep]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List
+
+from atomic_io import atomic_write_text
+from run_profiler import StageTimer
+from statement_generator import BROKERS, generate_statements
+from trading_performance_analyzer import STATEMENTS_ROOT, run_analysis
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_BREAKOUT_MAX = 5_000
+DEFAULT_RESULTS_FILE = 'benchmark_results.json'
+
+
+def run_pipeline(workdir: str, track_memory: bool) -> Dict:
+    """Run the analyzer once inside `workdir` and return its timing report"""
+    timer = StageTimer(enabled=True, track_memory=track_memory)
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    if track_memory:
+        tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            with timer.stage('main'):
+                run_analysis(timer)
+    finally:
+        if track_memory:
+            tracemalloc.stop()
+        os.chdir(previous_dir)
+    return timer.report()
+
+
+def benchmark_size(size: int, args: argparse.Namespace) -> Dict:
+    """Generate statements for one size and benchmark cold and warm runs"""
+    counts = {broker: size for broker in BROKERS}
+    counts['breakout'] = min(size, args.breakout_max)
+
+    workdir = tempfile.mkdtemp(prefix=f'tv-bench-{size}-', dir=args.workdir)
+    try:
+        generate_started = time.perf_counter()
+        files = generate_statements(os.path.join(workdir, STATEMENTS_ROOT), counts, args.files, args.overlap, args.seed)
+        generate_seconds = time.perf_counter() - generate_started
+
+        result = {
+            'size': size,
+            'transactions': counts,
+            'files': {broker: len(paths) for broker, paths in files.items()},
+            'input_mb': round(sum(os.path.getsize(path) for paths in files.values() for path in paths) / 2**20, 2),
+            'generate_seconds': round(generate_seconds, 3),
+            'runs': {'cold': run_pipeline(workdir, not args.no_memory)},
+        }
+        if not args.no_warm:
+            result['runs']['warm'] = run_pipeline(workdir, not args.no_memory)
+        return result
+    finally:
+        if args.keep:
+            print(f"   📁 Kept benchmark data in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_results(results: List[Dict], run: str = 'cold'):
+    """Stage x size table of seconds (and peak traced memory when available)"""
+    sizes = [result['size'] for result in results]
+    stages: List[str] = []
+    for result in results:
+        for name in result['runs'][run]['by_stage']:
+            if name not in stages:
+                stages.append(name)
+
+    print(f"\n⏱️ {run.title()} run - seconds per stage (peak traced MB):")
+    print(f"   {'stage':<26}" + ''.join(f"{size:>20,}" for size in sizes))
+    for name in stages:
+        cells = []
+        for result in results:
+            totals = result['runs'][run]['by_stage'].get(name)
+            if totals is None:
+                cells.append(f"{'-':>20}")
+            elif 'peak_alloc_mb' in totals:
+                cells.append(f"{totals['seconds']:>10.3f} ({totals['peak_alloc_mb']:>6.1f})")
+            else:
+                cells.append(f"{totals['seconds']:>20.3f}")
+        print(f"   {name:<26}" + ''.join(cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the trading report pipeline on synthetic statements")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Unique transactions per broker for each benchmark (default %(default)s)")
+    parser.add_argument('--breakout-max', type=int, default=DEFAULT_BREAKOUT_MAX,
+                        help="Cap on Breakout transactions per size (default %(default)s)")
+    parser.add_argument('--files', type=int, default=3, help="Files per broker (default %(default)s)")
+    parser.add_argument('--overlap', type=float, default=0.2, help="Overlap between files (default %(default)s)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help="Skip tracemalloc (it slows Python code down)")
+    parser.add_argument('--no-warm', action='store_true', help="Skip the warm (already ingested) run")
+    parser.add_argument('--workdir', help="Parent folder for scratch data (default: system temp)")
+    parser.add_argument('--keep', action='store_true', help="Keep generated statements and outputs")
+    parser.add_argument('--output', default=DEFAULT_RESULTS_FILE, help="Results file (default %(default)s)")
+    args = parser.parse_args(argv)
+
+    print("🏁 Trading pipeline benchmark")
+    results = []
+    for size in args.sizes:
+        print(f"\n📊 {size:,} transactions per broker...")
+        result = benchmark_size(size, args)
+        cold = result['runs']['cold']['total_seconds']
+        warm = result['runs'].get('warm', {}).get('total_seconds')
+        print(f"   ✅ cold {cold:.2f}s" + (f", warm {warm:.2f}s" if warm is not None else "") +
+              f" ({result['input_mb']} MB of statements)")
+        results.append(result)
+
+    print_results(results, 'cold')
+    if not args.no_warm:
+        print_results(results, 'warm')
+
+    report = {'generated_at': datetime.now().isoformat(), 'settings': vars(args), 'results': results}
+    atomic_write_text(args.output, json.dumps(report, indent=2, default=str))
+    print(f"\n📋 Benchmark results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Bootstrap Statistics
+Confidence intervals for the win rate and average PNL of analytics buckets
+(day of week, hour, weekend, coin), so a bucket of three trades stops
+looking as certain as one of three hundred.
+
+Each bucket's trades are resampled with replacement BOOTSTRAP_RESAMPLES
+times in one array operation (an index matrix of resamples x trades, in
+blocks that bound its memory), and the interval is the percentile range of
+the resampled statistics. The resampled win rate needs no index matrix: a
+resample's win count is Binomial(trades, observed win rate), so it is drawn
+directly. Buckets are independent and run on a thread pool;
+NumPy releases the GIL for the heavy work.
+
+Every bucket's generator is seeded from BOOTSTRAP_SEED and the bucket's key,
+so the same trades always give the same intervals (and the dashboard data
+version only moves when the trades do).
+"""
+
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Hashable, Mapping
+
+import numpy as np
+import pandas as pd
+
+BOOTSTRAP_RESAMPLES = 5000
+BOOTSTRAP_CONFIDENCE = 0.95
+BOOTSTRAP_SEED = 20250917
+MIN_SAMPLE_SIZE = 30          # buckets with fewer trades are flagged as too small to act on
+MAX_BLOCK_ELEMENTS = 2_000_000  # resampled values held at once per bucket
+
+CI_COLUMNS = ['Win Rate CI Low %', 'Win Rate CI High %', 'Avg PNL CI Low', 'Avg PNL CI High', 'Low Sample']
+
+
+def _bucket_rng(key: Hashable, seed: int) -> np.random.Generator:
+    return np.random.default_rng([seed, zlib.crc32(str(key).encode('utf-8'))])
+
+
+def bootstrap_interval(pnl: np.ndarray, rng: np.random.Generator, resamples: int = BOOTSTRAP_RESAMPLES,
+                       confidence: float = BOOTSTRAP_CONFIDENCE) -> Dict[str, float]:
+    """Percentile bootstrap intervals of one bucket's win rate (%) and average PNL"""
+    n = len(pnl)
+    if n == 0:
+        return {'Win Rate CI Low %': np.nan, 'Win Rate CI High %': np.nan,
+                'Avg PNL CI Low': np.nan, 'Avg PNL CI High': np.nan}
+
+    # The resampled win count of n trades is exactly Binomial(n, observed win rate)
+    win_rates = rng.binomial(n, np.mean(pnl > 0), size=resamples) / n * 100
+
+    means = np.empty(resamples)
+    block = max(1, MAX_BLOCK_ELEMENTS // n)
+    for start in range(0, resamples, block):
+        stop = min(start + block, resamples)
+        indices = rng.integers(0, n, size=(stop - start, n), dtype=np.int32 if n < 2**31 else np.int64)
+        means[start:stop] = pnl[indices].mean(axis=1)
+
+    tail = (1 - confidence) / 2 * 100
+    win_low, win_high = np.percentile(win_rates, [tail, 100 - tail])
+    mean_low, mean_high = np.percentile(means, [tail, 100 - tail])
+    return {'Win Rate CI Low %': round(float(win_low), 1), 'Win Rate CI High %': round(float(win_high), 1),
+            'Avg PNL CI Low': round(float(mean_low), 2), 'Avg PNL CI High': round(float(mean_high), 2)}
+
+
+def bootstrap_buckets(buckets: Mapping[Hashable, np.ndarray], resamples: int = BOOTSTRAP_RESAMPLES,
+                      confidence: float = BOOTSTRAP_CONFIDENCE, min_sample: int = MIN_SAMPLE_SIZE,
+                      seed: int = BOOTSTRAP_SEED) -> pd.DataFrame:
+    """CI_COLUMNS for every bucket of PNL values, indexed by bucket key"""
+    keys = list(buckets)
+    if not keys:
+        return pd.DataFrame(columns=CI_COLUMNS)
+
+    def interval(key):
+        pnl = np.asarray(buckets[key], dtype='float64')
+        return bootstrap_interval(pnl, _bucket_rng(key, seed), resamples, confidence)
+
+    with ThreadPoolExecutor(max_workers=min(len(keys), os.cpu_count() or 1),
+                            thread_name_prefix='bootstrap') as pool:
+        intervals = list(pool.map(interval, keys))
+
+    table = pd.DataFrame(intervals, index=pd.Index(keys))
+    table['Low Sample'] = [len(buckets[key]) < min_sample for key in keys]
+    return table[CI_COLUMNS]
+
+
+def bootstrap_groups(trades: pd.DataFrame, by: str, **options) -> pd.DataFrame:
+    """bootstrap_buckets over the PNL of each `by` group of trades"""
+    buckets = {key: group.to_numpy() for key, group in trades.groupby(by, sort=False)['PNL']}
+    return bootstrap_buckets(buckets, **options)
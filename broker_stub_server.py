@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Broker Stub Server
+Local stand-in for the Blofin- and Edgex-style trade-history APIs, so the
+statement fetcher can be exercised offline.
+
+History comes from statement_generator's synthetic round trips (seeded, so
+runs repeat), with the same values the generator writes into its CSVs. The
+stub speaks the wire format the fetcher expects: signed requests, cursor
+pagination, page-size caps, and a token bucket per API that answers 429 with
+Retry-After when a client goes too fast. /stub/stats reports requests,
+connections and throttled responses, to check connection reuse.
+
+Usage:
+    python broker_stub_server.py [--port 8766] [--trades 2000] [--rate 20]
+    python statement_fetcher.py --blofin-url http://127.0.0.1:8766 --edgex-url http://127.0.0.1:8766 ...
+      (with BLOFIN_API_KEY=stub-key BLOFIN_API_SECRET=stub-secret BLOFIN_API_PASSPHRASE=stub-passphrase,
+       EDGEX_API_KEY=stub-key EDGEX_API_SECRET=stub-secret)
+"""
+
+import argparse
+import asyncio
+import base64
+import bisect
+import hashlib
+import hmac
+import json
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+from async_http import RateLimiter
+from statement_fetcher import BlofinApi, Credentials, EdgexApi, from_millis
+from statement_generator import (BLOFIN_ASSETS, DEFAULT_SEED, DEFAULT_START, EDGEX_ASSETS, TAKER_FEE, RoundTrips,
+                                 _format_quantity, edgex_costs, generate_round_trips)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8766
+DEFAULT_RATE = 20.0  # requests per second per API
+STUB_CREDENTIALS = Credentials(api_key='stub-key', api_secret='stub-secret', passphrase='stub-passphrase',
+                               account_id='1000001')
+STATS_PATH = '/stub/stats'
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found', 429: 'Too Many Requests'}
+
+
+def blofin_orders(trips: RoundTrips) -> List[Dict]:
+    """Filled Blofin orders (entry and exit per round trip), oldest first, ids rising with time"""
+    pnl = trips.pnl
+    entry_ms = trips.entry_time.astype('datetime64[ms]').astype('int64')
+    exit_ms = trips.exit_time.astype('datetime64[ms]').astype('int64')
+    orders = []
+    for index in range(len(trips)):
+        asset = str(trips.asset[index])
+        base, quote = asset[:-4], asset[-4:]
+        decimals = int(trips.decimals[index])
+        quantity = _format_quantity(trips.quantity[index])
+        long_position = trips.direction[index] > 0
+        common = {'instId': f"{base}-{quote}", 'marginMode': 'cross', 'leverage': str(int(trips.leverage[index])),
+                  'orderType': 'market', 'filledSize': quantity, 'size': quantity, 'state': 'filled'}
+        orders.append({**common, 'createTime': str(entry_ms[index]), 'side': 'buy' if long_position else 'sell',
+                       'averagePrice': f"{trips.entry_price[index]:.{decimals}f}", 'reduceOnly': 'false',
+                       'orderCategory': 'normal', 'pnl': '0',
+                       'fee': f"-{trips.quantity[index] * trips.entry_price[index] * TAKER_FEE:.6f}"})
+        # Same take-profit / stop-loss labelling as the generator's CSVs
+        category = 'normal' if index % 5 == 0 else ('sl' if pnl[index] < 0 else 'tp')
+        orders.append({**common, 'createTime': str(exit_ms[index]), 'side': 'sell' if long_position else 'buy',
+                       'averagePrice': f"{trips.exit_price[index]:.{decimals}f}", 'reduceOnly': 'true',
+                       'orderCategory': category, 'pnl': f"{pnl[index]:.5f}",
+                       'fee': f"-{trips.quantity[index] * trips.exit_price[index] * TAKER_FEE:.6f}"})
+    orders.sort(key=lambda order: int(order['createTime']))
+    for order_id, order in enumerate(orders, start=100_000_001):
+        order['orderId'] = str(order_id)
+    return orders
+
+
+def edgex_positions(trips: RoundTrips) -> List[Dict]:
+    """Closed Edgex positions, oldest first, ids rising with close time"""
+    pnl = trips.pnl
+    close_ms = trips.exit_time.astype('datetime64[ms]').astype('int64')
+    positions = []
+    for index in np.argsort(close_ms, kind='stable'):
+        decimals = int(trips.decimals[index])
+        quantity = trips.quantity[index]
+        open_fee, close_fee, funding = edgex_costs(trips, index)
+        positions.append({
+            'contractName': str(trips.asset[index]),
+            'closeSize': _format_quantity(quantity),
+            'avgEntryPrice': f"{trips.entry_price[index]:.{decimals}f}",
+            'avgClosePrice': f"{trips.exit_price[index]:.{decimals}f}",
+            'closeSide': 'SELL' if trips.direction[index] > 0 else 'BUY',
+            # Net of fees and funding, as Edgex reports it (and the generator's CSVs write it)
+            'realizePnl': f"{pnl[index] - open_fee - close_fee - funding:+.2f}",
+            'openFee': f"-{open_fee:.4f}",
+            'closeFee': f"-{close_fee:.4f}",
+            'fundingFee': f"{funding:.4f}",
+            'exitType': 'TRADE',
+            'closeTime': str(close_ms[index]),
+        })
+    for position_id, position in enumerate(positions, start=500_000_001):
+        position['id'] = str(position_id)
+    return positions
+
+
+class HistoryBook:
+    """Records sorted by time with the page queries both APIs need"""
+
+    def __init__(self, records: List[Dict], time_field: str, id_field: str):
+        self.records = records
+        self.times = [int(record[time_field]) for record in records]
+        self.ids = [int(record[id_field]) for record in records]
+
+    def page(self, start_ms: int, end_ms: int, before_id: Optional[int], limit: int) -> List[Dict]:
+        """Newest first: records in [start_ms, end_ms) with id below before_id"""
+        low = bisect.bisect_left(self.times, start_ms)
+        high = bisect.bisect_left(self.times, end_ms)
+        if before_id is not None:
+            high = min(high, bisect.bisect_left(self.ids, before_id))
+        return self.records[max(low, high - limit):high][::-1]
+
+
+class BrokerStub:
+    """Request handling for both stub APIs"""
+
+    def __init__(self, trades: int = 2000, start: str = DEFAULT_START, seed: int = DEFAULT_SEED,
+                 rate: float = DEFAULT_RATE, credentials: Credentials = STUB_CREDENTIALS):
+        self.credentials = credentials
+        self.blofin = HistoryBook(blofin_orders(generate_round_trips(trades, BLOFIN_ASSETS, seed, start)),
+                                  'createTime', 'orderId')
+        self.edgex = HistoryBook(edgex_positions(generate_round_trips(trades, EDGEX_ASSETS, seed + 1, start)),
+                                 'closeTime', 'id')
+        self.limiters = {BlofinApi.path: RateLimiter(rate, burst=int(rate)),
+                         EdgexApi.path: RateLimiter(rate, burst=int(rate))}
+        self.stats: Counter = Counter()
+
+    def handle(self, path: str, query: str, headers: Dict[str, str]) -> Tuple[int, Dict, Dict[str, str]]:
+        """(status, JSON payload, extra headers) for one GET"""
+        self.stats['requests'] += 1
+        if path == STATS_PATH:
+            return 200, dict(self.stats), {}
+        if path not in self.limiters:
+            return 404, {'error': 'unknown endpoint'}, {}
+
+        wait = self.limiters[path].try_acquire()
+        if wait:
+            self.stats['throttled'] += 1
+            return 429, {'code': '429', 'msg': 'Too many requests'}, {'Retry-After': f"{wait:.3f}"}
+
+        params = dict(parse_qsl(query))
+        request_path = f"{path}?{query}" if query else path
+        if path == BlofinApi.path:
+            return self.blofin_orders(request_path, params, headers)
+        return self.edgex_positions(request_path, params, headers)
+
+    def blofin_orders(self, request_path: str, params: Dict[str, str], headers: Dict[str, str]):
+        prehash = (f"{request_path}GET{headers.get('access-timestamp', '')}{headers.get('access-nonce', '')}")
+        digest = hmac.new(self.credentials.api_secret.encode(), prehash.encode(), hashlib.sha256).hexdigest()
+        if (headers.get('access-key') != self.credentials.api_key
+                or headers.get('access-passphrase') != self.credentials.passphrase
+                or not hmac.compare_digest(headers.get('access-sign', ''), base64.b64encode(digest.encode()).decode())):
+            self.stats['rejected'] += 1
+            return 401, {'code': '152409', 'msg': 'Signature verification failed'}, {}
+
+        limit = min(int(params.get('limit', 100)), 100)
+        after = int(params['after']) if params.get('after') else None
+        # Blofin's end bound is inclusive
+        records = self.blofin.page(int(params.get('begin', 0)), int(params.get('end', 2**62)) + 1, after, limit)
+        self.stats['blofin_pages'] += 1
+        return 200, {'code': '0', 'msg': 'success', 'data': records}, {}
+
+    def edgex_positions(self, request_path: str, params: Dict[str, str], headers: Dict[str, str]):
+        message = f"{headers.get('x-edgex-api-timestamp', '')}GET{request_path}"
+        signature = hmac.new(self.credentials.api_secret.encode(), message.encode(), hashlib.sha256).hexdigest()
+        if (headers.get('x-edgex-api-key') != self.credentials.api_key
+                or not hmac.compare_digest(headers.get('x-edgex-api-signature', ''), signature)):
+            self.stats['rejected'] += 1
+            return 401, {'code': 'INVALID_SIGNATURE', 'msg': 'signature mismatch', 'data': None}, {}
+        if params.get('accountId') != self.credentials.account_id:
+            return 400, {'code': 'INVALID_ACCOUNT', 'msg': 'unknown accountId', 'data': None}, {}
+
+        size = min(int(params.get('size', 100)), 100)
+        offset = int(params['offsetData']) if params.get('offsetData') else None
+        records = self.edgex.page(int(params.get('filterCloseTimeStartInclusive', 0)),
+                                  int(params.get('filterCloseTimeEndExclusive', 2**62)), offset, size + 1)
+        more = len(records) > size
+        records = records[:size]
+        self.stats['edgex_pages'] += 1
+        return 200, {'code': 'SUCCESS', 'msg': None, 'data': {
+            'dataList': records,
+            'nextPageOffsetData': records[-1]['id'] if more else '',
+        }}, {}
+
+
+class StubServer:
+    """HTTP/1.1 keep-alive front end for BrokerStub"""
+
+    def __init__(self, stub: BrokerStub):
+        self.stub = stub
+        self.handlers = {}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stub.stats['connections'] += 1
+        self.handlers[asyncio.current_task()] = writer
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                url = urlsplit(target)
+                if method != 'GET':
+                    status, payload, extra = 400, {'error': 'only GET is supported'}, {}
+                else:
+                    status, payload, extra = self.stub.handle(url.path, url.query, headers)
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+                body = json.dumps(payload).encode('utf-8')
+                lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                         "Content-Type: application/json",
+                         f"Content-Length: {len(body)}",
+                         f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                lines.extend(f"{name}: {value}" for name, value in extra.items())
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self.handlers.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def close(self):
+        """Drop open keep-alive connections so the server can stop cleanly
+
+        Closing the transport hands each handler an EOF; cancelling them instead
+        makes asyncio's stream callback log a spurious CancelledError.
+        """
+        handlers = list(self.handlers.items())
+        for _, writer in handlers:
+            writer.close()
+        await asyncio.gather(*(handler for handler, _ in handlers), return_exceptions=True)
+
+
+async def start_stub_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, trades: int = 2000,
+                            start: str = DEFAULT_START, rate: float = DEFAULT_RATE, seed: int = DEFAULT_SEED):
+    """Start serving history beginning at `start`; returns (asyncio server, base URL)
+
+    Port 0 picks a free port.
+    """
+    stub = BrokerStub(trades, start, seed, rate)
+    front_end = StubServer(stub)
+    server = await asyncio.start_server(front_end.handle_connection, host, port)
+    bound_port = server.sockets[0].getsockname()[1]
+    server.stub = stub
+    server.front_end = front_end
+    return server, f"http://{host}:{bound_port}"
+
+
+async def stop_stub_server(server):
+    server.close()
+    await server.front_end.close()
+    await server.wait_closed()
+
+
+async def serve(args: argparse.Namespace):
+    server, base_url = await start_stub_server(args.host, args.port, args.trades, args.start, args.rate, args.seed)
+    stub = server.stub
+    first = min(stub.blofin.times[0], stub.edgex.times[0])
+    last = max(stub.blofin.times[-1], stub.edgex.times[-1])
+    print(f"🧪 Broker stub listening on {base_url} ({args.trades} round trips per broker, "
+          f"{from_millis(first):%Y-%m-%d} to {from_millis(last):%Y-%m-%d})")
+    print(f"🔑 Credentials: key={STUB_CREDENTIALS.api_key} secret={STUB_CREDENTIALS.api_secret} "
+          f"passphrase={STUB_CREDENTIALS.passphrase} edgex account={STUB_CREDENTIALS.account_id}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of the Blofin/Edgex trade-history APIs")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--trades', type=int, default=2000, help="Round trips per broker (default %(default)s)")
+    parser.add_argument('--start', default=DEFAULT_START, help="First trade date (default %(default)s)")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help="Requests per second per API before 429s (default %(default)s)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\n👋 Broker stub stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Candle Store
+Local OHLCV market data shared by the analyzer and the Python ports of the
+Pine tools: per-symbol columnar arrays of 1-minute bars, memory-mapped on
+read, plus cached resampled views (5m, 1h, 4h, 1D, ...).
+
+Layout under the store root (candles/store by default):
+
+    <SYMBOL>/1m/meta.json                      rows, bar length, version, imported CSVs
+    <SYMBOL>/1m/time.i8                        bar open times, unix seconds
+    <SYMBOL>/1m/open.f8 high.f8 low.f8 close.f8 volume.f8
+    <SYMBOL>/1h/...                            same, resampled from 1m
+
+Columns are raw little-endian arrays, so reading a symbol is an np.memmap of
+each file: no parsing, and only the pages a query touches are read. The store
+is append-only. append() writes bars newer than the last stored one; a bar at
+exactly the last time replaces it (the live, still-forming bar). Column data is
+written before meta.json, so a crash mid-append leaves the old row count in
+force and the stray tail is overwritten by the next append.
+
+Resampled views are built lazily on first request. Every append bumps the 1m
+version, which invalidates them; the next read rebuilds only from the view's
+last bucket onward instead of resampling the whole history. Buckets are
+aligned to UTC epoch multiples like exchange 4h and daily candles (weeks start
+on Monday).
+
+The candles/ folder itself stays the drop-in point for CSV exports:
+CandleLibrary imports each symbol's CSV into the store when the file changes
+and serves the memory-mapped arrays afterwards.
+
+One writer at a time per store; any number of readers (threads or processes).
+
+Usage:
+    python candle_store.py import candles/BTCUSDT.csv candles/ETHUSDT.csv
+    python candle_store.py list
+    python candle_store.py resample BTCUSDT 4h
+"""
+
+import argparse
+import glob
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from atomic_io import atomic_write_text
+from run_log import get_logger, run_logging
+
+DEFAULT_CANDLES_DIR = 'candles'
+STORE_SUBDIR = 'store'
+BASE_TIMEFRAME = '1m'
+TIMEFRAMES = {'1m': 60, '5m': 300, '15m': 900, '30m': 1800, '1h': 3600, '4h': 14400, '1D': 86400, '1W': 604800}
+COLUMN_TYPES = {'time': '<i8', 'open': '<f8', 'high': '<f8', 'low': '<f8', 'close': '<f8', 'volume': '<f8'}
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+META_FILE = 'meta.json'
+WEEK_SECONDS = TIMEFRAMES['1W']
+WEEK_ORIGIN = 4 * 86400  # 1970-01-05, a Monday: weekly buckets start on Mondays like exchange candles
+
+TIME_COLUMNS = ('time', 'timestamp', 'open_time', 'date', 'datetime')
+QUOTE_SUFFIXES = ('PERP', 'USDT', 'USDC', 'USD')  # stripped in this order
+
+log = get_logger('candle_store')
+
+
+@dataclass(frozen=True)
+class Candles:
+    """One symbol's bars, sorted by open time (arrays may be memory-mapped, treat as read-only)"""
+    symbol: str
+    time: np.ndarray     # datetime64[s], bar open time
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    bar_seconds: int = 0  # 0 = infer from the bar spacing
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def interval(self) -> np.timedelta64:
+        """Bar length (the smallest gap between bars, so missing bars don't stretch it)"""
+        if self.bar_seconds:
+            return np.timedelta64(self.bar_seconds, 's')
+        if len(self.time) < 2:
+            return np.timedelta64(TIMEFRAMES[BASE_TIMEFRAME], 's')
+        return np.diff(self.time).min()
+
+    @property
+    def seconds(self) -> np.ndarray:
+        """Bar open times as int64 unix seconds (a view, no copy)"""
+        return self.time.view('int64')
+
+
+def base_symbol(name: str) -> str:
+    """'BTC-USDT-PERP', 'BTCUSDT' and 'BTCUSD' all become 'BTC'"""
+    symbol = name.upper()
+    for separator in ('-', '_', '/', ':'):
+        symbol = symbol.replace(separator, '')
+    for suffix in QUOTE_SUFFIXES:
+        if symbol.endswith(suffix) and len(symbol) > len(suffix):
+            symbol = symbol[:-len(suffix)]
+    return symbol
+
+
+def timeframe_seconds(timeframe: str) -> int:
+    """'4h' -> 14400; also accepts any '<n>m', '<n>h', '<n>D' or '<n>W'"""
+    if timeframe in TIMEFRAMES:
+        return TIMEFRAMES[timeframe]
+    units = {'m': 60, 'h': 3600, 'D': 86400, 'd': 86400, 'W': 604800}
+    count, unit = timeframe[:-1], timeframe[-1:]
+    if not count.isdigit() or unit not in units or int(count) <= 0:
+        raise ValueError(f"Unknown timeframe {timeframe!r} (e.g. {', '.join(TIMEFRAMES)})")
+    return int(count) * units[unit]
+
+
+def parse_candle_times(values: pd.Series) -> np.ndarray:
+    """Unix seconds/milliseconds or date strings -> datetime64[s]"""
+    if pd.api.types.is_numeric_dtype(values):
+        numbers = values.to_numpy(dtype='int64')
+        if len(numbers) and np.abs(numbers).max() > 10**11:
+            numbers = numbers // 1000
+        return numbers.astype('datetime64[s]')
+    return pd.to_datetime(values).to_numpy(dtype='datetime64[s]')
+
+
+def load_candle_csv(path: str, symbol: Optional[str] = None) -> Candles:
+    """Read an OHLCV CSV; bars are sorted and de-duplicated on time"""
+    df = pd.read_csv(path)
+    df.columns = [str(column).strip().lower() for column in df.columns]
+    time_column = next((column for column in TIME_COLUMNS if column in df.columns), None)
+    if time_column is None:
+        raise ValueError(f"{path}: no time column (expected one of {', '.join(TIME_COLUMNS)})")
+
+    df = df.assign(_time=parse_candle_times(df[time_column]))
+    df = df.sort_values('_time', kind='stable').drop_duplicates('_time', keep='last')
+    if 'volume' not in df.columns:
+        df['volume'] = 0.0
+    return Candles(
+        symbol=symbol or os.path.splitext(os.path.basename(path))[0],
+        time=df['_time'].to_numpy(),
+        **{field: df[field].to_numpy(dtype='float64') for field in PRICE_COLUMNS},
+    )
+
+
+def resample_bars(candles: Candles, seconds: int) -> Dict[str, np.ndarray]:
+    """Aggregate bars into `seconds`-long buckets aligned to the epoch (weeks to Mondays), via reduceat"""
+    times = candles.seconds
+    if len(times) == 0:
+        return {column: np.empty(0, dtype=dtype) for column, dtype in COLUMN_TYPES.items()}
+    origin = WEEK_ORIGIN if seconds % WEEK_SECONDS == 0 else 0
+    bucket = (times - origin) // seconds * seconds + origin
+    starts = np.flatnonzero(np.concatenate([[True], bucket[1:] != bucket[:-1]]))
+    ends = np.concatenate([starts[1:], [len(times)]]) - 1
+    return {
+        'time': bucket[starts],
+        'open': np.asarray(candles.open)[starts],
+        'high': np.maximum.reduceat(candles.high, starts),
+        'low': np.minimum.reduceat(candles.low, starts),
+        'close': np.asarray(candles.close)[ends],
+        'volume': np.add.reduceat(candles.volume, starts),
+    }
+
+
+class CandleStore:
+    """Memory-mapped per-symbol bar arrays with lazily cached resampled views"""
+
+    def __init__(self, root: str = os.path.join(DEFAULT_CANDLES_DIR, STORE_SUBDIR)):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def symbols(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isfile(self._meta_path(name, BASE_TIMEFRAME)))
+
+    def meta(self, symbol: str, timeframe: str = BASE_TIMEFRAME) -> Dict:
+        path = self._meta_path(symbol, timeframe)
+        if not os.path.exists(path):
+            return {'rows': 0, 'version': 0, 'bar_seconds': timeframe_seconds(timeframe)}
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def append(self, candles: Candles, symbol: Optional[str] = None, source: Optional[Dict] = None) -> int:
+        """Add bars newer than the stored ones; returns how many rows were written
+
+        A bar at the last stored time replaces that bar. `source` is kept in
+        the metadata (CandleLibrary records which CSV state was imported).
+        """
+        symbol = (symbol or candles.symbol).upper()
+        with self._lock:
+            meta = self.meta(symbol)
+            rows = meta['rows']
+            times = candles.seconds
+            if rows and len(times):
+                last_time = int(self._column(symbol, BASE_TIMEFRAME, 'time', rows)[-1])
+                keep = np.flatnonzero(times >= last_time)
+                first_row = rows - 1 if len(keep) and times[keep[0]] == last_time else rows
+            else:
+                keep = np.arange(len(times))
+                first_row = rows
+
+            if len(keep):
+                data = {'time': times[keep], **{column: np.asarray(getattr(candles, column))[keep]
+                                                  for column in PRICE_COLUMNS}}
+                self._write_rows(symbol, BASE_TIMEFRAME, first_row, data)
+                meta['rows'] = first_row + len(keep)
+                # Resampled views compare this to the version they were built from
+                meta['version'] = meta.get('version', 0) + 1
+            if source:
+                meta.setdefault('sources', {}).update(source)
+            if len(keep) or source:
+                self._write_meta(symbol, BASE_TIMEFRAME, meta)
+            return len(keep)
+
+    def candles(self, symbol: str, timeframe: str = BASE_TIMEFRAME) -> Optional[Candles]:
+        """The symbol's bars at `timeframe`, memory-mapped; None if the symbol isn't stored"""
+        symbol = symbol.upper()
+        meta = self.meta(symbol)
+        if not meta['rows']:
+            return None
+        if timeframe != BASE_TIMEFRAME:
+            meta = self._refresh_view(symbol, timeframe, meta)
+        return self._map(symbol, timeframe, meta)
+
+    def _refresh_view(self, symbol: str, timeframe: str, base_meta: Dict) -> Dict:
+        """Bring a resampled view up to date with the 1m bars, rebuilding only its tail"""
+        view_meta = self.meta(symbol, timeframe)
+        if view_meta.get('source_version') == base_meta['version']:
+            return view_meta
+
+        with self._lock:
+            base_meta = self.meta(symbol)
+            view_meta = self.meta(symbol, timeframe)
+            if view_meta.get('source_version') == base_meta['version']:
+                return view_meta
+            seconds = timeframe_seconds(timeframe)
+            base = self._map(symbol, BASE_TIMEFRAME, base_meta)
+            view_rows = view_meta['rows']
+
+            # The view's last bucket may have been partial; recompute from it onward
+            first_row = max(view_rows - 1, 0)
+            if view_rows:
+                last_bucket = int(self._column(symbol, timeframe, 'time', view_rows)[-1])
+                source_start = int(np.searchsorted(base.seconds, last_bucket, side='left'))
+            else:
+                source_start = 0
+            tail = Candles(symbol, base.time[source_start:], *(getattr(base, column)[source_start:]
+                                                               for column in PRICE_COLUMNS))
+            data = resample_bars(tail, seconds)
+            self._write_rows(symbol, timeframe, first_row, data)
+
+            view_meta.update(rows=first_row + len(data['time']), bar_seconds=seconds,
+                             source_version=base_meta['version'])
+            view_meta['version'] = view_meta.get('version', 0) + 1
+            self._write_meta(symbol, timeframe, view_meta)
+            log.debug("Resampled %s %s from 1m row %d (%d %s bars)", symbol, timeframe, source_start,
+                      view_meta['rows'], timeframe)
+            return view_meta
+
+    def _map(self, symbol: str, timeframe: str, meta: Dict) -> Candles:
+        rows = meta['rows']
+        arrays = {column: self._column(symbol, timeframe, column, rows) for column in COLUMN_TYPES}
+        return Candles(
+            symbol=symbol,
+            time=arrays.pop('time').view('datetime64[s]'),
+            bar_seconds=meta.get('bar_seconds', timeframe_seconds(timeframe)),
+            **arrays,
+        )
+
+    def _column(self, symbol: str, timeframe: str, column: str, rows: int) -> np.ndarray:
+        dtype = COLUMN_TYPES[column]
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._column_path(symbol, timeframe, column), dtype=dtype, mode='r', shape=(rows,))
+
+    def _write_rows(self, symbol: str, timeframe: str, first_row: int, data: Dict[str, np.ndarray]):
+        """Write rows from `first_row` on, in place: no truncation, so open memory maps stay valid"""
+        os.makedirs(os.path.dirname(self._meta_path(symbol, timeframe)), exist_ok=True)
+        for column, dtype in COLUMN_TYPES.items():
+            path = self._column_path(symbol, timeframe, column)
+            values = np.ascontiguousarray(data[column], dtype=dtype)
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                f.seek(first_row * values.itemsize)
+                f.write(values.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _write_meta(self, symbol: str, timeframe: str, meta: Dict):
+        atomic_write_text(self._meta_path(symbol, timeframe), json.dumps(meta, indent=1))
+
+    def _meta_path(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.root, symbol, timeframe, META_FILE)
+
+    def _column_path(self, symbol: str, timeframe: str, column: str) -> str:
+        return os.path.join(self.root, symbol, timeframe, f"{column}.{COLUMN_TYPES[column][1:]}")
+
+
+class CandleLibrary:
+    """Candles for each asset from a folder of per-symbol CSVs, via the store
+
+    A CSV is parsed and appended to the store only when its size or
+    modification time changed since it was last imported; otherwise the
+    symbol's bars come straight from the memory-mapped store. Symbols written
+    to the store directly (no CSV) are served too.
+    """
+
+    def __init__(self, root: str = DEFAULT_CANDLES_DIR, store: Optional[CandleStore] = None):
+        self.root = root
+        self.store = store or CandleStore(os.path.join(root, STORE_SUBDIR))
+
+    @property
+    def available(self) -> bool:
+        return os.path.isdir(self.root)
+
+    def files(self) -> Dict[str, str]:
+        """Symbol (file stem, upper-cased) -> CSV path"""
+        paths = glob.glob(os.path.join(self.root, '*.csv'))
+        return {os.path.splitext(os.path.basename(path))[0].upper(): path for path in sorted(paths)}
+
+    def resolve(self, asset: str) -> Optional[str]:
+        """Symbol holding `asset`'s bars: an exact name match, else the same base coin"""
+        symbols = sorted(set(self.files()) | set(self.store.symbols()))
+        if asset.upper() in symbols:
+            return asset.upper()
+        base = base_symbol(asset)
+        return next((symbol for symbol in symbols if base_symbol(symbol) == base), None)
+
+    def sync(self, symbol: str) -> int:
+        """Import the symbol's CSV into the store if it changed; returns the bars added"""
+        path = self.files().get(symbol)
+        if path is None:
+            return 0
+        stat = os.stat(path)
+        state = [stat.st_size, stat.st_mtime]
+        name = os.path.basename(path)
+        if self.store.meta(symbol).get('sources', {}).get(name) == state:
+            return 0
+        added = self.store.append(load_candle_csv(path, symbol), symbol, source={name: state})
+        log.debug("Imported %d new bars for %s from %s", added, symbol, path)
+        return added
+
+    def __call__(self, asset: str, timeframe: str = BASE_TIMEFRAME) -> Optional[Candles]:
+        symbol = self.resolve(asset)
+        if symbol is None:
+            return None
+        self.sync(symbol)
+        return self.store.candles(symbol, timeframe)
+
+
+def import_csv_files(store: CandleStore, paths: Sequence[str], symbol: Optional[str] = None) -> Dict[str, int]:
+    """Append CSV exports to the store (symbol from each file name unless given)"""
+    added = {}
+    for path in paths:
+        candles = load_candle_csv(path, symbol)
+        name = (symbol or candles.symbol).upper()
+        added[name] = added.get(name, 0) + store.append(candles, name)
+    return added
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local OHLCV candle store")
+    parser.add_argument('--store', default=os.path.join(DEFAULT_CANDLES_DIR, STORE_SUBDIR),
+                        help="Store folder (default %(default)s)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help="Append 1-minute OHLCV CSVs to the store")
+    import_parser.add_argument('paths', nargs='+')
+    import_parser.add_argument('--symbol', help="Store under this symbol instead of the file name")
+    commands.add_parser('list', help="Stored symbols with their bar counts and date ranges")
+    resample_parser = commands.add_parser('resample', help="Build (or refresh) a resampled view")
+    resample_parser.add_argument('symbol')
+    resample_parser.add_argument('timeframes', nargs='+')
+    args = parser.parse_args(argv)
+
+    store = CandleStore(args.store)
+    with run_logging():
+        if args.command == 'import':
+            for symbol, added in import_csv_files(store, args.paths, args.symbol).items():
+                log.info(f"✅ {symbol}: {added:,} new bars")
+        elif args.command == 'list':
+            for symbol in store.symbols():
+                candles = store.candles(symbol)
+                log.info(f"{symbol:<14} {len(candles):>10,} bars  {candles.time[0]} → {candles.time[-1]}")
+        else:
+            for timeframe in args.timeframes:
+                candles = store.candles(args.symbol, timeframe)
+                if candles is None:
+                    log.error(f"❌ {args.symbol} is not in {args.store}")
+                    raise SystemExit(1)
+                log.info(f"✅ {args.symbol.upper()} {timeframe}: {len(candles):,} bars")
+
+
+if __name__ == "__main__":
+    main()
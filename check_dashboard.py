@@ -1,31 +1,217 @@
 #!/usr/bin/env python3
 """
-Quick check to see if the trading dashboard is running
+Dashboard and data-freshness probe
+
+Checks the Trading Nexus dashboard and its /data/trading_data.json payload
+concurrently, measuring time to first byte, download size and JSON parse time.
+It also compares the last regeneration with the newest statement file, so a
+regeneration that lags behind a fresh download is caught. The last
+regeneration is the manifest's checked_at, stamped on every run even when the
+data (and generated_at) didn't change; generated_at is the fallback.
+
+Exit codes (for schedulers and alerting):
+    0  dashboard up, data fresh and within budget
+    1  dashboard or data unreachable
+    2  reachable, but data is stale or the payload is over budget
+
+Usage:
+    python check_dashboard.py [--json] [--max-lag-minutes 30] [--max-bytes 5000000]
 """
 
-import requests
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
 import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from async_http import http_get
+
+DEFAULT_URL = "http://localhost:3000"
+DATA_PATH = "/data/trading_data.json"
+MANIFEST_PATH = "/data/manifest.json"
+STATEMENTS_ROOT = "account statements"
+STATEMENT_PATTERNS = ['blofin/*.csv', 'edgex/*.csv', 'breakout/*.pdf']
+
+DEFAULT_ATTEMPTS = 5
+DEFAULT_RETRY_DELAY = 2.0
+DEFAULT_MAX_LAG_MINUTES = 30.0
+DEFAULT_MAX_BYTES = 5_000_000
+
+EXIT_OK = 0
+EXIT_DOWN = 1
+EXIT_ALERT = 2
+
+
+async def probe_page(url: str) -> Dict:
+    """Timing for the dashboard page itself"""
+    try:
+        response = await http_get(url)
+    except (OSError, asyncio.TimeoutError, ValueError) as e:
+        return {'url': url, 'ok': False, 'error': str(e) or type(e).__name__}
+    return {
+        'url': url,
+        'ok': response.status == 200,
+        'status': response.status,
+        'ttfb_ms': round(response.ttfb_ms, 1),
+        'total_ms': round(response.total_ms, 1),
+        'bytes': len(response.body),
+    }
+
+
+async def probe_data(url: str) -> Dict:
+    """Timing, size and parse cost of the dashboard data file"""
+    try:
+        response = await http_get(url, timeout=30.0)
+    except (OSError, asyncio.TimeoutError, ValueError) as e:
+        return {'url': url, 'ok': False, 'error': str(e) or type(e).__name__}
+
+    result = {
+        'url': url,
+        'ok': response.status == 200,
+        'status': response.status,
+        'ttfb_ms': round(response.ttfb_ms, 1),
+        'total_ms': round(response.total_ms, 1),
+        'bytes': len(response.body),
+    }
+    if response.status != 200:
+        return result
+
+    parse_started = time.perf_counter()
+    try:
+        data = json.loads(response.body)
+    except ValueError as e:
+        result.update(ok=False, error=f"invalid JSON: {e}")
+        return result
+    result['parse_ms'] = round((time.perf_counter() - parse_started) * 1000, 1)
+
+    metadata = data.get('metadata', {}) if isinstance(data, dict) else {}
+    result['generated_at'] = metadata.get('generated_at')
+    result['data_version'] = metadata.get('data_version')
+    return result
+
+
+async def probe_manifest(url: str) -> Optional[str]:
+    """When the data was last regenerated, changed or not; None without a manifest"""
+    try:
+        response = await http_get(url)
+        if response.status != 200:
+            return None
+        manifest = json.loads(response.body)
+    except (OSError, asyncio.TimeoutError, ValueError):
+        return None
+    return manifest.get('checked_at') if isinstance(manifest, dict) else None
+
 
-def check_dashboard():
+def newest_statement(root: str = STATEMENTS_ROOT) -> Optional[Dict]:
+    """The most recently modified broker statement file"""
+    files = [path for pattern in STATEMENT_PATTERNS for path in glob.glob(os.path.join(root, pattern))]
+    if not files:
+        return None
+    newest = max(files, key=os.path.getmtime)
+    return {'path': newest, 'modified_at': datetime.fromtimestamp(os.path.getmtime(newest)).isoformat()}
+
+
+async def run_probe(base_url: str = DEFAULT_URL, attempts: int = DEFAULT_ATTEMPTS,
+                    retry_delay: float = DEFAULT_RETRY_DELAY, max_lag_minutes: float = DEFAULT_MAX_LAG_MINUTES,
+                    max_bytes: int = DEFAULT_MAX_BYTES, statements_root: str = STATEMENTS_ROOT,
+                    verbose: bool = True) -> Dict:
+    """Probe page and data together, retrying while the dashboard is still starting"""
+    base_url = base_url.rstrip('/')
+    for attempt in range(attempts):
+        page, data, checked_at = await asyncio.gather(probe_page(base_url), probe_data(base_url + DATA_PATH),
+                                                      probe_manifest(base_url + MANIFEST_PATH))
+        if page['ok'] or attempt == attempts - 1:
+            break
+        if verbose:
+            print(f"⏳ Attempt {attempt + 1}/{attempts} - Dashboard not ready yet...")
+        await asyncio.sleep(retry_delay)
+
+    result = {'checked_at': datetime.now().isoformat(), 'dashboard': page, 'data': data, 'alerts': []}
+
+    statement = newest_statement(statements_root)
+    result['newest_statement'] = statement
+    regenerated_at = checked_at or data.get('generated_at')
+    result['regenerated_at'] = regenerated_at
+    if regenerated_at and statement:
+        lag_minutes = (datetime.fromisoformat(statement['modified_at']) -
+                       datetime.fromisoformat(regenerated_at)).total_seconds() / 60
+        result['regeneration_lag_minutes'] = round(max(lag_minutes, 0.0), 1)
+        if lag_minutes > max_lag_minutes:
+            result['alerts'].append(
+                f"data regenerated {lag_minutes:.0f} min before the newest statement ({os.path.basename(statement['path'])})"
+            )
+
+    if data.get('bytes', 0) > max_bytes:
+        result['alerts'].append(f"payload {data['bytes']:,} bytes exceeds budget of {max_bytes:,}")
+
+    if not (page['ok'] and data['ok']):
+        result['status'] = 'down'
+        result['exit_code'] = EXIT_DOWN
+    elif result['alerts']:
+        result['status'] = 'alert'
+        result['exit_code'] = EXIT_ALERT
+    else:
+        result['status'] = 'ok'
+        result['exit_code'] = EXIT_OK
+    return result
+
+
+def print_report(result: Dict):
+    page, data = result['dashboard'], result['data']
+    if page['ok']:
+        print(f"✅ Dashboard is running at {page['url']} (TTFB {page['ttfb_ms']} ms)")
+    else:
+        print(f"❌ Dashboard unreachable at {page['url']}: {page.get('error', page.get('status'))}")
+        print("💡 Try running: cd trading-dashboard && npm start")
+
+    if data['ok']:
+        print(f"📦 Data: {data['bytes']:,} bytes, TTFB {data['ttfb_ms']} ms, "
+              f"download {data['total_ms']} ms, parse {data['parse_ms']} ms")
+        print(f"🕒 Generated at {data.get('generated_at')} (data version {data.get('data_version')}), "
+              f"last regenerated at {result.get('regenerated_at')}")
+        if 'regeneration_lag_minutes' in result:
+            print(f"⏱️ Behind newest statement by {result['regeneration_lag_minutes']} min")
+    elif page['ok']:
+        print(f"❌ Data file unavailable at {data['url']}: {data.get('error', data.get('status'))}")
+
+    for alert in result['alerts']:
+        print(f"🚨 {alert}")
+
+
+def check_dashboard() -> bool:
     """Check if the dashboard is accessible"""
-    url = "http://localhost:3000"
-    
     print("🔍 Checking if Trading Nexus dashboard is running...")
-    
-    for attempt in range(5):
-        try:
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                print(f"✅ Dashboard is running successfully at {url}")
-                print("🎯 You can now access your Trading Nexus dashboard!")
-                return True
-        except requests.exceptions.RequestException:
-            print(f"⏳ Attempt {attempt + 1}/5 - Dashboard not ready yet...")
-            time.sleep(2)
-    
-    print("❌ Dashboard doesn't seem to be running")
-    print("💡 Try running: cd trading-dashboard && npm start")
-    return False
+    result = asyncio.run(run_probe())
+    print_report(result)
+    return result['dashboard']['ok']
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Probe the trading dashboard and the freshness of its data")
+    parser.add_argument('--url', default=DEFAULT_URL, help="Dashboard base URL (default %(default)s)")
+    parser.add_argument('--attempts', type=int, default=DEFAULT_ATTEMPTS)
+    parser.add_argument('--retry-delay', type=float, default=DEFAULT_RETRY_DELAY)
+    parser.add_argument('--max-lag-minutes', type=float, default=DEFAULT_MAX_LAG_MINUTES,
+                        help="Alert when data is older than the newest statement by more than this")
+    parser.add_argument('--max-bytes', type=int, default=DEFAULT_MAX_BYTES, help="Payload size budget")
+    parser.add_argument('--statements', default=STATEMENTS_ROOT, help="Broker statements folder")
+    parser.add_argument('--json', action='store_true', help="Print a machine-readable JSON result only")
+    args = parser.parse_args(argv)
+
+    if not args.json:
+        print("🔍 Checking if Trading Nexus dashboard is running...")
+    result = asyncio.run(run_probe(args.url, args.attempts, args.retry_delay, args.max_lag_minutes,
+                                   args.max_bytes, args.statements, verbose=not args.json))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+    return result['exit_code']
+
 
 if __name__ == "__main__":
-    check_dashboard()
+    sys.exit(main())
@@ -5,11 +5,27 @@ Converts Excel trading data to JSON format for the React frontend.
 """
 
 import pandas as pd
+import hashlib
 import json
 import os
 import numpy as np
 from datetime import datetime
-from trading_performance_analyzer import TradingDataProcessor
+from trading_performance_analyzer import DASHBOARD_DATA_DIR, DEFAULT_EXCEL_FILE, TradingDataProcessor
+from exchange_matching import journal_matches_from_table
+from streaming_excel import split_continuation_sheet_name
+from atomic_io import RunLock, atomic_write_text
+from run_log import event, get_logger
+
+SNAPSHOT_FILE = 'trading_data.json'
+MANIFEST_FILE = 'manifest.json'
+DELTA_DIR = 'deltas'
+MAX_RETAINED_DELTAS = 20
+
+# Sections holding per-record lists that are diffed record by record;
+# every other section is an aggregate and is replaced whole when it changes
+RECORD_SECTIONS = ['trades', 'positions', 'blofin', 'edgex', 'breakout']
+
+log = get_logger('converter')
 
 def json_serializer(obj):
     """Custom JSON serializer to handle NaN and datetime objects"""
@@ -33,78 +49,255 @@ def json_serializer(obj):
         return float(obj)
     return str(obj)
 
-def convert_excel_to_json():
+def convert_excel_to_json(excel_file=DEFAULT_EXCEL_FILE, output_dir=DASHBOARD_DATA_DIR):
     """Convert trading performance Excel to JSON for frontend"""
     
-    excel_file = "trading_performance_report.xlsx"
-    output_dir = "trading-dashboard/public/data"
-    
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
     if not os.path.exists(excel_file):
-        print(f"❌ Excel file not found: {excel_file}")
-        print("💡 Run trading_performance_analyzer.py first to generate the Excel file")
+        log.error(f"❌ Excel file not found: {excel_file}")
+        log.error("💡 Run trading_performance_analyzer.py first to generate the Excel file")
         return
     
-    print(f"📊 Converting {excel_file} to JSON format...")
+    log.info(f"📊 Converting {excel_file} to JSON format...")
     
     try:
-        # Read all sheets
-        excel_data = pd.read_excel(excel_file, sheet_name=None)
+        # Read all sheets, stitching continuation sheets ("All Trades (2)", ...)
+        # written past Excel's row limit back onto their base sheet
+        excel_data = merge_continuation_sheets(pd.read_excel(excel_file, sheet_name=None))
+        publish_sheets(excel_data, output_dir)
         
-        dashboard_data = {}
+    except Exception as e:
+        log.error(f"❌ Error converting data: {e}")
+        log.error(f"💡 Fix the Excel file generation issue and try again")
+
+def convert_sheets_to_json(sheets, output_dir=DASHBOARD_DATA_DIR):
+    """Convert the analyzer's report sheets to JSON directly, without a workbook
+
+    Each sheet is read back through the same cell conversion the workbook
+    round trip applies, so the output matches convert_excel_to_json. Errors
+    propagate to the caller.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    log.info(f"📊 Converting {len(sheets)} report sheets to JSON format...")
+    return publish_sheets({sheet.name: sheet.read_back() for sheet in sheets}, output_dir)
+
+def publish_sheets(excel_data, output_dir):
+    """Turn sheet frames into dashboard sections and publish them"""
+    dashboard_data = {}
+    
+    # Process each sheet
+    for sheet_name, df in excel_data.items():
+        log.debug("Processing %s...", sheet_name)
         
-        # Process each sheet
-        for sheet_name, df in excel_data.items():
-            print(f"Processing {sheet_name}...")
-            
-            if sheet_name == 'Summary':
-                # Handle summary data specially
-                dashboard_data['summary'] = process_summary_sheet(df)
-            elif sheet_name == 'Position History':
-                dashboard_data['positions'] = process_positions_sheet(df)
-            elif sheet_name == 'Coin Analysis':
-                dashboard_data['coins'] = process_coins_sheet(df)
-            elif sheet_name in ['Day Analysis', 'Hour Analysis', 'Weekend Analysis']:
-                dashboard_data[sheet_name.lower().replace(' ', '_')] = process_analysis_sheet(df)
-            elif sheet_name == 'All Trades':
-                dashboard_data['trades'] = process_trades_sheet(df)
-            else:
-                # Individual broker sheets
-                dashboard_data[sheet_name.lower()] = process_trades_sheet(df)
+        if sheet_name == 'Summary':
+            # Handle summary data specially
+            dashboard_data['summary'] = process_summary_sheet(df)
+        elif sheet_name == 'Position History':
+            dashboard_data['positions'] = process_positions_sheet(df)
+        elif sheet_name == 'Coin Analysis':
+            dashboard_data['coins'] = process_coins_sheet(df)
+        elif sheet_name in ['Day Analysis', 'Hour Analysis', 'Weekend Analysis']:
+            dashboard_data[sheet_name.lower().replace(' ', '_')] = process_analysis_sheet(df)
+        elif sheet_name == 'Fee Analysis':
+            dashboard_data['fees'] = process_fee_sheet(df)
+        elif sheet_name == 'Journal Matches':
+            dashboard_data['journal_matches'] = process_journal_matches_sheet(df)
+        elif sheet_name == 'Equity Bands':
+            dashboard_data.setdefault('monte_carlo', {})['bands'] = process_monte_carlo_sheet(df)
+        elif sheet_name == 'Risk of Ruin':
+            dashboard_data.setdefault('monte_carlo', {})['risk'] = process_monte_carlo_sheet(df)
+        elif sheet_name == 'All Trades':
+            dashboard_data['trades'] = process_trades_sheet(df)
+        else:
+            # Individual broker sheets
+            dashboard_data[sheet_name.lower()] = process_trades_sheet(df)
+    
+    # Reports exported without per-broker sheets: rebuild them from All Trades
+    add_missing_broker_sections(dashboard_data)
+    
+    # Publish the full snapshot plus a delta against the previous version
+    data_version = publish_dashboard_data(dashboard_data, output_dir, total_sheets=len(excel_data))
+    output_file = os.path.join(output_dir, SNAPSHOT_FILE)
+    
+    log.info(f"✅ Data converted successfully!")
+    log.info(f"📁 Output file: {output_file}")
+    log.info(f"📊 Generated {len(dashboard_data)} data sections (data version {data_version})",
+             extra=event('output_written', format='json', path=output_file, sections=len(dashboard_data), data_version=data_version))
+    return data_version
+
+def dumps_dashboard_json(data, indent=None):
+    """Serialize dashboard data, writing NaN as null"""
+    content = json.dumps(data, indent=indent, default=json_serializer)
+    
+    # Replace NaN values with null
+    content = content.replace(': NaN,', ': null,')
+    content = content.replace(': NaN}', ': null}')
+    content = content.replace(': NaN\n', ': null\n')
+    return content
+
+def record_key(section, record):
+    """Stable identity of a record within a section
+
+    Positions are identified by broker, asset and open date, so a position that
+    closes or gains trades shows up as changed. Trades have no natural ID in the
+    report, so they are keyed by content.
+    """
+    if section == 'positions':
+        return f"{record.get('Broker')}|{record.get('Asset')}|{record.get('Open Date')}"
+    encoded = json.dumps(record, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:20]
+
+def compute_delta(previous, current):
+    """Upserted/removed records and replaced aggregates between two snapshots"""
+    delta = {'upserts': {}, 'removals': {}, 'aggregates': {}}
+    
+    sections = [key for key in list(previous) + list(current) if key != 'metadata']
+    for section in dict.fromkeys(sections):
+        old_value = previous.get(section)
+        new_value = current.get(section)
         
-        # Add metadata
-        dashboard_data['metadata'] = {
-            'generated_at': datetime.now().isoformat(),
-            'total_sheets': len(excel_data),
-            'data_version': '1.0'
+        if section in RECORD_SECTIONS:
+            old_records = {record_key(section, record): record for record in (old_value or [])}
+            new_records = {record_key(section, record): record for record in (new_value or [])}
+            upserts = {key: record for key, record in new_records.items() if old_records.get(key) != record}
+            removals = [key for key in old_records if key not in new_records]
+            if upserts:
+                delta['upserts'][section] = upserts
+            if removals:
+                delta['removals'][section] = removals
+        elif old_value != new_value:
+            delta['aggregates'][section] = new_value
+    
+    return delta
+
+def is_empty_delta(delta):
+    return not (delta['upserts'] or delta['removals'] or delta['aggregates'])
+
+def load_json_file(path):
+    """Load a JSON file, or None if it is missing or unreadable"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def publish_dashboard_data(dashboard_data, output_dir, total_sheets=0):
+    """Write the full snapshot, a delta file and the manifest; return the data version
+
+    The version only moves when the data actually changes, but the manifest's
+    `checked_at` is stamped on every run, so freshness probes can tell an
+    unchanged regeneration from a missed one. Each new version
+    gets a small delta (new/changed trades and positions plus updated
+    aggregates) so a dashboard holding version N can fetch just N -> N+1.
+    Only the last MAX_RETAINED_DELTAS deltas are kept; the full snapshot is
+    always current, so clients further behind simply reload it.
+    """
+    snapshot_path = os.path.join(output_dir, SNAPSHOT_FILE)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    
+    # Normalize through JSON so comparisons see exactly what clients see
+    current = json.loads(dumps_dashboard_json(dashboard_data))
+    previous = load_json_file(snapshot_path)
+    manifest = load_json_file(manifest_path) or {'data_version': 0, 'deltas': []}
+    previous_version = manifest.get('data_version', 0)
+    checked_at = datetime.now().isoformat()
+    
+    if previous is not None and previous_version:
+        previous_data = {key: value for key, value in previous.items() if key != 'metadata'}
+        delta = compute_delta(previous_data, current)
+        if is_empty_delta(delta):
+            manifest['checked_at'] = checked_at
+            atomic_write_text(manifest_path, json.dumps(manifest, indent=2))
+            log.info(f"✅ No data changes - keeping data version {previous_version}")
+            return previous_version
+    else:
+        # No versioned snapshot yet: start the chain with a full snapshot only
+        delta = None
+    
+    version = previous_version + 1
+    generated_at = checked_at
+    
+    current['metadata'] = {
+        'generated_at': generated_at,
+        'total_sheets': total_sheets,
+        'data_version': version
+    }
+    
+    if delta is not None:
+        delta_file = os.path.join(DELTA_DIR, f"delta_{version:06d}.json")
+        delta_document = {
+            'from_version': previous_version,
+            'to_version': version,
+            'generated_at': generated_at,
+            **delta
         }
+        delta_content = dumps_dashboard_json(delta_document)
+        atomic_write_text(os.path.join(output_dir, delta_file), delta_content)
         
-        # Write to JSON file
-        output_file = os.path.join(output_dir, 'trading_data.json')
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(dashboard_data, f, indent=2, default=json_serializer)
-        
-        # Post-process the JSON file to replace any remaining NaN strings
-        with open(output_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Replace NaN values with null
-        content = content.replace(': NaN,', ': null,')
-        content = content.replace(': NaN}', ': null}')
-        content = content.replace(': NaN\n', ': null\n')
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        print(f"✅ Data converted successfully!")
-        print(f"📁 Output file: {output_file}")
-        print(f"📊 Generated {len(dashboard_data)} data sections")
-        
-    except Exception as e:
-        print(f"❌ Error converting data: {e}")
-        print(f"💡 Fix the Excel file generation issue and try again")
+        manifest['deltas'].append({
+            'from_version': previous_version,
+            'to_version': version,
+            'file': delta_file.replace(os.sep, '/'),
+            'size_bytes': len(delta_content.encode('utf-8'))
+        })
+        upserted = sum(len(records) for records in delta['upserts'].values())
+        removed = sum(len(keys) for keys in delta['removals'].values())
+        log.info(f"🧩 Delta v{previous_version}→v{version}: {upserted} upserted, {removed} removed, "
+              f"{len(delta['aggregates'])} aggregate sections updated")
+    else:
+        manifest['deltas'] = []
+    
+    atomic_write_text(snapshot_path, dumps_dashboard_json(current, indent=2))
+    
+    # Compact: drop deltas outside the retention window
+    expired_deltas = []
+    while len(manifest['deltas']) > MAX_RETAINED_DELTAS:
+        expired_deltas.append(manifest['deltas'].pop(0))
+    
+    manifest.update({
+        'data_version': version,
+        'generated_at': generated_at,
+        'checked_at': checked_at,
+        'snapshot': SNAPSHOT_FILE,
+        'oldest_delta_version': manifest['deltas'][0]['from_version'] if manifest['deltas'] else version
+    })
+    # Manifest goes last, so a client that sees the new version finds every file it lists
+    atomic_write_text(manifest_path, json.dumps(manifest, indent=2))
+    
+    for expired in expired_deltas:
+        expired_path = os.path.join(output_dir, expired['file'])
+        if os.path.exists(expired_path):
+            os.remove(expired_path)
+    
+    return version
+
+def merge_continuation_sheets(excel_data):
+    """Concatenate numbered continuation sheets onto their base sheet"""
+    merged = {}
+    for sheet_name, df in excel_data.items():
+        base_name, part = split_continuation_sheet_name(sheet_name)
+        if part > 1 and base_name in merged:
+            merged[base_name] = pd.concat([merged[base_name], df], ignore_index=True)
+        else:
+            merged[sheet_name] = df
+    return merged
+
+def add_missing_broker_sections(dashboard_data):
+    """Derive blofin/edgex/breakout sections from the consolidated trades if absent"""
+    trades = dashboard_data.get('trades')
+    if not trades:
+        return
+    
+    for broker in ['Blofin', 'Edgex', 'Breakout']:
+        key = broker.lower()
+        if key not in dashboard_data:
+            broker_trades = [trade for trade in trades if trade.get('Broker') == broker]
+            if broker_trades:
+                dashboard_data[key] = broker_trades
 
 def process_summary_sheet(df):
     """Process summary sheet data"""
@@ -199,6 +392,45 @@ def process_analysis_sheet(df):
     
     return df.to_dict('records')
 
+def process_fee_sheet(df):
+    """Process the fee analysis sheet: the overall totals plus one list per grouping"""
+    if df.empty:
+        return {}
+    
+    # Replace NaN values with None before converting to dict
+    df = df.where(pd.notnull(df), None)
+    
+    fees = {}
+    for group, rows in df.groupby('Group', sort=False):
+        records = rows.drop(columns='Group').to_dict('records')
+        if group == 'Total':
+            fees['total'] = records[0]
+        else:
+            fees[f"by_{str(group).lower()}"] = records
+    return fees
+
+def process_journal_matches_sheet(df):
+    """Process the journal match table into one match result per journal entry"""
+    if df.empty:
+        return []
+    
+    # Replace NaN values with None before converting to dict
+    df = df.astype(object).where(pd.notnull(df), None)
+    df['Date'] = [pd.to_datetime(value).isoformat() if value is not None else None for value in df['Date']]
+    
+    return journal_matches_from_table(df)
+
+def process_monte_carlo_sheet(df):
+    """Process a Monte Carlo sheet (equity bands or risk of ruin) into one list per simulation method"""
+    if df.empty:
+        return {}
+    
+    # Replace NaN values with None before converting to dict
+    df = df.astype(object).where(pd.notnull(df), None)
+    
+    return {str(method).lower(): rows.drop(columns='Method').to_dict('records')
+            for method, rows in df.groupby('Method', sort=False)}
+
 def process_trades_sheet(df):
     """Process trades sheet"""
     if df.empty:
@@ -224,4 +456,5 @@ def process_trades_sheet(df):
 
 
 if __name__ == "__main__":
-    convert_excel_to_json()
+    with RunLock():
+        convert_excel_to_json()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Exchange Matching
+Matches trading journal entries to the exchange transactions they were
+executed as, the same way the dashboard's utils/exchangeMatching.ts does,
+once in the pipeline instead of per entry in the browser.
+
+A journal entry matches the Blofin / Edgex / Breakout transactions within 48
+hours of its timestamp whose asset contains (or is contained in) the entry's
+coin, when either the size is within 10% or the side agrees with the
+direction. Confidence, discrepancies and suggested exits follow the
+dashboard's rules.
+
+Instead of scanning every transaction for every entry, transactions are
+indexed by normalized asset, each partition sorted by time; an entry's
+candidates are the binary-searched time window of the partitions its coin
+matches, so the cost is O(log n + window) per entry.
+
+The journal is the dashboard's `tradingJournal` (a JSON list of entries).
+Journal timestamps are UTC ISO strings while statement times are naive, so
+journal times are read in the local timezone, as the browser does.
+"""
+
+import json
+import re
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Brokers whose statements the journal is matched against (not simulated trades)
+EXCHANGE_BROKERS = ['Blofin', 'Edgex', 'Breakout']
+
+MATCH_WINDOW = pd.Timedelta(hours=48)
+SIZE_TOLERANCE = 0.10           # size counts as matching within 10%
+EXACT_SIZE_TOLERANCE = 0.05     # ...and as an exact match within 5%
+EXACT_PRICE_TOLERANCE = 0.02    # with the price within 2% of the planned entry
+PRICE_DISCREPANCY = 0.05        # average fill price off the planned entry by more than 5%
+SIZE_DISCREPANCY = 0.10         # total filled size off the planned size by more than 10%
+PNL_DISCREPANCY = 1.0           # calculated exit P&L off the exchange P&L by more than $1
+MAX_MEDIUM_MATCHES = 3          # more candidates than this without an exact match is low confidence
+
+HIGH, MEDIUM, LOW = 'high', 'medium', 'low'
+
+MATCH_COLUMNS = ['Entry ID', 'Coin', 'Direction', 'Entry Time', 'Entry Size', 'Entry Price', 'Confidence',
+                 'Matched Trades', 'Discrepancies', 'Trade ID', 'Broker', 'Asset', 'Date', 'Side', 'Quantity',
+                 'Price', 'PNL', 'Suggested Exit']
+TRADE_COLUMNS = ['Broker', 'Asset', 'Date', 'Side', 'Quantity', 'Price', 'PNL']
+
+
+def normalize_symbol(symbol) -> str:
+    """Upper-case letters and digits only, as the dashboard compares assets"""
+    return re.sub(r'[^A-Z0-9]', '', str(symbol).upper())
+
+
+def local_time(timestamp) -> pd.Timestamp:
+    """A journal timestamp as a naive local time, comparable with statement dates"""
+    value = pd.Timestamp(timestamp)
+    if value.tzinfo is not None:
+        value = pd.Timestamp(value.to_pydatetime().astimezone().replace(tzinfo=None))
+    return value
+
+
+def load_journal(path: str) -> List[Dict]:
+    """Journal entries from a JSON export of the dashboard's journal"""
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    if not isinstance(entries, list):
+        raise ValueError(f"{path} is not a list of journal entries")
+    return entries
+
+
+class ExchangeTradeIndex:
+    """Exchange transactions partitioned by normalized asset, each partition sorted by time"""
+
+    def __init__(self, ledger: pd.DataFrame):
+        ledger = ledger[ledger['Broker'].isin(EXCHANGE_BROKERS) & ledger['Date'].notna()]
+        self.ledger = ledger.reset_index(drop=True)
+        self.times = self.ledger['Date'].to_numpy(dtype='datetime64[ns]')
+        self.quantity = self.ledger['Quantity'].abs().to_numpy(dtype='float64')
+        self.price = self.ledger['Price'].to_numpy(dtype='float64')
+        self.pnl = self.ledger['PNL'].fillna(0.0).to_numpy(dtype='float64')
+        self.is_buy = (self.ledger['Side'].astype(str).str.lower() == 'buy').to_numpy()
+
+        # Row positions of each asset partition, in time order
+        self.partitions: Dict[str, np.ndarray] = {}
+        keys = self.ledger['Asset'].map(normalize_symbol)
+        for key, rows in keys.groupby(keys, sort=False).indices.items():
+            self.partitions[key] = rows[np.argsort(self.times[rows], kind='stable')]
+        self._coin_partitions: Dict[str, List[str]] = {}
+
+    def partitions_for(self, coin) -> List[str]:
+        """Partitions whose asset contains the coin or is contained in it"""
+        coin = normalize_symbol(coin)
+        if coin not in self._coin_partitions:
+            self._coin_partitions[coin] = [key for key in self.partitions if coin in key or key in coin]
+        return self._coin_partitions[coin]
+
+    def window(self, coin, time: pd.Timestamp, width: pd.Timedelta = MATCH_WINDOW) -> np.ndarray:
+        """Row positions of the coin's transactions within `width` of `time`, in time order"""
+        lo_time = np.datetime64(time - width, 'ns')
+        hi_time = np.datetime64(time + width, 'ns')
+        found = []
+        for key in self.partitions_for(coin):
+            rows = self.partitions[key]
+            times = self.times[rows]
+            lo = np.searchsorted(times, lo_time, side='left')
+            hi = np.searchsorted(times, hi_time, side='right')
+            found.append(rows[lo:hi])
+        if not found:
+            return np.empty(0, dtype=np.intp)
+        rows = np.concatenate(found)
+        return rows[np.argsort(self.times[rows], kind='stable')]
+
+
+def _relative_diff(planned: float, actual: np.ndarray) -> np.ndarray:
+    """|planned - actual| / planned; never within tolerance when nothing was planned"""
+    if not planned:
+        return np.full(np.shape(actual), np.inf)
+    return np.abs(planned - actual) / planned
+
+
+def _js_number(value: float) -> str:
+    """A number written out as the dashboard prints it (no exponent), without float noise"""
+    return np.format_float_positional(float(f"{value:.12g}"), trim='-')
+
+
+def match_entry(entry: Dict, index: ExchangeTradeIndex) -> Dict:
+    """Matched transactions, confidence, discrepancies and suggested exits of one journal entry"""
+    size = float(entry.get('size') or 0)
+    planned_price = float(entry.get('entry') or 0)
+    is_long = str(entry.get('direction', '')).lower() == 'long'
+
+    candidates = index.window(entry.get('coin', ''), local_time(entry['timestamp']))
+    size_match = _relative_diff(size, index.quantity[candidates]) <= SIZE_TOLERANCE
+    direction_match = index.is_buy[candidates] == is_long
+    rows = candidates[size_match | direction_match]
+
+    quantity = index.quantity[rows]
+    price = index.price[rows]
+    pnl = index.pnl[rows]
+
+    # Confidence
+    if len(rows) == 0:
+        confidence = LOW
+    elif np.any((_relative_diff(size, quantity) <= EXACT_SIZE_TOLERANCE)
+                & (_relative_diff(planned_price, price) < EXACT_PRICE_TOLERANCE)):
+        confidence = HIGH
+    elif len(rows) <= MAX_MEDIUM_MATCHES:
+        confidence = MEDIUM
+    else:
+        confidence = LOW
+
+    # Discrepancies
+    discrepancies = []
+    exits = entry.get('actualExits') or []
+    if len(rows) == 0:
+        discrepancies.append('No matching trades found in exchange data')
+    else:
+        average_price = price.mean()
+        if _relative_diff(planned_price, average_price) > PRICE_DISCREPANCY:
+            discrepancies.append(f"Price difference: Journal {planned_price:.4f} vs Exchange {average_price:.4f}")
+        total_size = quantity.sum()
+        if _relative_diff(size, total_size) > SIZE_DISCREPANCY:
+            discrepancies.append(f"Size difference: Journal {_js_number(size)} vs Exchange {_js_number(total_size)}")
+        exchange_pnl = pnl.sum()
+        for number, exit_ in enumerate(exits, start=1):
+            if exit_.get('pnlSource') == 'calculated' and abs(exit_.get('pnl', 0) - exchange_pnl) > PNL_DISCREPANCY:
+                discrepancies.append(f"P&L difference in exit {number}: Journal {exit_.get('pnl', 0):.2f} "
+                                     f"vs Exchange {exchange_pnl:.2f}")
+
+    # A transaction is suggested as an exit unless one at its price and time is already recorded
+    recorded = [(float(exit_.get('price', 0)), local_time(exit_['timestamp'])) for exit_ in exits if exit_.get('timestamp')]
+    dates = index.ledger['Date'].to_numpy()[rows]
+    suggested = [not any(abs(exit_price - fill_price) < 0.01 and exit_time == pd.Timestamp(date)
+                         for exit_price, exit_time in recorded)
+                 for fill_price, date in zip(price, dates)]
+
+    return {'rows': rows, 'confidence': confidence, 'discrepancies': discrepancies, 'suggested': suggested}
+
+
+def match_journal(entries: Sequence[Dict], ledger: pd.DataFrame) -> pd.DataFrame:
+    """The match table: one row per (journal entry, matched transaction)
+
+    Entry columns repeat on every row of the entry; an entry without matches
+    has one row with the transaction columns empty. Trade ID is the
+    dashboard's `<Broker>_<Date>` exchange trade ID.
+    """
+    if not entries:
+        return pd.DataFrame(columns=MATCH_COLUMNS)
+    index = ExchangeTradeIndex(ledger)
+
+    # Entry details once per entry; owners / rows / suggested once per output row (row -1: no match)
+    heads, owners, rows, suggested = [], [], [], []
+    for number, entry in enumerate(entries):
+        match = match_entry(entry, index)
+        heads.append({
+            'Entry ID': entry.get('id'),
+            'Coin': entry.get('coin'),
+            'Direction': entry.get('direction'),
+            'Entry Time': local_time(entry['timestamp']),
+            'Entry Size': entry.get('size'),
+            'Entry Price': entry.get('entry'),
+            'Confidence': match['confidence'],
+            'Matched Trades': len(match['rows']),
+            'Discrepancies': '; '.join(match['discrepancies']),
+        })
+        owners.extend([number] * max(len(match['rows']), 1))
+        rows.extend(match['rows'].tolist() or [-1])
+        suggested.extend(match['suggested'] or [None])
+
+    rows = np.asarray(rows)
+    matched = rows >= 0
+    table = pd.DataFrame(heads).iloc[owners].reset_index(drop=True)
+    trades = index.ledger.iloc[rows[matched]][TRADE_COLUMNS]
+    trades.index = np.flatnonzero(matched)
+    table = table.join(trades)
+    table['Trade ID'] = trades['Broker'] + '_' + trades['Date'].map(pd.Timestamp.isoformat)
+    table['Suggested Exit'] = pd.Series(suggested, dtype=object)
+    return table[MATCH_COLUMNS]
+
+
+def journal_matches_from_table(table: pd.DataFrame) -> List[Dict]:
+    """Per-entry match results (as ExchangeMatchResult, keyed by entry ID) from the match table"""
+    results = []
+    for entry_id, rows in table.groupby('Entry ID', sort=False):
+        first = rows.iloc[0]
+        trades = rows[rows['Trade ID'].notna()]
+        discrepancies = first['Discrepancies']
+        results.append({
+            'entryId': entry_id,
+            'confidence': first['Confidence'],
+            'discrepancies': discrepancies.split('; ') if isinstance(discrepancies, str) and discrepancies else [],
+            'matchedTrades': trades[['Trade ID'] + TRADE_COLUMNS].to_dict('records'),
+            'suggestedUpdates': [
+                {
+                    'timestamp': trade['Date'],
+                    'price': trade['Price'],
+                    'percentage': 100,  # Assume full exit, user can adjust
+                    'type': 'manual',
+                    'pnl': trade['PNL'],
+                    'pnlSource': 'exchange',
+                    'exchangeTradeId': trade['Trade ID'],
+                    'notes': f"Auto-suggested from {trade['Broker']} exchange data",
+                }
+                for trade in trades.to_dict('records') if trade['Suggested Exit'] in (True, 'True', 1)
+            ],
+        })
+    return results
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Position Excursions
+Maximum adverse / favourable excursion (MAE / MFE) and time to MFE for each
+position, from local OHLCV candles.
+
+Candles come from a candle_store.CandleLibrary: one CSV per symbol under
+candles/ (e.g. candles/BTCUSDT.csv), served from the memory-mapped store. A
+position is matched to the symbol named after its asset, or failing that to
+any symbol with the same base coin, so BTCUSD and BTCUSDT positions can share
+one BTC series. Times are taken as the same clock as the statements.
+
+Each position covers the candle range [bar containing Open Date, bar
+containing Close Date]; open positions run to the last candle. Ranges are
+found with searchsorted over the sorted candle times, and the highest high /
+lowest low in every range comes from a sparse table (O(n log n) to build per
+symbol, O(1) per query), answered for all positions of a symbol at once.
+Positions outside the candle coverage get NaN.
+
+Bars are the resolution limit: the entry bar's extremes count even if they
+printed before the fill.
+"""
+
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from candle_store import Candles
+
+EXCURSION_COLUMNS = ['MAE %', 'MFE %', 'MAE Price', 'MFE Price', 'Hours to MFE']
+SECONDS_PER_HOUR = 3600
+
+
+class RangeArgMax:
+    """Index of the largest value in values[lo:hi], for many ranges at once
+
+    A sparse table: level k holds the arg-max of every window of 2**k values,
+    and any range is covered by two (overlapping) windows of the largest such
+    size. Only the levels needed for ranges up to `max_length` are built. Ties
+    go to the earlier index.
+    """
+
+    def __init__(self, values: np.ndarray, max_length: Optional[int] = None):
+        self.values = values
+        n = len(values)
+        max_length = n if max_length is None else max(1, min(max_length, n))
+        # int32 indices halve the table's memory for anything short of 2**31 bars
+        self.levels = [np.arange(n, dtype=np.int32 if n < 2**31 else np.int64)]
+        width = 1
+        while width * 2 <= max_length:
+            previous = self.levels[-1]
+            left = previous[:n - 2 * width + 1]
+            right = previous[width:width + len(left)]
+            self.levels.append(np.where(values[left] >= values[right], left, right))
+            width *= 2
+
+    def query(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        """Arg-max for each half-open range [lo, hi); every range must be non-empty"""
+        lengths = hi - lo
+        level = np.floor(np.log2(lengths)).astype(np.int64)
+        result = np.empty(len(lo), dtype=np.int64)
+        for k in np.unique(level):
+            rows = level == k
+            table = self.levels[k]
+            left = table[lo[rows]]
+            right = table[hi[rows] - (1 << k)]
+            result[rows] = np.where(self.values[left] >= self.values[right], left, right)
+        return result
+
+
+def symbol_excursions(candles: Candles, open_dates: np.ndarray, close_dates: np.ndarray,
+                      entry_prices: np.ndarray, directions: np.ndarray) -> Dict[str, np.ndarray]:
+    """MAE/MFE for positions on one symbol (dates as datetime64[s], NaT = still open)"""
+    times = candles.seconds
+    interval = int(candles.interval.astype('timedelta64[s]').astype('int64'))
+    covered_until = times[-1] + interval
+
+    opened = open_dates.view('int64')
+    closed = np.where(np.isnat(close_dates), covered_until, close_dates.view('int64'))
+
+    # Bar containing the open, through the bar containing the close
+    lo = np.searchsorted(times, opened, side='right') - 1
+    hi = np.searchsorted(times, closed, side='right')
+    valid = ~np.isnat(open_dates) & (lo >= 0) & (closed <= covered_until) & (hi > lo) & (entry_prices > 0)
+
+    result = {column: np.full(len(opened), np.nan) for column in EXCURSION_COLUMNS}
+    if not valid.any():
+        return result
+
+    lo, hi = lo[valid], hi[valid]
+    max_length = int((hi - lo).max())
+    highest_index = RangeArgMax(candles.high, max_length).query(lo, hi)
+    lowest_index = RangeArgMax(-candles.low, max_length).query(lo, hi)
+    highest, lowest = candles.high[highest_index], candles.low[lowest_index]
+
+    long_side = directions[valid] > 0
+    entry = entry_prices[valid]
+    favourable_index = np.where(long_side, highest_index, lowest_index)
+    favourable = np.where(long_side, highest, lowest)
+    adverse = np.where(long_side, lowest, highest)
+    sign = np.where(long_side, 1.0, -1.0)
+
+    result['MFE Price'][valid] = favourable
+    result['MAE Price'][valid] = adverse
+    result['MFE %'][valid] = np.maximum(sign * (favourable - entry) / entry * 100, 0.0)
+    result['MAE %'][valid] = np.maximum(sign * (entry - adverse) / entry * 100, 0.0)
+    result['Hours to MFE'][valid] = np.maximum(times[favourable_index] - opened[valid], 0) / SECONDS_PER_HOUR
+    return result
+
+
+def compute_excursions(positions: pd.DataFrame, candle_source: Callable[[str], Optional[Candles]]) -> pd.DataFrame:
+    """EXCURSION_COLUMNS for every position, aligned to positions.index (NaN where no candles cover it)"""
+    excursions = pd.DataFrame(np.nan, index=positions.index, columns=EXCURSION_COLUMNS)
+    if positions.empty:
+        return excursions
+
+    open_dates = pd.to_datetime(positions['Open Date']).to_numpy(dtype='datetime64[s]')
+    close_dates = pd.to_datetime(positions['Close Date']).to_numpy(dtype='datetime64[s]')
+    entry_prices = pd.to_numeric(positions['Avg Entry Price'], errors='coerce').to_numpy(dtype='float64')
+    directions = np.where(positions['Position Type'].to_numpy() == 'Short', -1, 1)
+
+    for asset, rows in positions.groupby('Asset', sort=False).indices.items():
+        candles = candle_source(asset)
+        if candles is None or len(candles) == 0:
+            continue
+        values = symbol_excursions(candles, open_dates[rows], close_dates[rows], entry_prices[rows], directions[rows])
+        for column in EXCURSION_COLUMNS:
+            excursions.iloc[rows, excursions.columns.get_loc(column)] = values[column]
+    return excursions
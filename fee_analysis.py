@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Fee Analysis
+Trading fee, funding and maker / taker breakdowns of the normalized ledger,
+computed once in the pipeline so the dashboard only reads the totals.
+
+Each transaction's liquidity is inferred from its effective fee rate
+(Fee / notional) against the broker's maker and taker rates, the same
+schedule the dashboard's utils/feeCalculator.ts uses: at or below the
+midpoint it was a maker fill, above it a taker fill. Fills that can't be
+told apart (no fee or notional, an unknown broker, or a broker charging both
+sides the same, like Breakout) are 'Unclassified'.
+
+Funding is a cost when positive and income when negative. It is already
+inside PNL (net PNL stays PNL - Fee); the Funding column only breaks it out.
+"""
+
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Maker / taker fees (%) per broker, as in trading-dashboard/src/utils/feeCalculator.ts
+EXCHANGE_FEES = {
+    'Breakout': (0.035, 0.035),
+    'Edgex': (0.015, 0.038),
+    'Blofin': (0.020, 0.060),
+}
+MAKER, TAKER, UNCLASSIFIED = 'Maker', 'Taker', 'Unclassified'
+
+# Groupings of the 'Fee Analysis' sheet, in order; 'Total' is one row over everything
+FEE_GROUPS = ['Total', 'Broker', 'Asset', 'Day']
+FEE_COLUMNS = ['Transactions', 'Notional', 'Total Fees', 'Maker Fees', 'Taker Fees', 'Unclassified Fees',
+               'Funding', 'Fees + Funding', 'Fee Rate %', 'Maker Fill %']
+
+
+def classify_liquidity(ledger: pd.DataFrame) -> pd.Series:
+    """Maker / Taker / Unclassified for every transaction, from its effective fee rate"""
+    if ledger.empty:
+        return pd.Series([], index=ledger.index, dtype=object)
+    rates = ledger['Broker'].map(EXCHANGE_FEES)
+    maker = rates.map(lambda pair: pair[0], na_action='ignore').astype('float64').to_numpy()
+    taker = rates.map(lambda pair: pair[1], na_action='ignore').astype('float64').to_numpy()
+    notional = (ledger['Quantity'].abs() * ledger['Price']).to_numpy(dtype='float64')
+    fee = ledger['Fee'].to_numpy(dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        effective = fee / notional * 100
+    known = (notional > 0) & (fee > 0) & (taker > maker)
+    labels = np.where(effective <= (maker + taker) / 2, MAKER, TAKER)
+    return pd.Series(np.where(known, labels, UNCLASSIFIED), index=ledger.index)
+
+
+def _breakdown(ledger: pd.DataFrame, keys: pd.Series) -> pd.DataFrame:
+    """FEE_COLUMNS for each value of `keys` (aligned to the ledger)"""
+    fee = ledger['Fee']
+    liquidity = ledger['Liquidity']
+    frame = pd.DataFrame({
+        'Key': keys,
+        'Transactions': 1,
+        'Notional': ledger['Quantity'].abs() * ledger['Price'],
+        'Total Fees': fee,
+        'Maker Fees': fee.where(liquidity == MAKER, 0.0),
+        'Taker Fees': fee.where(liquidity == TAKER, 0.0),
+        'Unclassified Fees': fee.where(liquidity == UNCLASSIFIED, 0.0),
+        'Funding': ledger['Funding'],
+        'Maker Fills': (liquidity == MAKER).astype(int),
+        'Classified Fills': (liquidity != UNCLASSIFIED).astype(int),
+    })
+    table = frame.groupby('Key', sort=True).sum()
+    table['Fees + Funding'] = table['Total Fees'] + table['Funding']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table['Fee Rate %'] = table['Total Fees'] / table['Notional'].where(table['Notional'] > 0) * 100
+        table['Maker Fill %'] = table['Maker Fills'] / table['Classified Fills'].where(table['Classified Fills'] > 0) * 100
+    return table[FEE_COLUMNS]
+
+
+def fee_breakdowns(ledger: pd.DataFrame, groups: Sequence[str] = FEE_GROUPS) -> pd.DataFrame:
+    """One table of fee / funding / maker-taker totals: a block of rows per group, keyed Group + Key
+
+    Needs the ledger's Liquidity column (classify_liquidity). Day is the
+    calendar date of the transaction.
+    """
+    if ledger.empty:
+        return pd.DataFrame(columns=['Group', 'Key'] + FEE_COLUMNS)
+    keys: Dict[str, pd.Series] = {
+        'Total': pd.Series('All', index=ledger.index),
+        'Broker': ledger['Broker'],
+        'Asset': ledger['Asset'],
+        'Day': ledger['Date'].dt.strftime('%Y-%m-%d'),
+    }
+    blocks = []
+    for group in groups:
+        table = _breakdown(ledger, keys[group]).reset_index()
+        table.insert(0, 'Group', group)
+        blocks.append(table)
+    result = pd.concat(blocks, ignore_index=True)
+    result[FEE_COLUMNS[1:]] = result[FEE_COLUMNS[1:]].round(4)
+    return result
+
+
+def position_fee_totals(trades) -> Dict[str, float]:
+    """Funding and maker / taker fee totals of one position's transactions (rows with Fee, Funding, Liquidity)"""
+    totals = {'Total Funding': 0.0, 'Maker Fees': 0.0, 'Taker Fees': 0.0}
+    for trade in trades:
+        totals['Total Funding'] += trade.get('Funding', 0.0)
+        liquidity = trade.get('Liquidity')
+        if liquidity == MAKER:
+            totals['Maker Fees'] += trade['Fee']
+        elif liquidity == TAKER:
+            totals['Taker Fees'] += trade['Fee']
+    return totals
@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+"""
+Indicators
+Python versions of the averages and trend states behind the chart scripts:
+SMA / EMA / WMA / RMA, ATR, RSI, MACD, the Hull Suite (hullsuite.pine), the
+EMA-stack trend of scalptrend.pine and buz-trend-lite.pine, and the Hull /
+MA alerts of advanced_trend_indicator.pine. Definitions follow Pine's ta.*
+functions (ta.ema seeded with the first value, as everywhere in this repo).
+
+Every indicator comes in two modes that give the same values:
+
+    batch        whole-history arrays, vectorized: ema(closes, 200),
+                 hull(closes, 55), stack_trend(closes)
+    incremental  a state object folding in one new bar at a time in
+                 constant time: state = HullState(55); state.update(close)
+
+States are plain dataclasses: to_dict() is JSON-ready and from_dict()
+restores one after a restart, so a live process only folds in the bars
+closed since it last saved. Window averages (SMA, WMA and the Hulls built
+from them) keep their last `length` inputs in a ring buffer with running
+sums, re-summed once per `length` bars so rounding can't build up;
+everything else is a handful of floats.
+
+Values are NaN until an average has enough input, like na on the chart.
+NaN inputs are skipped, so an average fed by another one still warming up
+(the Hull's smoothing pass, the MACD signal line) starts where Pine's does.
+Trend states are ints: UP (1), DOWN (-1) or NEUTRAL (0); STATUS_LABELS and
+DIRECTION_LABELS hold the scripts' wording.
+
+Not ported: request.security (feed the state higher-timeframe bars instead),
+drawing, tables and alert plumbing.
+"""
+
+import math
+from dataclasses import asdict, dataclass, field, is_dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union, get_args, get_origin, get_type_hints
+
+import numpy as np
+
+# Closed-form EMA blocks are cut where (1 - alpha)**-n reaches this, bounding the rounding error
+EMA_BLOCK_GROWTH = 1e6
+
+UP, DOWN, NEUTRAL = 1, -1, 0
+STATUS_LABELS = {UP: 'Uptrend', DOWN: 'Downtrend', NEUTRAL: 'Sideways'}
+DIRECTION_LABELS = {UP: 'Up', DOWN: 'Down', NEUTRAL: 'Neutral'}
+HULL_MODES = ('Hma', 'Ehma', 'Thma')
+# EMA 13 / 25 / 32 / 200 of scalptrend.pine and buz-trend-lite.pine; the latter's
+# full alignment also wants SMA 100 > 200 > 300
+STACK_EMA_LENGTHS = (13, 25, 32, 200)
+TREND_LITE_SMA_LENGTHS = (100, 200, 300)
+
+
+# ----------------------------------------------------------------------------
+# Batch mode (whole series at once)
+# ----------------------------------------------------------------------------
+
+def _first_valid(values: np.ndarray) -> int:
+    """Index of the first non-NaN value (len(values) if there is none)"""
+    valid = np.flatnonzero(~np.isnan(values))
+    return int(valid[0]) if len(valid) else len(values)
+
+
+def shifted(values: np.ndarray, bars: int = 1, fill=np.nan) -> np.ndarray:
+    """values[t - bars] at t, like Pine's history operator"""
+    result = np.empty_like(values, dtype='float64' if fill is np.nan else values.dtype)
+    result[:bars] = fill
+    result[bars:] = values[:-bars]
+    return result
+
+
+def sma(values: np.ndarray, length: int) -> np.ndarray:
+    """Simple moving average (NaN until `length` values), like ta.sma"""
+    values = np.asarray(values, dtype='float64')
+    result = np.full(len(values), np.nan)
+    start = _first_valid(values)
+    if len(values) - start >= length:
+        sums = np.cumsum(np.concatenate([[0.0], values[start:]]))
+        result[start + length - 1:] = (sums[length:] - sums[:-length]) / length
+    return result
+
+
+def wma(values: np.ndarray, length: int) -> np.ndarray:
+    """Linearly weighted moving average (newest value weighs `length`), like ta.wma"""
+    values = np.asarray(values, dtype='float64')
+    result = np.full(len(values), np.nan)
+    start = _first_valid(values)
+    if len(values) - start >= length:
+        weights = np.arange(length, 0, -1, dtype='float64')
+        result[start + length - 1:] = np.convolve(values[start:], weights, 'valid') / weights.sum()
+    return result
+
+
+def ema(values: np.ndarray, length: int) -> np.ndarray:
+    """Exponential moving average seeded with the first value, like ta.ema"""
+    values = np.asarray(values, dtype='float64')
+    result = np.full(len(values), np.nan)
+    start = _first_valid(values)
+    if start < len(values):
+        result[start:] = exponential_smoothing(values[start:], 2.0 / (length + 1), values[start])
+    return result
+
+
+def exponential_smoothing(values: np.ndarray, alpha: float, previous: float) -> np.ndarray:
+    """y[t] = a*x[t] + (1-a)*y[t-1] for every value, starting from y[-1] = previous
+
+    The recurrence has the closed form
+    y[s+k] = d**(k+1)*y[s-1] + a*d**k * sum(x[s+j] * d**-j), d = 1-a, so each
+    block of values is one cumsum. Blocks are kept short enough that d**-k
+    stays small and the sums don't lose precision.
+    """
+    values = np.asarray(values, dtype='float64')
+    result = np.empty(len(values))
+    decay = 1.0 - alpha
+    if decay <= 0:
+        result[:] = values
+        return result
+    block = max(1, int(np.log(EMA_BLOCK_GROWTH) / -np.log(decay)))
+    powers = decay ** np.arange(block + 1)
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        k = np.arange(len(chunk))
+        weighted = np.cumsum(chunk / powers[k])
+        result[start:start + len(chunk)] = powers[k + 1] * previous + alpha * powers[k] * weighted
+        previous = result[start + len(chunk) - 1]
+    return result
+
+
+def rma(values: np.ndarray, length: int) -> np.ndarray:
+    """Wilder's moving average like ta.rma: SMA of the first `length` values, then alpha = 1/length"""
+    values = np.asarray(values, dtype='float64')
+    result = np.full(len(values), np.nan)
+    start = _first_valid(values)
+    if start + length > len(values):
+        return result
+    seed = start + length - 1
+    result[seed] = values[start:seed + 1].mean()
+    result[seed + 1:] = exponential_smoothing(values[seed + 1:], 1.0 / length, result[seed])
+    return result
+
+
+MOVING_AVERAGES = {'sma': sma, 'ema': ema, 'wma': wma, 'rma': rma}
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """ta.tr(true): high - low on the first bar"""
+    previous = shifted(np.asarray(close, dtype='float64'))
+    return np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int) -> np.ndarray:
+    """ta.atr: RMA of the true range"""
+    return rma(true_range(high, low, close), length)
+
+
+def _rsi_value(gains, losses):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = 100.0 - 100.0 / (1.0 + gains / losses)
+    value = np.where(losses == 0, 100.0, np.where(gains == 0, 0.0, value))
+    return np.where(np.isnan(gains) | np.isnan(losses), np.nan, value)
+
+
+def rsi(close: np.ndarray, length: int) -> np.ndarray:
+    """ta.rsi: RMA of gains against RMA of losses"""
+    change = np.diff(np.asarray(close, dtype='float64'), prepend=np.nan)
+    return _rsi_value(rma(np.maximum(change, 0.0), length), rma(-np.minimum(change, 0.0), length))
+
+
+def macd(close: np.ndarray, fast: int, slow: int, signal: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ta.macd: (MACD line, signal line, histogram)"""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def _hull_averages(mode: str, length: int) -> Tuple[str, List[int]]:
+    """Average kind and lengths of a Hull variant: the inner averages, then the smoothing pass
+
+    As hullsuite.pine's Mode(): Thma is called with half the length, Pine's
+    int lengths round down and the HMA smoothing is round(sqrt(length)).
+    """
+    if mode not in HULL_MODES:
+        raise ValueError(f"Unknown Hull mode {mode!r} (expected one of {', '.join(HULL_MODES)})")
+    length = max(1, int(length))
+    if mode == 'Thma':
+        length = max(1, length // 2)
+        return 'wma', [max(1, length // 3), max(1, length // 2), length, length]
+    return ('ema' if mode == 'Ehma' else 'wma'), [max(1, length // 2), length, int(math.floor(math.sqrt(length) + 0.5))]
+
+
+def _hull_blend(mode: str, parts):
+    """The series the smoothing pass averages, from the inner averages"""
+    if mode == 'Thma':
+        third, half, full = parts
+        return third * 3 - half - full
+    half, full = parts
+    return 2 * half - full
+
+
+def hull(values: np.ndarray, length: int = 55, mode: str = 'Hma') -> np.ndarray:
+    """Hull Suite's HULL line: HMA, EHMA or THMA of `values`"""
+    kind, lengths = _hull_averages(mode, length)
+    average = MOVING_AVERAGES[kind]
+    parts = [average(values, part) for part in lengths[:-1]]
+    return average(_hull_blend(mode, parts), lengths[-1])
+
+
+# ----------------------------------------------------------------------------
+# Trend states (elementwise, so batch and incremental share them)
+# ----------------------------------------------------------------------------
+
+def direction(up, down):
+    """UP where `up`, DOWN where `down` (and not up), NEUTRAL elsewhere"""
+    return np.where(up, UP, np.where(down, DOWN, NEUTRAL)).astype(np.int8)
+
+
+def _stacked(series: Sequence, descending: bool):
+    """series[0] > series[1] > ... (or < when not descending); True for fewer than two"""
+    result = True
+    for faster, slower in zip(series, series[1:]):
+        result = result & ((faster > slower) if descending else (faster < slower))
+    return result
+
+
+def crossover(a, b, previous_a, previous_b):
+    """ta.crossover(a, b) given both series' previous values"""
+    return (a > b) & (previous_a <= previous_b)
+
+
+def hull_trend(current, two_bars_ago):
+    """Hull Suite colouring: UP while HULL > HULL[2], DOWN while below"""
+    return direction(current > two_bars_ago, current < two_bars_ago)
+
+
+def trend_status(close, ema1, ema2, ema3):
+    """scalptrend / buz-trend-lite trendStatus: EMA1 > EMA2 > EMA3 with close above EMA1 (or the reverse)"""
+    return direction(_stacked([ema1, ema2, ema3], True) & (close > ema1),
+                     _stacked([ema1, ema2, ema3], False) & (close < ema1))
+
+
+def price_trend(price, fast, slow):
+    """The scripts' getTrendStatusX: price and the fast average both on the same side of the slow one"""
+    return direction((price > slow) & (fast > slow), (price < slow) & (fast < slow))
+
+
+def full_alignment(emas: Sequence, smas: Sequence = ()):
+    """fullAlignment: every EMA (and every SMA, when given) stacked in order"""
+    return direction(_stacked(emas, True) & _stacked(smas, True),
+                     _stacked(emas, False) & _stacked(smas, False))
+
+
+def stack_trend(close: np.ndarray, ema_lengths: Sequence[int] = STACK_EMA_LENGTHS,
+                sma_lengths: Sequence[int] = ()) -> Tuple[np.ndarray, np.ndarray]:
+    """(trend status, full alignment) at every bar
+
+    scalptrend.pine aligns the four EMAs only; buz-trend-lite.pine also
+    wants the SMAs in order (pass TREND_LITE_SMA_LENGTHS).
+    """
+    emas = [ema(close, length) for length in ema_lengths]
+    smas = [sma(close, length) for length in sma_lengths]
+    return trend_status(close, *emas[:3]), full_alignment(emas, smas)
+
+
+@dataclass(frozen=True)
+class AdvancedTrendSettings:
+    """advanced_trend_indicator.pine inputs (Hull on the chart's own closes)"""
+    hull_mode: str = 'Hma'
+    hull_length: int = 55              # hullLength * hullLengthMult
+    ma1_type: str = 'ema'
+    ma1_length: int = 50
+    ma2_type: str = 'ema'
+    ma2_length: int = 200
+    ma3_type: str = 'sma'
+    ma3_length: int = 100
+    use_hull_filter: bool = False
+    hull_filter: str = 'Price'         # 'Price', 'MA1', 'MA2' or 'MA3' against the Hull
+    bullish_above_hull: bool = True    # False: bullish alerts only below the Hull
+    bearish_above_hull: bool = False
+    use_rsi_filter: bool = False
+    rsi_length: int = 14
+    bullish_rsi_above: bool = True     # bullish alerts need RSI > 50 (False: <= 50)
+    bearish_rsi_below: bool = True     # bearish alerts need RSI < 50 (False: >= 50)
+    use_macd_filter: bool = False
+    macd_fast: int = 12
+    macd_slow: int = 32
+    macd_signal: int = 20
+    bullish_macd_above_zero: bool = False
+    bullish_macd_above_signal: bool = True
+    bearish_macd_below_zero: bool = False
+    bearish_macd_below_signal: bool = True
+
+    @property
+    def averages(self) -> List[Tuple[str, int]]:
+        return [(self.ma1_type, self.ma1_length), (self.ma2_type, self.ma2_length), (self.ma3_type, self.ma3_length)]
+
+    def alerts(self, close, previous_close, hull_value, previous_hull, ma1, previous_ma1, ma2, ma3,
+               strength, macd_line, signal_line) -> Dict:
+        """The script's four alert conditions plus its MA trend, elementwise"""
+        ma_up, ma_down = ma1 > ma2, ma1 < ma2
+        filtered = {'Price': close, 'MA1': ma1, 'MA2': ma2, 'MA3': ma3}[self.hull_filter]
+        above_hull, below_hull = filtered > hull_value, filtered < hull_value
+        bullish_ok = ((not self.use_hull_filter) | (above_hull if self.bullish_above_hull else below_hull))
+        bearish_ok = ((not self.use_hull_filter) | (above_hull if self.bearish_above_hull else below_hull))
+        # RSI and MACD filters: each passes when off, and both must pass
+        bullish_ok = bullish_ok & ((not self.use_rsi_filter) | ((strength > 50) if self.bullish_rsi_above else (strength <= 50)))
+        bearish_ok = bearish_ok & ((not self.use_rsi_filter) | ((strength < 50) if self.bearish_rsi_below else (strength >= 50)))
+        bullish_ok = bullish_ok & ((not self.use_macd_filter)
+                                   | (self.bullish_macd_above_zero & (macd_line > 0))
+                                   | (self.bullish_macd_above_signal & (macd_line > signal_line)))
+        bearish_ok = bearish_ok & ((not self.use_macd_filter)
+                                   | (self.bearish_macd_below_zero & (macd_line < 0))
+                                   | (self.bearish_macd_below_signal & (macd_line < signal_line)))
+        return {
+            'ma_trend': direction(ma_up, ma_down),
+            'bullish_hull_cross': crossover(close, hull_value, previous_close, previous_hull) & ma_up & bullish_ok,
+            'bearish_hull_cross': crossover(hull_value, close, previous_hull, previous_close) & ma_down & bearish_ok,
+            'bullish_ma_cross': crossover(close, ma1, previous_close, previous_ma1) & ma_up & bullish_ok,
+            'bearish_ma_cross': crossover(ma1, close, previous_ma1, previous_close) & ma_down & bearish_ok,
+        }
+
+
+def advanced_trend(close: np.ndarray, settings: AdvancedTrendSettings = AdvancedTrendSettings()) -> Dict[str, np.ndarray]:
+    """advanced_trend_indicator.pine at every bar: hull, hull_trend, ma_trend and the four alerts"""
+    close = np.asarray(close, dtype='float64')
+    hull_values = hull(close, settings.hull_length, settings.hull_mode)
+    ma1, ma2, ma3 = (MOVING_AVERAGES[kind](close, length) for kind, length in settings.averages)
+    line, signal_line, _ = macd(close, settings.macd_fast, settings.macd_slow, settings.macd_signal)
+    readings = settings.alerts(close, shifted(close), hull_values, shifted(hull_values), ma1, shifted(ma1), ma2, ma3,
+                               rsi(close, settings.rsi_length), line, signal_line)
+    return {'hull': hull_values, 'hull_trend': hull_trend(hull_values, shifted(hull_values, 2)), **readings}
+
+
+# ----------------------------------------------------------------------------
+# Incremental mode (one bar at a time, O(1) each)
+# ----------------------------------------------------------------------------
+
+def _restore(kind, value):
+    """A field value read back from JSON, rebuilt into the type it is annotated with"""
+    if value is None:
+        return None
+    origin = get_origin(kind)
+    if origin is Union:
+        return _restore(next(arg for arg in get_args(kind) if arg is not type(None)), value)
+    if origin is list:
+        return [_restore(get_args(kind)[0], item) for item in value]
+    if origin is tuple:
+        return tuple(value)
+    if isinstance(kind, type) and is_dataclass(kind):
+        return kind.from_dict(value) if issubclass(kind, StreamState) else kind(**value)
+    return value
+
+
+@dataclass
+class StreamState:
+    """Base of the incremental states: plain fields, so they round-trip through JSON"""
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, saved: Dict) -> 'StreamState':
+        hints = get_type_hints(cls)
+        return cls(**{name: _restore(hints[name], value) for name, value in saved.items()})
+
+
+@dataclass
+class MovingAverageState(StreamState):
+    """One SMA / EMA / WMA / RMA, fed a value per bar"""
+    kind: str                          # 'sma', 'ema', 'wma' or 'rma'
+    length: int
+    value: float = float('nan')
+    count: int = 0                     # values folded in
+    window: List[float] = field(default_factory=list)  # SMA / WMA: ring buffer of the last `length` values
+    head: int = 0                      # oldest value in a full window
+    total: float = 0.0                 # sum of the window (RMA: of the seed values)
+    weighted: float = 0.0              # WMA: sum of the window weighted 1 (oldest) .. length (newest)
+
+    def __post_init__(self):
+        if self.kind not in MOVING_AVERAGES:
+            raise ValueError(f"Unknown average {self.kind!r} (expected one of {', '.join(MOVING_AVERAGES)})")
+
+    def update(self, value: float) -> float:
+        """Fold in the next value and return the average through it (NaN values are skipped)"""
+        if math.isnan(value):
+            return self.value
+        self.count += 1
+        if self.kind == 'ema':
+            alpha = 2.0 / (self.length + 1)
+            self.value = value if self.count == 1 else alpha * value + (1 - alpha) * self.value
+        elif self.kind == 'rma':
+            if self.count <= self.length:
+                self.total += value
+                if self.count == self.length:
+                    self.value = self.total / self.length
+            else:
+                alpha = 1.0 / self.length
+                self.value = alpha * value + (1 - alpha) * self.value
+        else:
+            self._slide(value)
+        return self.value
+
+    def _slide(self, value: float):
+        length = self.length
+        if len(self.window) < length:
+            self.window.append(value)
+            self.total += value
+            self.weighted += len(self.window) * value
+        else:
+            oldest = self.window[self.head]
+            self.window[self.head] = value
+            self.head = (self.head + 1) % length
+            # Every weight drops by one (the oldest value's to zero) and the new value weighs `length`
+            self.weighted += length * value - self.total
+            self.total += value - oldest
+        if self.count % length == 0:
+            ordered = self.window[self.head:] + self.window[:self.head]
+            self.total = math.fsum(ordered)
+            self.weighted = math.fsum((index + 1) * item for index, item in enumerate(ordered))
+        if len(self.window) == length:
+            self.value = self.total / length if self.kind == 'sma' else self.weighted / (length * (length + 1) / 2)
+
+
+@dataclass
+class ATRState(StreamState):
+    """ta.atr fed one bar's high / low / close at a time"""
+    length: int = 14
+    previous_close: float = float('nan')
+    average: Optional[MovingAverageState] = None
+
+    def __post_init__(self):
+        if self.average is None:
+            self.average = MovingAverageState('rma', self.length)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        previous = self.previous_close
+        self.previous_close = close
+        if math.isnan(previous):
+            return self.average.update(high - low)
+        return self.average.update(max(high - low, abs(high - previous), abs(low - previous)))
+
+
+@dataclass
+class RSIState(StreamState):
+    """ta.rsi fed one close at a time"""
+    length: int = 14
+    previous_close: float = float('nan')
+    gains: Optional[MovingAverageState] = None
+    losses: Optional[MovingAverageState] = None
+
+    def __post_init__(self):
+        if self.gains is None:
+            self.gains = MovingAverageState('rma', self.length)
+            self.losses = MovingAverageState('rma', self.length)
+
+    def update(self, close: float) -> float:
+        change = close - self.previous_close
+        self.previous_close = close
+        gains = self.gains.update(max(change, 0.0) if not math.isnan(change) else change)
+        losses = self.losses.update(-min(change, 0.0) if not math.isnan(change) else change)
+        return float(_rsi_value(gains, losses))
+
+
+@dataclass
+class MACDState(StreamState):
+    """ta.macd fed one close at a time"""
+    fast: int = 12
+    slow: int = 26
+    signal: int = 9
+    averages: List[MovingAverageState] = field(default_factory=list)  # fast, slow, signal EMAs
+
+    def __post_init__(self):
+        if not self.averages:
+            self.averages = [MovingAverageState('ema', length) for length in (self.fast, self.slow, self.signal)]
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        """(MACD line, signal line, histogram)"""
+        fast, slow, signal = self.averages
+        line = fast.update(close) - slow.update(close)
+        signal_line = signal.update(line)
+        return line, signal_line, line - signal_line
+
+
+@dataclass
+class HullState(StreamState):
+    """Hull Suite's HULL line fed one value at a time, with its trend"""
+    length: int = 55
+    mode: str = 'Hma'
+    averages: List[MovingAverageState] = field(default_factory=list)  # inner averages, then the smoothing pass
+    recent: List[float] = field(default_factory=list)  # HULL, HULL[1], HULL[2]
+
+    def __post_init__(self):
+        if not self.averages:
+            kind, lengths = _hull_averages(self.mode, self.length)
+            self.averages = [MovingAverageState(kind, length) for length in lengths]
+
+    def update(self, value: float) -> float:
+        parts = [average.update(value) for average in self.averages[:-1]]
+        current = self.averages[-1].update(_hull_blend(self.mode, parts))
+        self.recent = [current] + self.recent[:2]
+        return current
+
+    @property
+    def value(self) -> float:
+        return self.recent[0] if self.recent else float('nan')
+
+    @property
+    def previous(self) -> float:
+        return self.recent[1] if len(self.recent) > 1 else float('nan')
+
+    @property
+    def trend(self) -> int:
+        """hull_trend() at the latest bar"""
+        return int(hull_trend(self.value, self.recent[2] if len(self.recent) > 2 else float('nan')))
+
+
+@dataclass
+class StackTrendState(StreamState):
+    """stack_trend() fed one close at a time"""
+    ema_lengths: Tuple[int, ...] = STACK_EMA_LENGTHS
+    sma_lengths: Tuple[int, ...] = ()
+    averages: List[MovingAverageState] = field(default_factory=list)  # the EMAs, then the SMAs
+
+    def __post_init__(self):
+        if not self.averages:
+            self.averages = ([MovingAverageState('ema', length) for length in self.ema_lengths]
+                             + [MovingAverageState('sma', length) for length in self.sma_lengths])
+
+    def update(self, close: float) -> Tuple[int, int]:
+        """(trend status, full alignment) through this close"""
+        values = [average.update(close) for average in self.averages]
+        emas, smas = values[:len(self.ema_lengths)], values[len(self.ema_lengths):]
+        return int(trend_status(close, *emas[:3])), int(full_alignment(emas, smas))
+
+
+@dataclass
+class AdvancedTrendState(StreamState):
+    """advanced_trend() fed one close at a time"""
+    settings: AdvancedTrendSettings = field(default_factory=AdvancedTrendSettings)
+    hull: Optional[HullState] = None
+    averages: List[MovingAverageState] = field(default_factory=list)  # MA1, MA2, MA3
+    rsi: Optional[RSIState] = None
+    macd: Optional[MACDState] = None
+    previous: List[float] = field(default_factory=lambda: [float('nan')] * 3)  # close, HULL, MA1 one bar back
+
+    def __post_init__(self):
+        settings = self.settings
+        if self.hull is None:
+            self.hull = HullState(settings.hull_length, settings.hull_mode)
+            self.averages = [MovingAverageState(kind, length) for kind, length in settings.averages]
+            self.rsi = RSIState(settings.rsi_length)
+            self.macd = MACDState(settings.macd_fast, settings.macd_slow, settings.macd_signal)
+
+    def update(self, close: float) -> Dict:
+        """hull, hull_trend, ma_trend and the four alerts through this close"""
+        hull_value = self.hull.update(close)
+        ma1, ma2, ma3 = (average.update(close) for average in self.averages)
+        line, signal_line, _ = self.macd.update(close)
+        previous_close, previous_hull, previous_ma1 = self.previous
+        readings = self.settings.alerts(close, previous_close, hull_value, previous_hull, ma1, previous_ma1, ma2, ma3,
+                                        self.rsi.update(close), line, signal_line)
+        self.previous = [close, hull_value, ma1]
+        return {'hull': hull_value, 'hull_trend': self.hull.trend,
+                **{name: (int(value) if name == 'ma_trend' else bool(value)) for name, value in readings.items()}}
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo Equity Simulation
+Distribution of equity paths, drawdowns and loss-limit hits from the closed
+positions' Net PNL, instead of only the one path that was realized.
+
+Two resampling schemes, each SIMULATION_PATHS paths as long as the realized
+history:
+
+- 'Bootstrap': positions drawn with replacement (a different mix of the same
+  kind of trades)
+- 'Shuffle': the realized positions in a random order (same final PNL, a
+  different sequence of wins and losses)
+
+Paths are generated in batches of at most MAX_BATCH_ELEMENTS positions
+(draws, cumulative equity and running peak are the only full-size arrays),
+so memory stays bounded however many paths are asked for. Only the equity at
+up to BAND_POINTS evenly spaced position counts is kept per path (float32),
+which is what the percentile bands are computed from. Generators are seeded
+from SIMULATION_SEED, so the same positions always give the same results.
+
+Equity starts at 0. A path's drawdown is measured from its running peak (the
+start counts as a peak); it is ruined at a loss limit L once its equity
+falls to -L or below.
+"""
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+SIMULATION_PATHS = 100_000
+SIMULATION_SEED = 20250918
+MAX_BATCH_ELEMENTS = 2_000_000
+BAND_POINTS = 101
+BAND_PERCENTILES = [5, 25, 50, 75, 95]
+METHODS = ['Bootstrap', 'Shuffle']
+
+# Loss limits tried, as multiples of the realized max drawdown
+LOSS_LIMIT_MULTIPLES = [0.5, 1.0, 1.5, 2.0, 3.0]
+
+BAND_COLUMNS = ['Method', 'Positions'] + [f'P{percentile}' for percentile in BAND_PERCENTILES] + ['Realized']
+RISK_COLUMNS = ['Method', 'Metric', 'Loss Limit', 'Value']
+
+
+def max_drawdown(equity: np.ndarray) -> np.ndarray:
+    """Largest drop from the running peak (starting at 0) along the last axis"""
+    peak = np.maximum.accumulate(np.maximum(equity, 0), axis=-1)
+    return (peak - equity).max(axis=-1)
+
+
+def band_steps(positions: int, points: int = BAND_POINTS) -> np.ndarray:
+    """Position counts (0..positions) the bands are reported at"""
+    return np.unique(np.linspace(0, positions, min(points, positions + 1)).round().astype(int))
+
+
+def simulate(pnl: np.ndarray, method: str, paths: int = SIMULATION_PATHS, seed: int = SIMULATION_SEED,
+             steps: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """Equity at `steps` (steps x paths), final equity, max drawdown and lowest equity of every path"""
+    n = len(pnl)
+    steps = band_steps(n) if steps is None else steps
+    rng = np.random.default_rng([seed, METHODS.index(method)])
+    batch = max(1, MAX_BATCH_ELEMENTS // max(n, 1))
+
+    # Step-major, so each step's percentiles work over contiguous memory
+    at_steps = np.empty((len(steps), paths), dtype=np.float32)
+    final = np.empty(paths)
+    drawdown = np.empty(paths)
+    lowest = np.empty(paths)
+    for start in range(0, paths, batch):
+        size = min(batch, paths - start)
+        if method == 'Bootstrap':
+            draws = pnl[rng.integers(0, n, size=(size, n))]
+        else:
+            draws = rng.permuted(np.broadcast_to(pnl, (size, n)), axis=1)
+        equity = np.cumsum(draws, axis=1)
+        del draws
+
+        rows = slice(start, start + size)
+        # Step 0 is the starting equity, before any position
+        at_steps[:, rows] = np.concatenate([np.zeros((size, 1)), equity], axis=1)[:, steps].T
+        final[rows] = equity[:, -1]
+        drawdown[rows] = max_drawdown(equity)
+        lowest[rows] = np.minimum(equity.min(axis=1), 0)
+    return {'at_steps': at_steps, 'final': final, 'drawdown': drawdown, 'lowest': lowest}
+
+
+def loss_limits(realized_drawdown: float, pnl: np.ndarray, extra: Sequence[float] = ()) -> list:
+    """Loss limits to report: multiples of the realized max drawdown plus any given ones"""
+    base = realized_drawdown
+    if base <= 0:
+        # Never drew down: scale from the average loss, or a single unit
+        losses = -pnl[pnl < 0]
+        base = losses.mean() if len(losses) else 1.0
+    limits = [round(base * multiple, 2) for multiple in LOSS_LIMIT_MULTIPLES]
+    return sorted(set(limits) | {round(float(limit), 2) for limit in extra if limit > 0})
+
+
+def simulate_positions(positions: pd.DataFrame, paths: int = SIMULATION_PATHS, seed: int = SIMULATION_SEED,
+                       extra_loss_limits: Sequence[float] = ()) -> Dict[str, pd.DataFrame]:
+    """Equity percentile bands and drawdown / risk-of-ruin table for closed positions
+
+    `positions` needs Net PNL and Close Date; the realized path is the
+    positions in closing order. Returns {'bands': ..., 'risk': ...}, empty
+    frames when there are no positions.
+    """
+    if positions.empty:
+        return {'bands': pd.DataFrame(columns=BAND_COLUMNS), 'risk': pd.DataFrame(columns=RISK_COLUMNS)}
+
+    pnl = positions.sort_values('Close Date')['Net PNL'].to_numpy(dtype='float64')
+    n = len(pnl)
+    steps = band_steps(n)
+    realized = np.concatenate([[0.0], np.cumsum(pnl)])
+    realized_drawdown = float(max_drawdown(realized[1:]))
+    limits = loss_limits(realized_drawdown, pnl, extra_loss_limits)
+
+    bands = []
+    risk = []
+    for method in METHODS:
+        result = simulate(pnl, method, paths, seed, steps)
+        percentiles = np.percentile(result['at_steps'], BAND_PERCENTILES, axis=1)
+        band = pd.DataFrame(percentiles.T.round(2), columns=BAND_COLUMNS[2:-1])
+        band.insert(0, 'Positions', steps)
+        band.insert(0, 'Method', method)
+        band['Realized'] = realized[steps].round(2)
+        bands.append(band)
+
+        final_low, final_median, final_high = np.percentile(result['final'], [5, 50, 95])
+        drawdown_median, drawdown_high, drawdown_extreme = np.percentile(result['drawdown'], [50, 95, 99])
+        metrics = [
+            ('Paths', None, paths),
+            ('Positions', None, n),
+            ('Final PNL P5', None, final_low),
+            ('Final PNL P50', None, final_median),
+            ('Final PNL P95', None, final_high),
+            ('Probability of Loss %', None, (result['final'] < 0).mean() * 100),
+            ('Max Drawdown P50', None, drawdown_median),
+            ('Max Drawdown P95', None, drawdown_high),
+            ('Max Drawdown P99', None, drawdown_extreme),
+            ('Realized Max Drawdown', None, realized_drawdown),
+        ]
+        # Per loss limit: chance of a drawdown that deep, and of equity falling that far below the start
+        for limit in limits:
+            metrics.append(('Drawdown Probability %', limit, (result['drawdown'] >= limit).mean() * 100))
+            metrics.append(('Ruin Probability %', limit, (result['lowest'] <= -limit).mean() * 100))
+        risk.extend((method, metric, limit, round(float(value), 2)) for metric, limit, value in metrics)
+
+    return {'bands': pd.concat(bands, ignore_index=True), 'risk': pd.DataFrame(risk, columns=RISK_COLUMNS)}
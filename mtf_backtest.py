@@ -0,0 +1,985 @@
+#!/usr/bin/env python3
+"""
+MTF EMA Backtest
+Python backtest and parameter sweep for the two EMA-trend strategies, on the
+local candle store instead of TradingView's one-setting-at-a-time tester:
+
+    cross  mtf_ema_strategy.pine - price crosses the higher-timeframe EMA50
+           toward the EMA200; stop beyond the last pivot (+ ATR buffer),
+           optional 50% partial at 2R, exit when price reaches the EMA200.
+    trend  mtf_ema_trend_compound.pine - EMA1 > EMA2 > EMA3 > EMA4 (or the
+           reverse) with spacing, entry on a retest of the entry EMA, stop
+           at a pivot / ATR / EMA, TP1 / TP2 / TP3 partials with the stop
+           moved to breakeven and then to TP1, exit on the EMA1/EMA2 cross.
+
+Inputs and defaults mirror the scripts' (see CrossSettings / TrendSettings).
+Indicators follow Pine's definitions (ta.ema, ta.rma-based ta.atr / ta.rsi,
+ta.pivothigh / ta.pivotlow, request.security without lookahead: a higher
+timeframe value reaches the chart once its bar has closed).
+
+Fills follow the strategy tester on historical bars: orders decided on a
+bar's close fill at the next bar's open (entries, EMA exits, the compound
+script's TP stages); stop and limit orders fill inside the bar at their
+price, or at the open when it gaps through. When a bar reaches both a stop
+and a limit, the side nearer the open is taken to print first, as the
+tester assumes. Intrabar fills are stamped mid-bar.
+
+Entry conditions are computed vectorized over the whole history. Only the
+path-dependent part (one position at a time, cooldowns, retest flags used
+up by an entry, risk scaling) runs per trade, and each trade's exit is found
+with vectorized scans of the bars ahead.
+
+A sweep runs every combination of --grid values (EMA lengths, stop method,
+ATR multipliers, ...) on every symbol in a process pool. Workers read the
+same memory-mapped store files, so the price arrays are shared through the
+page cache rather than copied per process, and each worker caches the
+indicators of the symbol it is on. Combinations are ranked by net PNL; the
+best one's trades can be written in the analyzer's normalized ledger schema
+(Date, Broker='Backtest', Asset, Side, Type, Quantity, Price, PNL, Fee, ...)
+or run through the analyzer's report like live trades.
+
+Not ported: the compound script's per-EMA on/off toggles (all four EMAs are
+used), orderflow / volatility filters and add-on positions, and both
+scripts' chart drawing and alerts.
+
+Usage:
+    python mtf_backtest.py trend --symbols BTCUSDT --grid ema1_length=20,50 stop_method=Pivot,ATR
+    python mtf_backtest.py cross --set confirmation_bars=1 --trades backtest_trades.csv --report backtest_report.xlsx
+"""
+
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields, replace
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from atomic_io import atomic_output_path
+from candle_store import DEFAULT_CANDLES_DIR, CandleLibrary, CandleStore, timeframe_seconds
+from indicators import atr, ema, rsi, shifted, sma
+from run_log import event, get_logger, run_logging
+
+BROKER = 'Backtest'
+# Exit scans look this many bars ahead first, doubling until an exit turns up
+SEARCH_WINDOW = 512
+# Maker / taker fees (%) per platform, from mtf_ema_strategy.pine
+FEE_PLATFORMS = {
+    'Breakout': (0.035, 0.035),
+    'Edgex': (0.015, 0.038),
+    'Blofin': (0.02, 0.06),
+    'Bybit': (0.02, 0.055),
+    'HyperLiquid': (0.015, 0.045),
+}
+LEDGER_COLUMNS = ['Broker', 'Asset', 'Date', 'Side', 'Type', 'Quantity', 'Price', 'PNL', 'Fee', 'Funding',
+                  'Leverage', 'Order_Options', 'Fingerprint']
+
+log = get_logger('backtest')
+
+
+# ----------------------------------------------------------------------------
+# Series helpers (the averages, ATR and RSI are in indicators.py)
+# ----------------------------------------------------------------------------
+
+def last_pivots(values: np.ndarray, left: int, right: int, highs: bool) -> np.ndarray:
+    """Latest confirmed ta.pivothigh / ta.pivotlow value at every bar (NaN before the first)
+
+    A pivot beats the `left` bars before it and is not beaten by the `right`
+    bars after it; it is known `right` bars after it prints.
+    """
+    values = np.asarray(values, dtype='float64')
+    n, width = len(values), left + right + 1
+    result = np.full(n, np.nan)
+    if n < width:
+        return result
+    windows = sliding_window_view(values, width) if highs else -sliding_window_view(values, width)
+    center = windows[:, left]
+    is_pivot = np.ones(len(center), dtype=bool)
+    if left:
+        is_pivot &= center > windows[:, :left].max(axis=1)
+    if right:
+        is_pivot &= center >= windows[:, left + 1:].max(axis=1)
+    confirmed = np.full(n, -1)
+    at = np.flatnonzero(is_pivot) + width - 1
+    confirmed[at] = at
+    confirmed = np.maximum.accumulate(confirmed)
+    known = confirmed >= 0
+    result[known] = values[confirmed[known] - right]
+    return result
+
+
+def run_length(mask: np.ndarray) -> np.ndarray:
+    """Consecutive True values ending at each bar"""
+    index = np.arange(len(mask))
+    return index - np.maximum.accumulate(np.where(mask, -1, index))
+
+
+def last_index(mask: np.ndarray) -> np.ndarray:
+    """Index of the latest True value at or before each bar (-1 before the first)"""
+    return np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+
+
+def armed_since(set_mask: np.ndarray, reset_mask: np.ndarray) -> np.ndarray:
+    """For a flag that set_mask raises and reset_mask clears: the bar that raised it, or -1 while down"""
+    last_set = last_index(set_mask)
+    return np.where(last_set > last_index(reset_mask), last_set, -1)
+
+
+class BarData:
+    """One symbol's chart bars plus the indicator series computed on them so far"""
+
+    def __init__(self, store: CandleStore, symbol: str, timeframe: str):
+        self.store = store
+        self.symbol = symbol
+        self.timeframe = timeframe
+        candles = store.candles(symbol, timeframe)
+        if candles is None or not len(candles):
+            raise KeyError(f"No {timeframe} bars for {symbol}")
+        self.candles = candles
+        self.seconds = candles.seconds
+        self.bar_seconds = timeframe_seconds(timeframe)
+        self.open, self.high, self.low = candles.open, candles.high, candles.low
+        self.close, self.volume = candles.close, candles.volume
+        self._series: Dict[Tuple, np.ndarray] = {}
+
+    def __len__(self):
+        return len(self.close)
+
+    def series(self, key: Tuple, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        if key not in self._series:
+            self._series[key] = compute()
+        return self._series[key]
+
+    def ema(self, length: int) -> np.ndarray:
+        return self.series(('ema', length), lambda: ema(self.close, length))
+
+    def atr(self, length: int) -> np.ndarray:
+        return self.series(('atr', length), lambda: atr(self.high, self.low, self.close, length))
+
+    def rsi(self, length: int) -> np.ndarray:
+        return self.series(('rsi', length), lambda: rsi(self.close, length))
+
+    def pivots(self, left: int, right: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(last pivot high, last pivot low)"""
+        return (self.series(('pivot_high', left, right), lambda: last_pivots(self.high, left, right, True)),
+                self.series(('pivot_low', left, right), lambda: last_pivots(self.low, left, right, False)))
+
+    def higher(self, timeframe: str, kind: str, length: int) -> np.ndarray:
+        """An SMA / EMA of `timeframe` closes as seen on each chart bar (request.security, no lookahead)"""
+        def compute():
+            bars = self.store.candles(self.symbol, timeframe)
+            values = (ema if kind == 'ema' else sma)(bars.close, length)
+            ends = bars.seconds + timeframe_seconds(timeframe)
+            # The latest higher-timeframe bar that had closed by the end of each chart bar
+            index = np.searchsorted(ends, self.seconds + self.bar_seconds, side='right') - 1
+            return np.where(index >= 0, values[np.maximum(index, 0)], np.nan)
+        return self.series(('higher', timeframe, kind, length), compute)
+
+    def bars_for_hours(self, hours: float) -> int:
+        """Pine's int(hours * bars per hour) on the chart timeframe"""
+        return int(hours / (self.bar_seconds / 3600))
+
+
+# ----------------------------------------------------------------------------
+# Strategies
+# ----------------------------------------------------------------------------
+
+class Target(NamedTuple):
+    """A profit target at `rr` times the initial risk"""
+    rr: float
+    fraction: float            # of the position still open
+    limit: bool                # True: resting limit order; False: closed at the next open once reached
+    label: str
+    stop_rr: Optional[float] = None   # move the stop here (in R from entry) once taken
+    stop_label: str = 'SL'
+
+
+@dataclass
+class SignalPlan:
+    """A strategy's entry and exit conditions over every chart bar"""
+    long_entry: np.ndarray     # entry allowed at this bar's close if flat (path-independent conditions)
+    short_entry: np.ndarray
+    long_stop: np.ndarray      # initial stop for an entry at this bar
+    short_stop: np.ndarray
+    exit_long: np.ndarray      # close the position at the next open
+    exit_short: np.ndarray
+    exit_label: str
+    targets: List[Target]
+    cooldown_bars: int = 0     # bars after an exit before the next entry
+    cooldown_losses_only: bool = False
+    # Bar of the retest that armed an entry; it must come after the previous entry
+    long_retest: Optional[np.ndarray] = None
+    short_retest: Optional[np.ndarray] = None
+
+
+@dataclass(frozen=True)
+class CrossSettings:
+    """mtf_ema_strategy.pine inputs"""
+    timeframe: str = '1m'              # chart timeframe, one below the signal timeframe
+    higher_timeframe: str = '5m'
+    ema_fast: int = 50
+    ema_slow: int = 200
+    pivot_left: int = 5
+    pivot_right: int = 2
+    use_atr_buffer: bool = True
+    atr_buffer_mult: float = 0.5
+    atr_length: int = 14
+    risk_amount: float = 50.0
+    include_fees: bool = True
+    fee_platform: str = 'Breakout'
+    limit_entry: bool = False
+    direction: str = 'Both'
+    ema_target: bool = True            # exit when price reaches the EMA200
+    min_rr: float = 1.0
+    partial_at_2r: bool = False
+    partial_percent: float = 50.0
+    confirmation_bars: int = 2         # 0 = off; the script's cross bar itself counts as one
+    min_ema_distance: float = 0.15     # % beyond the EMA50, 0 = off
+    use_rsi_filter: bool = True
+    rsi_length: int = 14
+    rsi_long_min: float = 50.0
+    rsi_short_max: float = 50.0
+    cooldown_bars: int = 10            # after a losing trade, 0 = off
+    commission_pct: float = 0.07       # the script's strategy() commission
+
+    @property
+    def timeframes(self) -> List[str]:
+        return [self.timeframe, self.higher_timeframe]
+
+    @property
+    def base_risk(self) -> float:
+        return self.risk_amount
+
+    @property
+    def fee_rate(self) -> float:
+        """Entry + exit fee as a fraction of price, for sizing"""
+        maker, taker = FEE_PLATFORMS[self.fee_platform]
+        return ((maker if self.limit_entry else taker) + taker) / 100
+
+    def quantity(self, price: float, stop: float, multiplier: float) -> float:
+        risk = abs(price - stop) + (price * self.fee_rate if self.include_fees else 0.0)
+        return self.risk_amount / risk if risk > 0 else 0.0
+
+    def next_multiplier(self, multiplier: float, profit: float) -> float:
+        return multiplier
+
+    def plan(self, data: BarData) -> SignalPlan:
+        close = data.close
+        fast = data.higher(self.higher_timeframe, 'ema', self.ema_fast)
+        slow = data.higher(self.higher_timeframe, 'ema', self.ema_slow)
+        previous_close, previous_fast = shifted(close), shifted(fast)
+        with np.errstate(invalid='ignore'):
+            bullish_cross = (previous_close < previous_fast) & (close > fast)
+            bearish_cross = (previous_close > previous_fast) & (close < fast)
+
+            confirmed_long = run_length(close > fast) >= self.confirmation_bars if self.confirmation_bars else True
+            confirmed_short = run_length(close < fast) >= self.confirmation_bars if self.confirmation_bars else True
+            distance_ok = (np.abs((close - fast) / fast * 100) >= self.min_ema_distance
+                           if self.min_ema_distance > 0 else True)
+            if self.use_rsi_filter:
+                strength = data.rsi(self.rsi_length)
+                momentum_long, momentum_short = strength >= self.rsi_long_min, strength <= self.rsi_short_max
+            else:
+                momentum_long = momentum_short = True
+
+            pivot_high, pivot_low = data.pivots(self.pivot_left, self.pivot_right)
+            buffer = data.atr(self.atr_length) * self.atr_buffer_mult if self.use_atr_buffer else 0.0
+            long_stop, short_stop = pivot_low - buffer, pivot_high + buffer
+            long_risk, short_risk = close - long_stop, short_stop - close
+            long_rr = np.where(long_risk > 0, (slow - close) / np.where(long_risk > 0, long_risk, 1.0), 0.0)
+            short_rr = np.where(short_risk > 0, (close - slow) / np.where(short_risk > 0, short_risk, 1.0), 0.0)
+
+            long_entry = (bullish_cross & (fast < slow) & ~np.isnan(pivot_low) & (long_rr >= self.min_rr)
+                          & confirmed_long & distance_ok & momentum_long & (self.direction in ('Long', 'Both')))
+            short_entry = (bearish_cross & (fast > slow) & ~np.isnan(pivot_high) & (short_rr >= self.min_rr)
+                           & confirmed_short & distance_ok & momentum_short & (self.direction in ('Short', 'Both')))
+            if self.ema_target:
+                exit_long = (close >= slow) & (previous_close < slow)
+                exit_short = (close <= slow) & (previous_close > slow)
+            else:
+                exit_long = exit_short = np.zeros(len(close), dtype=bool)
+
+        targets = [Target(2.0, self.partial_percent / 100, True, 'Partial 2R')] if self.partial_at_2r else []
+        # bars_since_stop reaches 1 on the exit bar itself, so entries resume cooldown_bars - 1 bars later
+        return SignalPlan(long_entry, short_entry, long_stop, short_stop, exit_long, exit_short, 'TP: EMA200',
+                          targets, max(self.cooldown_bars - 1, 0), cooldown_losses_only=True)
+
+
+@dataclass(frozen=True)
+class TrendSettings:
+    """mtf_ema_trend_compound.pine inputs"""
+    timeframe: str = '1m'
+    ema1_length: int = 50
+    ema2_length: int = 100
+    ema3_length: int = 200
+    ema4_length: int = 1000
+    require_all_aligned: bool = True
+    min_spacing_1: float = 0.1         # % between EMA1 and EMA2
+    min_spacing_2: float = 0.1         # % between EMA3 and EMA4
+    entry_ema: int = 2
+    cross_method: str = 'Wick'         # 'Wick' or 'Close'
+    persistent_retest: bool = True
+    stop_method: str = 'Pivot'         # 'Pivot', 'ATR' or 'EMA'
+    pivot_left: int = 5
+    pivot_right: int = 1
+    atr_length: int = 14
+    atr_multiplier: float = 1.0
+    stop_ema: int = 3
+    min_stop_pct: float = 0.2
+    max_stop_pct: float = 10.0
+    account_size: float = 100000.0
+    leverage: float = 5.0
+    risk_in_dollars: bool = False
+    risk_dollars: float = 1000.0
+    risk_pct: float = 1.0
+    max_position_pct: float = 90.0
+    use_risk_scaling: bool = True
+    risk_scale_multiplier: float = 1.5
+    max_risk_multiplier: float = 2.5
+    profit_mode: str = 'Advanced'      # 'Basic': one TP; 'Advanced': TP1 / TP2 / TP3
+    basic_tp_rr: float = 3.0
+    tp1_rr: float = 3.0
+    tp2_rr: float = 5.0
+    tp3_rr: float = 10.0
+    tp1_pct: float = 40.0
+    tp2_pct: float = 30.0
+    move_to_be: bool = True
+    exit_on_ema_cross: bool = True
+    direction: str = 'Both'
+    use_1h_filter: bool = True
+    h1_ma_length: int = 100
+    use_4h_filter: bool = False
+    h4_ema_length: int = 200
+    use_htf_cooldown: bool = True
+    htf_cooldown_hours: float = 12.0
+    htf_cooldown_touch: bool = True    # False: only a close across the level counts
+    use_ema_order_filter: bool = True
+    ema_order_count: int = 3
+    use_cvd_filter: bool = True
+    cvd_length: int = 100
+    use_rsi_filter: bool = True
+    rsi_length: int = 14
+    rsi_long_min: float = 30.0
+    rsi_long_max: float = 60.0
+    rsi_short_min: float = 30.0
+    rsi_short_max: float = 60.0
+    use_macd_filter: bool = True
+    macd_fast: int = 9
+    macd_slow: int = 26
+    macd_signal: int = 9
+    use_trend_time_filter: bool = True
+    trend_min_hours: float = 12.0
+    trend_check_separation: bool = True
+    use_post_trade_cooldown: bool = True
+    post_trade_hours: float = 4.0
+    commission_pct: float = 0.0        # the script sets none
+
+    @property
+    def timeframes(self) -> List[str]:
+        return [self.timeframe] + (['1h'] if self.use_1h_filter else []) + (['4h'] if self.use_4h_filter else [])
+
+    @property
+    def base_risk(self) -> float:
+        return self.risk_dollars if self.risk_in_dollars else self.account_size * self.risk_pct / 100
+
+    def quantity(self, price: float, stop: float, multiplier: float) -> float:
+        risk = abs(price - stop)
+        if risk <= 0:
+            return 0.0
+        ideal = self.base_risk * (multiplier if self.use_risk_scaling else 1.0) / risk
+        # Capped by buying power, which lowers the real risk below target
+        return min(ideal, self.account_size * self.leverage * self.max_position_pct / 100 / price)
+
+    def next_multiplier(self, multiplier: float, profit: float) -> float:
+        """Risk scaling: up after each winning (partial) close, back to 1x after any other"""
+        if not self.use_risk_scaling:
+            return multiplier
+        return min(multiplier * self.risk_scale_multiplier, self.max_risk_multiplier) if profit > 0 else 1.0
+
+    @property
+    def targets(self) -> List[Target]:
+        if self.profit_mode == 'Basic':
+            return [Target(self.basic_tp_rr, 1.0, True, f"TP @ {self.basic_tp_rr:g}:1")]
+        return [Target(self.tp1_rr, self.tp1_pct / 100, False, f"TP1 @ {self.tp1_rr:g}:1",
+                       0.0 if self.move_to_be else None, 'BE/SL'),
+                Target(self.tp2_rr, self.tp2_pct / 100, False, f"TP2 @ {self.tp2_rr:g}:1", self.tp1_rr, 'TP1 Stop'),
+                Target(self.tp3_rr, 1.0, False, f"TP3 @ {self.tp3_rr:g}:1")]
+
+    def plan(self, data: BarData) -> SignalPlan:
+        close = data.close
+        emas = [data.ema(length) for length in (self.ema1_length, self.ema2_length, self.ema3_length, self.ema4_length)]
+        ema1, ema2, ema3, ema4 = emas
+        n = len(close)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            bullish_alignment = (ema1 > ema2) & (ema2 > ema3) & (ema3 > ema4)
+            bearish_alignment = (ema1 < ema2) & (ema2 < ema3) & (ema3 < ema4)
+            spacing_ok = ((np.abs(ema1 - ema2) / ema2 * 100 >= self.min_spacing_1)
+                          & (np.abs(ema3 - ema4) / ema4 * 100 >= self.min_spacing_2))
+            if self.require_all_aligned:
+                bullish_trend, bearish_trend = bullish_alignment & spacing_ok, bearish_alignment & spacing_ok
+            else:
+                bullish_trend = (ema1 > ema2) & (ema2 > ema3)
+                bearish_trend = (ema1 < ema2) & (ema2 < ema3)
+
+            long_retest, short_retest = self._retests(data, emas[self.entry_ema - 1], bullish_alignment,
+                                                      bearish_alignment, bullish_trend, bearish_trend)
+            filters_long, filters_short = self._filters(data, emas)
+            long_stop, short_stop = self._stops(data, emas)
+
+        return SignalPlan(
+            long_entry=bullish_trend & filters_long & (self.direction in ('Long', 'Both')) & ~np.isnan(long_stop),
+            short_entry=bearish_trend & filters_short & (self.direction in ('Short', 'Both')) & ~np.isnan(short_stop),
+            long_stop=long_stop, short_stop=short_stop,
+            exit_long=(ema1 < ema2) if self.exit_on_ema_cross else np.zeros(n, dtype=bool),
+            exit_short=(ema1 > ema2) if self.exit_on_ema_cross else np.zeros(n, dtype=bool),
+            exit_label='EMA Cross Exit', targets=self.targets,
+            cooldown_bars=data.bars_for_hours(self.post_trade_hours) if self.use_post_trade_cooldown else 0,
+            long_retest=long_retest, short_retest=short_retest)
+
+    def _retests(self, data: BarData, level: np.ndarray, bullish_alignment, bearish_alignment,
+                 bullish_trend, bearish_trend) -> Tuple[np.ndarray, np.ndarray]:
+        """Bars whose retest of the entry EMA is still armed (the script's had_long/short_retest)"""
+        close, high, low = data.close, data.high, data.low
+        # Persistent mode keeps a retest while the EMAs stay aligned; strict mode needs the whole trend
+        allow_long = bullish_alignment if self.persistent_retest else bullish_trend
+        allow_short = bearish_alignment if self.persistent_retest else bearish_trend
+        if self.cross_method == 'Wick':
+            # Wick through the EMA that closes back on the trend side arms it; a close through it disarms
+            set_long = (low < level) & (close >= level) & allow_long
+            set_short = (high > level) & (close <= level) & allow_short
+            long_retest = armed_since(set_long, ~set_long & ((close < level) | ~allow_long))
+            short_retest = armed_since(set_short, ~set_short & ((close > level) | ~allow_short))
+        else:
+            # Close beyond the EMA (the dip), then the first close back (the cross) arms it
+            long_retest = self._close_retest(close < level, close > level, allow_long)
+            short_retest = self._close_retest(close > level, close < level, allow_short)
+        if not self.persistent_retest:
+            # Strict mode drops a retest the moment entry conditions fail, so only its own bar can enter
+            index = np.arange(len(close))
+            long_retest = np.where(long_retest == index, long_retest, -1)
+            short_retest = np.where(short_retest == index, short_retest, -1)
+        return long_retest, short_retest
+
+    @staticmethod
+    def _close_retest(beyond: np.ndarray, back: np.ndarray, allow: np.ndarray) -> np.ndarray:
+        dips = beyond & allow
+        before = lambda mask: shifted(last_index(mask), fill=-1)
+        crosses = back & allow & (before(dips) > np.maximum(before(back), before(~allow)))
+        return armed_since(crosses, dips | ~allow)
+
+    def _filters(self, data: BarData, emas: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Every enabled entry filter, for longs and shorts"""
+        close, high, low = data.close, data.high, data.low
+        ema1, ema2, ema3 = emas[:3]
+        long_ok = np.ones(len(close), dtype=bool)
+        short_ok = np.ones(len(close), dtype=bool)
+
+        h1_ma = data.higher('1h', 'sma', self.h1_ma_length) if self.use_1h_filter else None
+        h4_ema = data.higher('4h', 'ema', self.h4_ema_length) if self.use_4h_filter else None
+        if h1_ma is not None and h4_ema is not None:
+            long_ok &= (close > h1_ma) & (close > h4_ema) & (h1_ma > h4_ema)
+            short_ok &= (close < h1_ma) & (close < h4_ema) & (h1_ma < h4_ema)
+        elif h1_ma is not None or h4_ema is not None:
+            reference = h1_ma if h1_ma is not None else h4_ema
+            long_ok &= close > reference
+            short_ok &= close < reference
+
+        if self.use_ema_order_filter and (h1_ma is not None or h4_ema is not None):
+            reference = h1_ma if h1_ma is not None else h4_ema
+            checked = emas[:max(1, min(self.ema_order_count, 4))]
+            for index, value in enumerate(checked):
+                long_ok &= value > reference
+                short_ok &= value < reference
+                if index:
+                    long_ok &= checked[index - 1] > value
+                    short_ok &= checked[index - 1] < value
+
+        if self.use_htf_cooldown and (h1_ma is not None or h4_ema is not None):
+            cooldown = data.bars_for_hours(self.htf_cooldown_hours)
+            index = np.arange(len(close))
+            for level in (h1_ma, h4_ema):
+                if level is None:
+                    continue
+                if self.htf_cooldown_touch:
+                    interaction = (low <= level) & (high >= level)
+                else:
+                    previous_close, previous_level = shifted(close), shifted(level)
+                    interaction = (((close > level) & (previous_close <= previous_level))
+                                   | ((close < level) & (previous_close >= previous_level)))
+                last = last_index(interaction)
+                ready = np.where(last >= 0, index - last, index + 99999) >= cooldown
+                long_ok &= ready
+                short_ok &= ready
+
+        if self.use_cvd_filter:
+            cvd = np.cumsum(np.sign(np.diff(close, prepend=close[0])) * data.volume)
+            earlier = shifted(cvd, self.cvd_length)
+            long_ok &= cvd > earlier
+            short_ok &= cvd < earlier
+
+        if self.use_rsi_filter:
+            strength = data.rsi(self.rsi_length)
+            long_ok &= (strength >= self.rsi_long_min) & (strength <= self.rsi_long_max)
+            short_ok &= (strength >= self.rsi_short_min) & (strength <= self.rsi_short_max)
+
+        if self.use_macd_filter:
+            line = data.series(('macd', self.macd_fast, self.macd_slow),
+                               lambda: data.ema(self.macd_fast) - data.ema(self.macd_slow))
+            signal = data.series(('macd_signal', self.macd_fast, self.macd_slow, self.macd_signal),
+                                 lambda: ema(line, self.macd_signal))
+            long_ok &= line > signal
+            short_ok &= line < signal
+
+        if self.use_trend_time_filter:
+            required = data.bars_for_hours(self.trend_min_hours)
+            bullish_bars = run_length((ema1 > ema2) & (ema2 > ema3))
+            bearish_bars = run_length((ema1 < ema2) & (ema2 < ema3))
+            long_ok &= bullish_bars >= required
+            short_ok &= bearish_bars >= required
+            if self.trend_check_separation:
+                # EMA1-EMA2 spacing no narrower than 95% of up to 10 bars back; the script measures
+                # that window with the bullish count for both sides, so shorts always pass
+                spacing = np.abs(ema1 - ema2)
+                lookback = np.minimum(10, bullish_bars)
+                back = np.arange(len(close)) - lookback
+                separating = (lookback == 0) | ((back >= 0) & (spacing >= spacing[np.maximum(back, 0)] * 0.95))
+                long_ok &= separating
+                short_ok &= separating
+        return long_ok, short_ok
+
+    def _stops(self, data: BarData, emas: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Initial stops, NaN where the stop is missing, on the wrong side or outside the distance limits"""
+        close = data.close
+        if self.stop_method == 'ATR':
+            distance = data.atr(self.atr_length) * self.atr_multiplier
+            long_stop, short_stop = close - distance, close + distance
+        elif self.stop_method == 'EMA':
+            long_stop = short_stop = emas[self.stop_ema - 1]
+        else:
+            short_stop, long_stop = data.pivots(self.pivot_left, self.pivot_right)
+        low_limit, high_limit = close * self.min_stop_pct / 100, close * self.max_stop_pct / 100
+        long_risk, short_risk = close - long_stop, short_stop - close
+        long_valid = (long_stop < close) & (long_risk >= low_limit) & (long_risk <= high_limit)
+        short_valid = (short_stop > close) & (short_risk >= low_limit) & (short_risk <= high_limit)
+        return np.where(long_valid, long_stop, np.nan), np.where(short_valid, short_stop, np.nan)
+
+
+STRATEGIES = {'cross': CrossSettings, 'trend': TrendSettings}
+
+
+# ----------------------------------------------------------------------------
+# Simulation
+# ----------------------------------------------------------------------------
+
+class Fill(NamedTuple):
+    bar: int
+    seconds: int       # unix time of the fill
+    price: float
+    quantity: float
+    reason: str
+
+
+@dataclass
+class Trade:
+    """One position from entry to its last exit (exits empty / short of quantity while still open)"""
+    side: int          # 1 long, -1 short
+    signal_bar: int
+    entry: Fill
+    stop: float
+    exits: List[Fill] = field(default_factory=list)
+
+    @property
+    def closed(self) -> bool:
+        return bool(self.exits) and abs(self.entry.quantity - sum(fill.quantity for fill in self.exits)) < 1e-12 * self.entry.quantity
+
+    def leg_profit(self, fill: Fill, commission_pct: float) -> float:
+        """One exit's profit after commission on both of its sides, like strategy.closedtrades.profit"""
+        gross = self.side * (fill.price - self.entry.price) * fill.quantity
+        return gross - (self.entry.price + fill.price) * fill.quantity * commission_pct / 100
+
+
+def _next_event(data: BarData, side: int, start: int, stop: float, level: Optional[float],
+                exit_mask: np.ndarray) -> Optional[int]:
+    """First bar from `start` that hits the stop, reaches the target level or signals an exit"""
+    n = len(data)
+    width = SEARCH_WINDOW
+    while start < n:
+        end = min(n, start + width)
+        if side > 0:
+            hit = data.low[start:end] <= stop
+            if level is not None:
+                hit |= data.high[start:end] >= level
+        else:
+            hit = data.high[start:end] >= stop
+            if level is not None:
+                hit |= data.low[start:end] <= level
+        hit |= exit_mask[start:end]
+        found = np.flatnonzero(hit)
+        if len(found):
+            return start + int(found[0])
+        start, width = end, width * 2
+    return None
+
+
+def _run_trade(data: BarData, plan: SignalPlan, side: int, signal_bar: int, stop: float, quantity: float) -> Trade:
+    """Follow one position from the open after its signal bar until it is flat (or the data ends)"""
+    seconds, half_bar = data.seconds, data.bar_seconds // 2
+    reference = float(data.close[signal_bar])      # the scripts size and place targets off the signal close
+    risk = abs(reference - stop)
+    entry_bar = signal_bar + 1
+    trade = Trade(side, signal_bar, Fill(entry_bar, int(seconds[entry_bar]), float(data.open[entry_bar]),
+                                         quantity, 'Long' if side > 0 else 'Short'), stop)
+    exit_mask = plan.exit_long if side > 0 else plan.exit_short
+    remaining, stage, bar, stop_label = quantity, 0, entry_bar, 'SL'
+    n = len(data)
+
+    while remaining > 0:
+        target = plan.targets[stage] if stage < len(plan.targets) else None
+        level = reference + side * risk * target.rr if target else None
+        bar = _next_event(data, side, bar, stop, level, exit_mask)
+        if bar is None:
+            break
+        open_, high, low = float(data.open[bar]), float(data.high[bar]), float(data.low[bar])
+        stop_hit = low <= stop if side > 0 else high >= stop
+        reached = level is not None and (high >= level if side > 0 else low <= level)
+        intrabar = int(seconds[bar]) + half_bar
+
+        if reached and target.limit:
+            stop_gapped = open_ <= stop if side > 0 else open_ >= stop
+            high_first = high - open_ < open_ - low
+            if not stop_gapped and (not stop_hit or high_first == (side > 0)):
+                price = max(open_, level) if side > 0 else min(open_, level)
+                size = remaining if target.fraction >= 1 else remaining * target.fraction
+                trade.exits.append(Fill(bar, intrabar, price, size, target.label))
+                remaining -= size
+                stage += 1
+                continue            # the rest can still stop out later in this bar
+
+        if stop_hit:
+            price = min(open_, stop) if side > 0 else max(open_, stop)
+            trade.exits.append(Fill(bar, intrabar, price, remaining, stop_label))
+            break
+
+        # Decided on the close: filled at the next open
+        if bar + 1 >= n:
+            break
+        next_open = Fill(bar + 1, int(seconds[bar + 1]), float(data.open[bar + 1]), remaining, plan.exit_label)
+        if exit_mask[bar]:
+            trade.exits.append(next_open)
+            break
+        size = remaining if target.fraction >= 1 else remaining * target.fraction
+        trade.exits.append(next_open._replace(quantity=size, reason=target.label))
+        remaining -= size
+        stage += 1
+        if target.stop_rr is not None:
+            stop, stop_label = reference + side * risk * target.stop_rr, target.stop_label
+        bar += 1
+    if trade.exits and remaining > 0 and remaining < 1e-12 * quantity:
+        trade.exits[-1] = trade.exits[-1]._replace(quantity=trade.exits[-1].quantity + remaining)
+    return trade
+
+
+def _next_candidate(bars: np.ndarray, retest: Optional[np.ndarray], earliest: int, last_entry: int) -> int:
+    """Position in `bars` of the first entry candidate at or after `earliest` whose retest is unused"""
+    position = int(np.searchsorted(bars, earliest))
+    if retest is None:
+        return position
+    width = SEARCH_WINDOW
+    while position < len(bars):
+        found = np.flatnonzero(retest[position:position + width] > last_entry)
+        if len(found):
+            return position + int(found[0])
+        position, width = position + width, width * 2
+    return position
+
+
+def simulate(data: BarData, settings) -> List[Trade]:
+    """Every trade the strategy takes over the symbol's bars, one position at a time"""
+    plan = settings.plan(data)
+    candidates = np.flatnonzero(plan.long_entry | plan.short_entry)
+    sides = np.where(plan.long_entry[candidates], 1, -1)
+    retest = None
+    if plan.long_retest is not None:
+        retest = np.where(sides > 0, plan.long_retest[candidates], plan.short_retest[candidates])
+
+    trades: List[Trade] = []
+    earliest, last_entry, multiplier = 0, -1, 1.0
+    n = len(data)
+    while True:
+        position = _next_candidate(candidates, retest, earliest, last_entry)
+        if position >= len(candidates) or candidates[position] + 1 >= n:
+            break
+        signal_bar, side = int(candidates[position]), int(sides[position])
+        stop = float((plan.long_stop if side > 0 else plan.short_stop)[signal_bar])
+        quantity = settings.quantity(float(data.close[signal_bar]), stop, multiplier)
+        if not quantity > 0:
+            earliest = signal_bar + 1
+            continue
+        trade = _run_trade(data, plan, side, signal_bar, stop, quantity)
+        trades.append(trade)
+        last_entry = signal_bar
+        if not trade.closed:
+            break
+
+        # The scripts look at the latest closed (partial) trade once per bar
+        last_by_bar = {fill.bar: fill for fill in trade.exits}
+        for fill in last_by_bar.values():
+            multiplier = settings.next_multiplier(multiplier, trade.leg_profit(fill, settings.commission_pct))
+        final = trade.exits[-1]
+        cooldown = plan.cooldown_bars
+        if plan.cooldown_losses_only and trade.leg_profit(final, settings.commission_pct) >= 0:
+            cooldown = 0
+        earliest = max(final.bar + cooldown, signal_bar + 1)
+    return trades
+
+
+def trade_ledger(trades: Sequence[Trade], symbol: str, settings, run_key: str = '') -> pd.DataFrame:
+    """Trades as normalized transactions: one Entry row and one Exit row per fill"""
+    rate = settings.commission_pct / 100
+    leverage = getattr(settings, 'leverage', 'Unknown')
+    rows = []
+    for number, trade in enumerate(trades, 1):
+        entry_side, exit_side = ('Buy', 'Sell') if trade.side > 0 else ('Sell', 'Buy')
+        direction = 'Long' if trade.side > 0 else 'Short'
+        tag = f"backtest_{run_key}_{symbol}_{trade.entry.seconds}"
+        rows.append({'Broker': BROKER, 'Asset': symbol, 'Date': trade.entry.seconds, 'Side': entry_side,
+                     'Type': 'Entry', 'Quantity': trade.entry.quantity, 'Price': trade.entry.price, 'PNL': 0.0,
+                     'Fee': trade.entry.price * trade.entry.quantity * rate, 'Funding': 0.0, 'Leverage': leverage,
+                     'Order_Options': f"{direction} entry (stop {trade.stop:.6g})", 'Fingerprint': f"{tag}_entry"})
+        for leg, fill in enumerate(trade.exits, 1):
+            rows.append({'Broker': BROKER, 'Asset': symbol, 'Date': fill.seconds, 'Side': exit_side,
+                         'Type': 'Exit', 'Quantity': fill.quantity, 'Price': fill.price,
+                         'PNL': trade.side * (fill.price - trade.entry.price) * fill.quantity,
+                         'Fee': fill.price * fill.quantity * rate, 'Funding': 0.0, 'Leverage': leverage,
+                         'Order_Options': f"Exit - {fill.reason}", 'Fingerprint': f"{tag}_exit{leg}"})
+    ledger = pd.DataFrame(rows, columns=LEDGER_COLUMNS)
+    ledger['Date'] = pd.to_datetime(ledger['Date'], unit='s')
+    return ledger
+
+
+def trade_results(trades: Sequence[Trade], settings) -> Dict[str, np.ndarray]:
+    """Realized exits (time, net PNL, fees) and closed positions' net PNL, for the sweep table"""
+    times, nets, fees, positions = [], [], [], []
+    rate = settings.commission_pct / 100
+    for trade in trades:
+        position_net = 0.0
+        for fill in trade.exits:
+            net = trade.leg_profit(fill, settings.commission_pct)
+            times.append(fill.seconds)
+            nets.append(net)
+            fees.append((trade.entry.price + fill.price) * fill.quantity * rate)
+            position_net += net
+        if trade.closed:
+            positions.append(position_net)
+    return {'times': np.array(times, dtype='int64'), 'nets': np.array(nets), 'fees': np.array(fees),
+            'positions': np.array(positions)}
+
+
+def summarize(results: Sequence[Dict[str, np.ndarray]], base_risk: float) -> Dict:
+    """Combined statistics of one settings combination over all its symbols"""
+    times = np.concatenate([result['times'] for result in results]) if results else np.array([], dtype='int64')
+    nets = np.concatenate([result['nets'] for result in results]) if results else np.array([])
+    positions = np.concatenate([result['positions'] for result in results]) if results else np.array([])
+    fees = float(sum(result['fees'].sum() for result in results))
+    equity = np.cumsum(nets[np.argsort(times, kind='stable')])
+    drawdown = float((np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:] - equity).max()) if len(equity) else 0.0
+    gains, losses = positions[positions > 0].sum(), -positions[positions < 0].sum()
+    net = float(nets.sum())
+    return {
+        'Trades': len(positions),
+        'Win Rate %': float((positions > 0).mean() * 100) if len(positions) else np.nan,
+        'Net PNL': net,
+        'Fees': fees,
+        'Profit Factor': float(gains / losses) if losses > 0 else (np.inf if gains > 0 else np.nan),
+        'Max Drawdown': drawdown,
+        'Net R': net / base_risk if base_risk else np.nan,
+    }
+
+
+# ----------------------------------------------------------------------------
+# Sweeps
+# ----------------------------------------------------------------------------
+
+_worker_data: Dict[Tuple[str, str, str], BarData] = {}
+
+
+def _bar_data(store_root: str, symbol: str, timeframe: str) -> BarData:
+    """This process's BarData for a symbol, keeping only the latest one (and its indicator cache)"""
+    key = (store_root, symbol, timeframe)
+    if key not in _worker_data:
+        _worker_data.clear()
+        _worker_data[key] = BarData(CandleStore(store_root), symbol, timeframe)
+    return _worker_data[key]
+
+
+def backtest_symbol(store_root: str, symbol: str, settings) -> List[Trade]:
+    return simulate(_bar_data(store_root, symbol, settings.timeframe), settings)
+
+
+def _sweep_task(task) -> Dict[str, np.ndarray]:
+    store_root, symbol, settings = task
+    return trade_results(backtest_symbol(store_root, symbol, settings), settings)
+
+
+def parse_assignments(items: Sequence[str], settings_class, multiple: bool) -> Dict[str, List]:
+    """'key=value' (or 'key=v1,v2,...' with multiple=True) strings as typed settings values"""
+    types = {item.name: item.type for item in fields(settings_class)}
+    parsed = {}
+    for item in items:
+        key, separator, text = item.partition('=')
+        if not separator or key not in types:
+            raise ValueError(f"Unknown setting '{key}' (expected one of: {', '.join(types)})")
+        kind = types[key]
+        convert = (lambda value: value.strip().lower() in ('1', 'true', 'yes', 'on')) if kind is bool else kind
+        values = [convert(value) for value in (text.split(',') if multiple else [text])]
+        parsed[key] = values if multiple else values[0]
+    return parsed
+
+
+def prepare_symbols(library: CandleLibrary, symbols: Sequence[str], timeframes: Sequence[str]) -> List[str]:
+    """Import changed CSVs and build the timeframe views up front, so workers only read the store"""
+    ready = []
+    for symbol in symbols:
+        library.sync(symbol)
+        if all(library.store.candles(symbol, timeframe) is not None for timeframe in timeframes):
+            ready.append(symbol)
+        else:
+            log.warning(f"⚠️ No candles for {symbol} - skipped")
+    return ready
+
+
+def run_sweep(strategy: str, candles_dir: str = DEFAULT_CANDLES_DIR, symbols: Optional[Sequence[str]] = None,
+              base: Optional[Dict] = None, grid: Optional[Dict[str, List]] = None,
+              workers: Optional[int] = None) -> Tuple[pd.DataFrame, List, List[str]]:
+    """Backtest every grid combination on every symbol across a process pool
+
+    Returns the ranked table (best net PNL first), the settings of each row
+    and the symbols that had candles.
+    """
+    settings_class = STRATEGIES[strategy]
+    library = CandleLibrary(candles_dir)
+    if symbols:
+        symbols = [library.resolve(symbol) or symbol.upper() for symbol in symbols]
+    else:
+        symbols = sorted(set(library.files()) | set(library.store.symbols()))
+
+    grid = grid or {}
+    keys = list(grid)
+    combos = [replace(settings_class(**(base or {})), **dict(zip(keys, values)))
+              for values in itertools.product(*grid.values())] or [settings_class(**(base or {}))]
+    timeframes = sorted({timeframe for settings in combos for timeframe in settings.timeframes})
+    symbols = prepare_symbols(library, symbols, timeframes)
+
+    # Symbol-major order, so consecutive tasks in a worker reuse its bars and indicators
+    tasks = [(library.store.root, symbol, settings) for symbol in symbols for settings in combos]
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    if workers <= 1 or len(tasks) <= 1:
+        results = [_sweep_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_sweep_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+    rows = []
+    for index, settings in enumerate(combos):
+        per_symbol = results[index::len(combos)]
+        rows.append({**{key: getattr(settings, key) for key in keys}, 'Symbols': len(symbols),
+                     **summarize(per_symbol, settings.base_risk)})
+    table = pd.DataFrame(rows)
+    order = table.sort_values('Net PNL', ascending=False, kind='stable').index if len(table) else table.index
+    table = table.loc[order].reset_index(drop=True)
+    table.insert(0, 'Rank', np.arange(1, len(table) + 1))
+    return table, [combos[index] for index in order], symbols
+
+
+def backtest_ledger(strategy_settings, candles_dir: str, symbols: Sequence[str]) -> pd.DataFrame:
+    """Normalized trades of one settings combination over the given symbols"""
+    store_root = CandleLibrary(candles_dir).store.root
+    ledgers = [trade_ledger(backtest_symbol(store_root, symbol, strategy_settings), symbol, strategy_settings,
+                            run_key=type(strategy_settings).__name__.replace('Settings', '').lower())
+               for symbol in symbols]
+    ledgers = [ledger for ledger in ledgers if not ledger.empty]
+    if not ledgers:
+        return pd.DataFrame(columns=LEDGER_COLUMNS)
+    return pd.concat(ledgers, ignore_index=True).sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def write_table(table: pd.DataFrame, path: str):
+    """Save a table as .csv or .json (by extension)"""
+    with atomic_output_path(path) as temp_file:
+        if path.lower().endswith('.json'):
+            table.to_json(temp_file, orient='records', date_format='iso', indent=1)
+        else:
+            table.to_csv(temp_file, index=False)
+
+
+def write_report(ledger: pd.DataFrame, path: str, candles_dir: str):
+    """Run the backtested trades through the analyzer's report, as for live statements"""
+    from trading_performance_analyzer import TradingDataProcessor, write_excel_report
+    processor = TradingDataProcessor()
+    processor.candles = CandleLibrary(candles_dir)
+    processor.append_broker_data(BROKER, ledger)
+    processor.consolidate_data()
+    write_excel_report(processor.build_report_sheets(), path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Backtest and sweep mtf_ema_strategy.pine (cross) "
+                                                 "or mtf_ema_trend_compound.pine (trend) on local candles")
+    parser.add_argument('strategy', choices=sorted(STRATEGIES))
+    parser.add_argument('--candles', default=DEFAULT_CANDLES_DIR, help="Candle folder (default %(default)s)")
+    parser.add_argument('--symbols', nargs='+', help="Symbols to test (default: all)")
+    parser.add_argument('--set', nargs='+', default=[], metavar='KEY=VALUE', help="Override a strategy input")
+    parser.add_argument('--grid', nargs='+', default=[], metavar='KEY=V1,V2',
+                        help="Sweep every combination of these inputs")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument('--top', type=int, default=20, help="Rows to print (0 = all, default %(default)s)")
+    parser.add_argument('--output', help="Write the full sweep table to this .csv or .json file")
+    parser.add_argument('--trades', help="Write the best combination's trades (normalized ledger) to this CSV")
+    parser.add_argument('--report', help="Write the analyzer's Excel report for the best combination's trades")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('-q', '--quiet', action='store_const', const='quiet', dest='log_level', default='normal')
+    verbosity.add_argument('-v', '--verbose', action='store_const', const='verbose', dest='log_level')
+    args = parser.parse_args(argv)
+
+    settings_class = STRATEGIES[args.strategy]
+    try:
+        base = parse_assignments(args.set, settings_class, multiple=False)
+        grid = parse_assignments(args.grid, settings_class, multiple=True)
+    except ValueError as e:
+        parser.error(str(e))
+
+    with run_logging(args.log_level):
+        started = time.perf_counter()
+        table, combos, symbols = run_sweep(args.strategy, args.candles, args.symbols, base, grid, args.workers)
+        if not symbols:
+            log.error(f"❌ No symbols with candles in {args.candles}")
+            return 1
+        seconds = time.perf_counter() - started
+        log.info(f"\n🧪 {len(combos)} combination(s) x {len(symbols)} symbol(s) backtested in {seconds:.2f}s",
+                 extra=event('backtest', strategy=args.strategy, combinations=len(combos), symbols=len(symbols),
+                             seconds=seconds))
+        shown = table.head(args.top) if args.top else table
+        log.info(shown.to_string(index=False, float_format=lambda value: f"{value:,.4g}"))
+        if args.output:
+            write_table(table, args.output)
+            log.info(f"📁 Sweep table written to: {args.output}")
+
+        if args.trades or args.report:
+            ledger = backtest_ledger(combos[0], args.candles, symbols)
+            if args.trades:
+                write_table(ledger, args.trades)
+                log.info(f"📁 {len(ledger)} transactions written to: {args.trades}")
+            if args.report:
+                if ledger.empty:
+                    log.warning("⚠️ No trades to report")
+                else:
+                    write_report(ledger, args.report, args.candles)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
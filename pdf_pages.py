@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+PDF Pages
+Cheap looks at statement PDF pages, so overlapping statements only pay for
+text extraction on the pages they add.
+
+Text extraction (pdfminer layout through pdfplumber) costs ~100 ms a page.
+Two things are far cheaper:
+
+- page_content_hash: a hash of the page's content streams plus the Unicode
+  maps of its fonts. Two pages with the same hash extract to the same text,
+  so extracted text can be cached by it across files (in the trade store).
+- scan_strings: the page's text-showing strings, decoded through the page's
+  fonts straight from the content stream, without interpreting it (~2 ms).
+  Breakout rows show their transaction ID as one string, so this lists a
+  page's transaction IDs without extracting it.
+
+scan_strings only understands the common Tf / Tj / TJ forms and returns None
+for anything it can't decode; callers then fall back to extraction.
+"""
+
+import hashlib
+import re
+from typing import List, Optional
+
+from pdfminer.pdfinterp import PDFResourceManager
+from pdfminer.pdftypes import resolve1
+
+# Font selection, and literal / hex strings shown with Tj or a TJ array
+_TEXT_OPERATORS = re.compile(
+    rb'/([^\s/\[\]()<>{}%]+)\s+[-+\d.]+\s+Tf'
+    rb'|\(((?:[^()\\]|\\.)*)\)\s*Tj'
+    rb'|<([0-9A-Fa-f\s]*)>\s*Tj'
+    rb'|\[((?:[^\]\\]|\\.)*)\]\s*TJ',
+    re.S,
+)
+_TJ_ELEMENT = re.compile(rb'\(((?:[^()\\]|\\.)*)\)|<([0-9A-Fa-f\s]*)>', re.S)
+_ESCAPE = re.compile(rb'\\([0-7]{1,3}|.)', re.S)
+_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f', b'\n': b''}
+
+
+def _unescape(raw: bytes) -> bytes:
+    """A PDF literal string's bytes"""
+    def replace(match):
+        escaped = match.group(1)
+        if escaped[:1].isdigit():
+            return bytes([int(escaped, 8) & 0xFF])
+        return _ESCAPES.get(escaped, escaped)
+    return _ESCAPE.sub(replace, raw)
+
+
+def _hex_bytes(raw: bytes) -> bytes:
+    digits = re.sub(rb'\s', b'', raw)
+    return bytes.fromhex((digits + b'0' * (len(digits) % 2)).decode('ascii'))
+
+
+def _content_data(page) -> bytes:
+    """The page's content streams, decoded and concatenated"""
+    contents = page.page_obj.contents
+    return b'\n'.join(resolve1(stream).get_data() for stream in contents or [])
+
+
+def _fonts(page) -> dict:
+    return resolve1((page.page_obj.resources or {}).get('Font')) or {}
+
+
+def page_content_hash(page) -> str:
+    """SHA-256 of everything that decides a page's extracted text"""
+    digest = hashlib.sha256(_content_data(page))
+    for name, reference in sorted(_fonts(page).items()):
+        spec = resolve1(reference)
+        digest.update(f"/{name} {spec.get('BaseFont')}".encode('utf-8', 'replace'))
+        to_unicode = resolve1(spec.get('ToUnicode'))
+        if to_unicode is not None:
+            digest.update(to_unicode.get_data())
+    mediabox = page.page_obj.mediabox
+    digest.update(repr(list(mediabox)).encode('ascii'))
+    return digest.hexdigest()
+
+
+def scan_strings(page, resource_manager: PDFResourceManager) -> Optional[List[str]]:
+    """Every string the page shows, in content-stream order; None when the page can't be scanned"""
+    fonts = _fonts(page)
+    font = None
+    strings = []
+    try:
+        for match in _TEXT_OPERATORS.finditer(_content_data(page)):
+            font_name, literal, hex_string, array = match.groups()
+            if font_name is not None:
+                reference = fonts.get(font_name.decode('latin-1'))
+                if reference is None:
+                    return None
+                font = resource_manager.get_font(getattr(reference, 'objid', None), resolve1(reference))
+                continue
+            if font is None:
+                return None
+            if literal is not None:
+                parts = [_unescape(literal)]
+            elif hex_string is not None:
+                parts = [_hex_bytes(hex_string)]
+            else:
+                parts = [_unescape(element.group(1)) if element.group(1) is not None else _hex_bytes(element.group(2))
+                         for element in _TJ_ELEMENT.finditer(array)]
+            strings.append(''.join(font.to_unichr(cid) for part in parts for cid in font.decode(part)))
+    except Exception:
+        # Unmapped glyphs, odd encodings, damaged streams: leave it to extraction
+        return None
+    return strings
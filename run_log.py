@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Run Log
+Leveled console output and an optional machine-readable event log for the
+trading performance pipeline.
+
+Everything goes through the 'trading_report' logger. The console handler
+prints the plain message (emoji and all) to whatever sys.stdout is when the
+record is emitted, so redirected runs (batch workers, benchmarks) still capture
+it. Quiet mode keeps only warnings and errors; verbose mode adds per-page and
+per-stage detail.
+
+Hot loops (pages, lines, rows) never log per item at INFO: they count, and log
+one summary line when the loop finishes. Per-item detail is DEBUG, which costs
+a level check when it's off.
+
+The event log writes one JSON object per record (time, level, logger, event,
+message and any structured fields attached with event()), always at DEBUG, so
+tooling sees every stage and file even when the console is quiet.
+"""
+
+import json
+import logging
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+LOGGER_NAME = 'trading_report'
+LOG_LEVELS = {'quiet': logging.WARNING, 'normal': logging.INFO, 'verbose': logging.DEBUG}
+
+
+def get_logger(component: str) -> logging.Logger:
+    """Logger for one part of the pipeline ('analyzer', 'converter', ...)"""
+    return logging.getLogger(f"{LOGGER_NAME}.{component}")
+
+
+def event(name: str, **fields) -> Dict:
+    """`extra=` payload tagging a record with an event name and structured fields"""
+    return {'event': name, 'fields': fields}
+
+
+class ConsoleHandler(logging.Handler):
+    """Writes the bare message to the current sys.stdout"""
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            stream = sys.stdout
+            stream.write(self.format(record) + '\n')
+        except Exception:
+            self.handleError(record)
+
+
+class EventLogHandler(logging.FileHandler):
+    """One JSON object per line: the run's event log"""
+
+    def __init__(self, path: str):
+        super().__init__(path, mode='w', encoding='utf-8')
+        self.setLevel(logging.DEBUG)
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': getattr(record, 'event', 'message'),
+            'message': record.getMessage().strip(),
+            **getattr(record, 'fields', {}),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+_logger = logging.getLogger(LOGGER_NAME)
+_console = ConsoleHandler()
+_console.setLevel(LOG_LEVELS['normal'])
+_logger.addHandler(_console)
+_logger.setLevel(LOG_LEVELS['normal'])
+# The console handler already prints; don't repeat records through the root logger
+_logger.propagate = False
+
+
+@contextmanager
+def run_logging(level: str = 'normal', event_log: Optional[str] = None):
+    """Console verbosity and event log for one run, restored afterwards"""
+    previous = _console.level, _logger.level
+    _console.setLevel(LOG_LEVELS[level])
+    handler = EventLogHandler(event_log) if event_log else None
+    if handler:
+        _logger.addHandler(handler)
+    # Records below every handler's level are dropped before they are built
+    _logger.setLevel(logging.DEBUG if handler else LOG_LEVELS[level])
+    try:
+        yield handler
+    finally:
+        if handler:
+            _logger.removeHandler(handler)
+            handler.close()
+        _console.setLevel(previous[0])
+        _logger.setLevel(previous[1])
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Run Profiler
+Per-stage timing for the trading performance pipeline, with optional
+cProfile or sampling profiles.
+
+Stages nest (an export stage contains the analytics it triggers), and per-file
+and per-page stages carry metadata and row counts. Timing is always collected
+(a perf_counter call per stage is negligible); the JSON report is only
+written when asked for, so regressions can be tracked as the ledger grows.
+
+With track_memory=True and tracemalloc running, each stage also records the
+net Python allocation it left behind and its own peak (nested stages included).
+
+Every enabled stage records the process peak RSS (the OS high-water mark, which
+also counts numpy/pandas buffers tracemalloc can't see). A reused worker process
+calls reset_peak_rss() before each task so the mark is that task's own; where
+the OS can't reset it, a timer with sampled_peak=True reports the largest
+current RSS seen at its stage boundaries instead. With a memory budget
+set, the run stops at the first stage boundary past the budget and names the
+innermost stage that crossed it; nested per-file and per-page stages keep that
+check frequent during ingestion.
+
+Stages can run on several threads at once (the report sinks do): each thread
+keeps its own stage stack, and inherit_stack() nests a worker thread's stages
+under the stage that started it. Memory peaks are process-wide, so concurrent
+stages share them.
+"""
+
+import cProfile
+import functools
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from run_log import event, get_logger
+
+PROFILE_MODES = ('cprofile', 'sample')
+BYTES_PER_MB = 2**20
+DEFAULT_TIMING_REPORT = 'timing_report.json'
+DEFAULT_SAMPLE_INTERVAL = 0.005  # seconds
+TOP_FUNCTIONS = 30
+
+log = get_logger('timer')
+
+
+class MemoryBudgetExceeded(BaseException):
+    """Raised when the process peak RSS passes the configured memory budget
+
+    A BaseException (like KeyboardInterrupt) so the pipeline's broad
+    `except Exception` handlers can't swallow it and carry on half-finished.
+    """
+
+    def __init__(self, stage: str, peak_mb: float, budget_mb: float):
+        super().__init__(f"peak RSS {peak_mb:.0f} MB exceeded the {budget_mb:.0f} MB budget in stage '{stage}'")
+        self.stage = stage
+        self.peak_mb = peak_mb
+        self.budget_mb = budget_mb
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MB (None if unavailable)"""
+    peak = _peak_rss_bytes()
+    return peak / BYTES_PER_MB if peak else None
+
+
+def current_rss_mb() -> Optional[float]:
+    """Current resident set size of this process, in MB (None if unavailable)"""
+    current = _current_rss_bytes()
+    return current / BYTES_PER_MB if current else None
+
+
+def reset_peak_rss() -> bool:
+    """Restart the peak RSS high-water mark at the current RSS; False where the OS can't (only Linux can)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+if os.name == 'nt':
+    import ctypes
+    from ctypes import wintypes
+
+    class _ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t),
+        ]
+
+    def _memory_counters() -> Optional[_ProcessMemoryCounters]:
+        counters = _ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        return counters
+
+    def _peak_rss_bytes() -> int:
+        counters = _memory_counters()
+        return counters.PeakWorkingSetSize if counters else 0
+
+    def _current_rss_bytes() -> int:
+        counters = _memory_counters()
+        return counters.WorkingSetSize if counters else 0
+else:
+    import resource
+
+    def _proc_status_bytes(field: str) -> int:
+        """A kB field of /proc/self/status (Linux), in bytes; 0 elsewhere"""
+        try:
+            with open('/proc/self/status') as status:
+                for line in status:
+                    if line.startswith(field + ':'):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError, IndexError):
+            pass
+        return 0
+
+    def _peak_rss_bytes() -> int:
+        # VmHWM honours reset_peak_rss(); ru_maxrss never comes down
+        peak = _proc_status_bytes('VmHWM')
+        if peak:
+            return peak
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    def _current_rss_bytes() -> int:
+        return _proc_status_bytes('VmRSS')
+
+
+def _row_count(result) -> Optional[int]:
+    """Rows produced by a stage, if its result has a meaningful length"""
+    if isinstance(result, (pd.DataFrame, dict, list)):
+        return len(result)
+    return None
+
+
+class StageTimer:
+    """Collects nested stage durations, row counts and metadata for one run"""
+
+    def __init__(self, enabled: bool = False, track_memory: bool = False, memory_budget_mb: Optional[float] = None,
+                 sampled_peak: bool = False):
+        self.enabled = enabled
+        self.track_memory = track_memory
+        self.memory_budget_mb = memory_budget_mb
+        # Peak as the largest current RSS seen at stage boundaries, for a process whose
+        # high-water mark predates this run and can't be reset
+        self.sampled_peak = sampled_peak
+        self._sampled_peak_mb = current_rss_mb() if sampled_peak else None
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self._local = threading.local()
+        self.records: List[Dict] = []
+        self.profile: Optional[Dict] = None
+
+    @property
+    def _stack(self) -> List[str]:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @property
+    def _peaks(self) -> List[int]:
+        # Running peak of each open stage on this thread, for tracemalloc
+        if not hasattr(self._local, 'peaks'):
+            self._local.peaks = []
+        return self._local.peaks
+
+    def current_stack(self) -> List[str]:
+        """The open stages on this thread, outermost first"""
+        return list(self._stack)
+
+    @contextmanager
+    def inherit_stack(self, stack: List[str]):
+        """Nest this thread's stages under `stack` (taken from another thread)"""
+        previous = self._stack[:]
+        self._local.stack = list(stack)
+        try:
+            yield
+        finally:
+            self._local.stack = previous
+
+    @contextmanager
+    def stage(self, name: str, **meta):
+        """Time a block; the yielded dict can be given 'rows' or extra metadata"""
+        record = {'stage': name, 'path': '/'.join(self._stack + [name]), **meta}
+        tracing = self.enabled and self.track_memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._peaks:
+                # Keep the enclosing stage's peak so far before the counter is reset
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            tracemalloc.reset_peak()
+            self._peaks.append(current)
+            allocated_before = current
+        self._stack.append(name)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = round(time.perf_counter() - started, 6)
+            self._stack.pop()
+            if self.enabled or self.memory_budget_mb is not None:
+                peak_mb = self.peak_rss_mb()
+                if peak_mb is not None:
+                    record['peak_rss_mb'] = round(peak_mb, 1)
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                stage_peak = max(self._peaks.pop(), peak)
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], stage_peak)
+                record['net_alloc_mb'] = round((current - allocated_before) / BYTES_PER_MB, 3)
+                record['peak_alloc_mb'] = round(stage_peak / BYTES_PER_MB, 3)
+            if self.enabled:
+                self.records.append(record)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("⏱️ %s %.3fs", record['path'], record['seconds'], extra=event('stage', **record))
+        # Only reached when the stage itself succeeded, so an inner stage's failure isn't masked
+        self._check_budget(record)
+
+    def peak_rss_mb(self) -> Optional[float]:
+        """Peak RSS for this run: the process high-water mark, or the sampled peak"""
+        if self.sampled_peak:
+            current_mb = current_rss_mb()
+            if current_mb is not None:
+                self._sampled_peak_mb = max(self._sampled_peak_mb or 0.0, current_mb)
+                return self._sampled_peak_mb
+        return peak_rss_mb()
+
+    def _check_budget(self, record: Dict):
+        peak_mb = record.get('peak_rss_mb')
+        if self.memory_budget_mb is not None and peak_mb is not None and peak_mb > self.memory_budget_mb:
+            raise MemoryBudgetExceeded(record['path'], peak_mb, self.memory_budget_mb)
+
+    def report(self) -> Dict:
+        """Full timing report: every stage occurrence plus per-stage totals"""
+        by_stage: Dict[str, Dict] = {}
+        for record in self.records:
+            totals = by_stage.setdefault(record['stage'], {'count': 0, 'seconds': 0.0, 'rows': 0})
+            totals['count'] += 1
+            totals['seconds'] = round(totals['seconds'] + record['seconds'], 6)
+            totals['rows'] += record.get('rows') or 0
+            for key in ('peak_alloc_mb', 'peak_rss_mb'):
+                if key in record:
+                    totals[key] = max(totals.get(key, 0.0), record[key])
+
+        report = {
+            'started_at': self.started_at.isoformat(),
+            'total_seconds': round(time.perf_counter() - self._started, 6),
+            'peak_rss_mb': round(self.peak_rss_mb() or 0.0, 1),
+            'memory_budget_mb': self.memory_budget_mb,
+            'by_stage': dict(sorted(by_stage.items(), key=lambda item: item[1]['seconds'], reverse=True)),
+            'stages': self.records,
+        }
+        if self.profile is not None:
+            report['profile'] = self.profile
+        return report
+
+    def write_report(self, output_file: str = DEFAULT_TIMING_REPORT):
+        from atomic_io import atomic_write_text
+        atomic_write_text(output_file, json.dumps(self.report(), indent=2, default=str))
+
+    def print_summary(self, limit: int = 8):
+        """Log the slowest stages; the event carries every stage's totals"""
+        report = self.report()
+        lines = [f"\n⏱️ Stage timings (total {report['total_seconds']:.2f}s, peak RSS {report['peak_rss_mb']:.0f} MB):"]
+        for name, totals in list(report['by_stage'].items())[:limit]:
+            rows = f", {totals['rows']} rows" if totals['rows'] else ""
+            lines.append(f"   {name:<28} {totals['seconds']:>8.3f}s  x{totals['count']}{rows}")
+        log.info('\n'.join(lines), extra=event('stage_summary', total_seconds=report['total_seconds'],
+                                                peak_rss_mb=report['peak_rss_mb'], by_stage=report['by_stage']))
+
+
+def timed_stage(name: str):
+    """Method decorator timing a stage on self.timer and recording its row count"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.timer.stage(name) as record:
+                result = method(self, *args, **kwargs)
+                rows = _row_count(result)
+                if rows is not None:
+                    record['rows'] = rows
+                return result
+        return wrapper
+    return decorator
+
+
+class SamplingProfiler:
+    """Low-overhead statistical profiler: samples one thread's stack on a timer"""
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples = 0
+        self.leaf_counts: Counter = Counter()
+        self.inclusive_counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.leaf_counts[_frame_label(frame)] += 1
+            seen = set()
+            while frame is not None:
+                label = _frame_label(frame)
+                if label not in seen:
+                    self.inclusive_counts[label] += 1
+                    seen.add(label)
+                frame = frame.f_back
+
+    def summary(self, limit: int = TOP_FUNCTIONS) -> Dict:
+        def share(counter: Counter):
+            return [{'function': label, 'samples': count, 'percent': round(count / self.samples * 100, 1)}
+                    for label, count in counter.most_common(limit)] if self.samples else []
+        return {
+            'mode': 'sample',
+            'interval_seconds': self.interval,
+            'samples': self.samples,
+            'self': share(self.leaf_counts),
+            'inclusive': share(self.inclusive_counts),
+        }
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+@contextmanager
+def profiling(timer: StageTimer, mode: Optional[str], output_prefix: str = 'timing_profile'):
+    """Run a block under the chosen profiler and attach its summary to the timer"""
+    if mode is None:
+        yield
+        return
+
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            stats_file = f"{output_prefix}.prof"
+            profiler.dump_stats(stats_file)
+            buffer = io.StringIO()
+            pstats.Stats(profiler, stream=buffer).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            timer.profile = {'mode': 'cprofile', 'stats_file': stats_file, 'top_cumulative': buffer.getvalue()}
+    elif mode == 'sample':
+        sampler = SamplingProfiler()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            timer.profile = sampler.summary()
+    else:
+        raise ValueError(f"Unknown profile mode: {mode} (expected one of {', '.join(PROFILE_MODES)})")
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Statement Fetcher
+Downloads trade history from Blofin- and Edgex-style REST APIs into the
+statement folders, in the CSV formats the analyzer's parsers already read.
+
+The requested date range is split into windows that are fetched concurrently,
+each following its own page cursor. All requests to an API share one
+keep-alive ConnectionPool and a token-bucket RateLimiter; 429 and 5xx
+responses are retried with backoff, honouring Retry-After.
+
+Each run writes one file per broker, api-<broker>-<start>-<end>.csv, newest
+first like the manual exports. Re-fetching a range rewrites the same file and
+rows already in the trade store are skipped by the usual dedup, so
+overlapping fetches are harmless.
+
+Credentials come from the environment:
+    BLOFIN_API_KEY, BLOFIN_API_SECRET, BLOFIN_API_PASSPHRASE
+    EDGEX_ACCOUNT_ID, EDGEX_API_KEY, EDGEX_API_SECRET
+
+Blofin requests carry its HMAC-SHA256 signature. Edgex's production API signs
+with a StarkEx key instead; EdgexApi.sign() is an HMAC stand-in that matches
+the local stub and is the hook to replace for it.
+
+--stub starts broker_stub_server in-process on synthetic history, so the
+whole path (pooling, rate limiting, pagination, CSV output, ingestion) can be
+exercised offline.
+
+Usage:
+    python statement_fetcher.py --start 2025-09-01 [--end 2025-10-01] [--brokers blofin edgex]
+    python statement_fetcher.py --stub --start 2024-01-01 --end 2024-03-01 --output "bench/account statements"
+"""
+
+import argparse
+import asyncio
+import base64
+import csv
+import hashlib
+import hmac
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+
+from async_http import ConnectionPool, HttpResponse, RateLimiter
+from atomic_io import atomic_output_path
+from run_log import event, get_logger, run_logging
+from trading_performance_analyzer import STATEMENTS_ROOT
+
+DEFAULT_WINDOW_DAYS = 7
+DEFAULT_CONNECTIONS = 4
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.5  # seconds, doubled per attempt
+
+log = get_logger('fetcher')
+
+
+class FetchError(RuntimeError):
+    """The API rejected a request or kept failing after retries"""
+
+
+@dataclass
+class Credentials:
+    api_key: str = ''
+    api_secret: str = ''
+    passphrase: str = ''
+    account_id: str = ''
+
+
+@dataclass
+class FetchStats:
+    broker: str
+    rows: int = 0
+    pages: int = 0
+    retries: int = 0
+    throttled: int = 0
+    requests: int = 0
+    connections: int = 0
+    seconds: float = 0.0
+    file: Optional[str] = None
+
+
+def to_millis(moment: datetime) -> int:
+    return int(moment.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def from_millis(value) -> datetime:
+    return datetime.fromtimestamp(int(value) / 1000, tz=timezone.utc).replace(tzinfo=None)
+
+
+def time_windows(start: datetime, end: datetime, days: float) -> List[Tuple[datetime, datetime]]:
+    """Split [start, end) into consecutive windows of `days`"""
+    windows = []
+    step = timedelta(days=days)
+    while start < end:
+        windows.append((start, min(start + step, end)))
+        start += step
+    return windows
+
+
+class TradeHistoryApi:
+    """One broker's trade-history endpoint: request shape, paging, signing and CSV layout"""
+
+    name = ''
+    base_url = ''
+    path = ''
+    page_size = 100
+    rate = 5.0   # requests per second
+    burst = 5
+    header: List[str] = []
+    encoding = 'utf-8'
+    quoting = csv.QUOTE_MINIMAL
+
+    def __init__(self, credentials: Credentials, base_url: Optional[str] = None):
+        self.credentials = credentials
+        self.base_url = base_url or self.base_url
+
+    def params(self, start: datetime, end: datetime, cursor: Optional[str]) -> Dict[str, str]:
+        raise NotImplementedError
+
+    def parse_page(self, payload: Dict) -> Tuple[List[Dict], Optional[str]]:
+        """(records, cursor for the next page or None)"""
+        raise NotImplementedError
+
+    def sign(self, method: str, request_path: str) -> Dict[str, str]:
+        raise NotImplementedError
+
+    def record_key(self, record: Dict) -> str:
+        raise NotImplementedError
+
+    def record_time(self, record: Dict) -> int:
+        raise NotImplementedError
+
+    def to_row(self, record: Dict) -> List:
+        raise NotImplementedError
+
+
+class BlofinApi(TradeHistoryApi):
+    """Blofin order history (filled orders), newest first, paged by orderId"""
+
+    name = 'blofin'
+    base_url = 'https://openapi.blofin.com'
+    path = '/api/v1/trade/orders-history'
+    page_size = 100
+    rate = 3.0
+    burst = 5
+    header = ['Underlying Asset', 'Margin Mode', 'Leverage', 'Order Time', 'Side', 'Avg Fill', 'Price',
+              'Filled', 'Total', 'PNL', 'PNL%', 'Fee', 'Order Options', 'Reduce-only', 'Status']
+    category_labels = {'tp': '(TP)', 'sl': '(SL)'}
+
+    def params(self, start, end, cursor):
+        params = {'state': 'filled', 'begin': str(to_millis(start)), 'end': str(to_millis(end) - 1),
+                  'limit': str(self.page_size)}
+        if cursor:
+            params['after'] = cursor
+        return params
+
+    def parse_page(self, payload):
+        if str(payload.get('code')) != '0':
+            raise FetchError(f"Blofin error {payload.get('code')}: {payload.get('msg')}")
+        records = payload.get('data') or []
+        cursor = records[-1]['orderId'] if len(records) >= self.page_size else None
+        return records, cursor
+
+    def sign(self, method, request_path):
+        timestamp = str(int(time.time() * 1000))
+        nonce = uuid.uuid4().hex
+        prehash = f"{request_path}{method}{timestamp}{nonce}"
+        digest = hmac.new(self.credentials.api_secret.encode(), prehash.encode(), hashlib.sha256).hexdigest()
+        return {
+            'ACCESS-KEY': self.credentials.api_key,
+            'ACCESS-SIGN': base64.b64encode(digest.encode()).decode(),
+            'ACCESS-TIMESTAMP': timestamp,
+            'ACCESS-NONCE': nonce,
+            'ACCESS-PASSPHRASE': self.credentials.passphrase,
+        }
+
+    def record_key(self, record):
+        return str(record['orderId'])
+
+    def record_time(self, record):
+        return int(record['createTime'])
+
+    def to_row(self, record):
+        base, quote = record['instId'].split('-', 1)
+        reduce_only = str(record.get('reduceOnly')).lower() == 'true'
+        label = self.category_labels.get(record.get('orderCategory', ''), '')
+        return [
+            base + quote,
+            record.get('marginMode', 'cross').title(),
+            record.get('leverage', ''),
+            from_millis(record['createTime']).strftime('%m/%d/%Y %H:%M:%S'),
+            record['side'].title() + label,
+            f"{record['averagePrice']} {quote}",
+            'Market' if record.get('orderType') == 'market' else record.get('price', ''),
+            f"{record['filledSize']} {base}",
+            f"{record.get('size', record['filledSize'])} {base}",
+            f"{record['pnl']} {quote}" if reduce_only else '--',
+            '--',
+            f"{str(record['fee']).lstrip('-')} {quote}",
+            'GTC',
+            'Y' if reduce_only else 'N',
+            record.get('state', 'filled').title(),
+        ]
+
+
+class EdgexApi(TradeHistoryApi):
+    """Edgex closed positions, newest first, paged by an opaque offset"""
+
+    name = 'edgex'
+    base_url = 'https://pro.edgex.exchange'
+    path = '/api/v1/private/account/getPositionTermPage'
+    page_size = 100
+    rate = 5.0
+    burst = 5
+    header = ['Markets', 'Qty', 'Entry Price', 'Exit Price', 'Trade Type', 'Closed P&L', 'Open Fee',
+              'Close Fee', 'Funding Fee', 'Exit Type', 'Order time']
+    encoding = 'utf-8-sig'
+    quoting = csv.QUOTE_ALL
+
+    def params(self, start, end, cursor):
+        params = {'accountId': self.credentials.account_id, 'size': str(self.page_size),
+                  'filterCloseTimeStartInclusive': str(to_millis(start)),
+                  'filterCloseTimeEndExclusive': str(to_millis(end))}
+        if cursor:
+            params['offsetData'] = cursor
+        return params
+
+    def parse_page(self, payload):
+        if payload.get('code') != 'SUCCESS':
+            raise FetchError(f"Edgex error {payload.get('code')}: {payload.get('msg')}")
+        data = payload.get('data') or {}
+        return data.get('dataList') or [], data.get('nextPageOffsetData') or None
+
+    def sign(self, method, request_path):
+        timestamp = str(int(time.time() * 1000))
+        message = f"{timestamp}{method}{request_path}"
+        return {
+            'X-edgeX-Api-Key': self.credentials.api_key,
+            'X-edgeX-Api-Timestamp': timestamp,
+            'X-edgeX-Api-Signature': hmac.new(self.credentials.api_secret.encode(), message.encode(),
+                                              hashlib.sha256).hexdigest(),
+        }
+
+    def record_key(self, record):
+        return str(record['id'])
+
+    def record_time(self, record):
+        return int(record['closeTime'])
+
+    def to_row(self, record):
+        contract = record['contractName']
+        return [
+            contract,
+            f"{record['closeSize']} {contract.replace('USD', '')}",
+            record['avgEntryPrice'],
+            record['avgClosePrice'],
+            record['closeSide'].title(),
+            record['realizePnl'],
+            str(record['openFee']).lstrip('-'),
+            str(record['closeFee']).lstrip('-'),
+            record.get('fundingFee', '0'),
+            record.get('exitType', 'TRADE').title(),
+            from_millis(record['closeTime']).strftime('%Y-%m-%d %H:%M:%S'),
+        ]
+
+
+BROKER_APIS = {api.name: api for api in (BlofinApi, EdgexApi)}
+
+
+def credentials_from_env(broker: str) -> Credentials:
+    prefix = broker.upper()
+    return Credentials(
+        api_key=os.environ.get(f'{prefix}_API_KEY', ''),
+        api_secret=os.environ.get(f'{prefix}_API_SECRET', ''),
+        passphrase=os.environ.get(f'{prefix}_API_PASSPHRASE', ''),
+        account_id=os.environ.get(f'{prefix}_ACCOUNT_ID', ''),
+    )
+
+
+@dataclass
+class HistoryFetcher:
+    """Concurrent, rate-limited crawl of one API over a date range"""
+
+    api: TradeHistoryApi
+    connections: int = DEFAULT_CONNECTIONS
+    window_days: float = DEFAULT_WINDOW_DAYS
+    rate: Optional[float] = None
+    stats: FetchStats = field(init=False)
+
+    def __post_init__(self):
+        self.stats = FetchStats(self.api.name)
+        self.limiter = RateLimiter(self.rate or self.api.rate, self.api.burst)
+
+    async def fetch(self, start: datetime, end: datetime) -> List[Dict]:
+        """All records in [start, end), newest first, without duplicates"""
+        started = time.perf_counter()
+        async with ConnectionPool(self.api.base_url, self.connections) as pool:
+            windows = time_windows(start, end, self.window_days)
+            pages = await gather_or_cancel(self._fetch_window(pool, *window) for window in windows)
+            self.stats.requests = pool.requests_sent
+            self.stats.connections = pool.connections_opened
+
+        # Windows don't overlap, but a record straddling a boundary may be reported by both
+        records = {self.api.record_key(record): record for window in pages for record in window}
+        ordered = sorted(records.values(), key=self.api.record_time, reverse=True)
+        self.stats.rows = len(ordered)
+        self.stats.seconds = round(time.perf_counter() - started, 3)
+        return ordered
+
+    async def _fetch_window(self, pool: ConnectionPool, start: datetime, end: datetime) -> List[Dict]:
+        records: List[Dict] = []
+        cursor = None
+        while True:
+            request_path = f"{self.api.path}?{urlencode(self.api.params(start, end, cursor))}"
+            page, cursor = self.api.parse_page(await self._get(pool, request_path))
+            records.extend(page)
+            self.stats.pages += 1
+            if not cursor or not page:
+                return records
+
+    async def _get(self, pool: ConnectionPool, request_path: str) -> Dict:
+        for attempt in range(MAX_ATTEMPTS):
+            await self.limiter.acquire()
+            try:
+                response = await pool.get(request_path, self.api.sign('GET', request_path))
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                error = f"{type(e).__name__}: {e}"
+                delay = RETRY_BASE_DELAY * 2 ** attempt
+            else:
+                if response.status == 200:
+                    return json.loads(response.body)
+                error = f"HTTP {response.status}: {response.body[:200].decode('utf-8', 'replace')}"
+                if response.status == 429:
+                    self.stats.throttled += 1
+                    delay = _retry_after(response)
+                    self.limiter.back_off(delay)
+                elif response.status >= 500:
+                    delay = RETRY_BASE_DELAY * 2 ** attempt
+                else:
+                    raise FetchError(f"{self.api.name} {request_path}: {error}")
+            self.stats.retries += 1
+            log.debug("Retrying %s in %.2fs (%s)", request_path, delay, error)
+            await asyncio.sleep(delay)
+        raise FetchError(f"{self.api.name} {request_path}: gave up after {MAX_ATTEMPTS} attempts ({error})")
+
+
+async def gather_or_cancel(coroutines) -> List:
+    """asyncio.gather, but the first failure cancels (and waits for) the rest"""
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def _retry_after(response: HttpResponse) -> float:
+    try:
+        return max(float(response.headers.get('retry-after', 1)), 0.0)
+    except ValueError:
+        return 1.0
+
+
+def write_statement(api: TradeHistoryApi, records: Sequence[Dict], output_root: str,
+                    start: datetime, end: datetime) -> str:
+    """Write records as a statement CSV in the broker's export layout"""
+    folder = os.path.join(output_root, api.name)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"api-{api.name}-{start:%Y%m%d}-{end:%Y%m%d}.csv")
+    # Atomic, so watch mode never ingests a half-written file
+    with atomic_output_path(path) as temp_file:
+        with open(temp_file, 'w', newline='', encoding=api.encoding) as f:
+            writer = csv.writer(f, quoting=api.quoting)
+            writer.writerow(api.header)
+            writer.writerows(api.to_row(record) for record in records)
+    return path
+
+
+async def fetch_statements(apis: Sequence[TradeHistoryApi], start: datetime, end: datetime,
+                           output_root: str = STATEMENTS_ROOT, connections: int = DEFAULT_CONNECTIONS,
+                           window_days: float = DEFAULT_WINDOW_DAYS, rate: Optional[float] = None) -> List[FetchStats]:
+    """Fetch every API's history for [start, end) concurrently and write the statements"""
+    fetchers = [HistoryFetcher(api, connections, window_days, rate) for api in apis]
+    results = await gather_or_cancel(fetcher.fetch(start, end) for fetcher in fetchers)
+
+    for fetcher, records in zip(fetchers, results):
+        stats = fetcher.stats
+        if records:
+            stats.file = write_statement(fetcher.api, records, output_root, start, end)
+            log.info(f"✅ {fetcher.api.name.title()}: {stats.rows} records in {stats.pages} pages "
+                     f"({stats.requests} requests over {stats.connections} connections, "
+                     f"{stats.throttled} throttled, {stats.seconds:.1f}s) → {stats.file}",
+                     extra=event('fetched', **vars(stats)))
+        else:
+            log.info(f"ℹ️ {fetcher.api.name.title()}: no trades between {start:%Y-%m-%d} and {end:%Y-%m-%d}",
+                     extra=event('fetched', **vars(stats)))
+    return [fetcher.stats for fetcher in fetchers]
+
+
+async def fetch_from_stub(brokers: Sequence[str], start: datetime, end: datetime, args: argparse.Namespace):
+    """Serve synthetic history locally and fetch it like a real account"""
+    from broker_stub_server import DEFAULT_RATE as STUB_RATE, STUB_CREDENTIALS, start_stub_server, stop_stub_server
+
+    server, base_url = await start_stub_server(port=0, trades=args.stub_trades, start=f"{start:%Y-%m-%d}")
+    try:
+        log.info(f"🧪 Stub broker API at {base_url}")
+        apis = [BROKER_APIS[broker](STUB_CREDENTIALS, base_url) for broker in brokers]
+        # Unless told otherwise, go as fast as the stub allows rather than the real APIs' limits
+        return await fetch_statements(apis, start, end, args.output, args.connections, args.window_days,
+                                      args.rate or STUB_RATE)
+    finally:
+        await stop_stub_server(server)
+
+
+def parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fetch Blofin/Edgex trade history into the statement folders")
+    parser.add_argument('--start', type=parse_date, required=True, help="First day to fetch (YYYY-MM-DD, UTC)")
+    parser.add_argument('--end', type=parse_date, help="Fetch up to (not including) this date; default now")
+    parser.add_argument('--brokers', nargs='+', choices=list(BROKER_APIS), default=list(BROKER_APIS))
+    parser.add_argument('--output', default=STATEMENTS_ROOT, help="Statements root (default '%(default)s')")
+    parser.add_argument('--connections', type=int, default=DEFAULT_CONNECTIONS,
+                        help="Keep-alive connections per API (default %(default)s)")
+    parser.add_argument('--window-days', type=float, default=DEFAULT_WINDOW_DAYS,
+                        help="Days per concurrently fetched window (default %(default)s)")
+    parser.add_argument('--rate', type=float, help="Requests per second per API (default: the API's limit)")
+    parser.add_argument('--blofin-url', help="Override the Blofin API base URL")
+    parser.add_argument('--edgex-url', help="Override the Edgex API base URL")
+    parser.add_argument('--stub', action='store_true', help="Fetch from a local stub server on synthetic data")
+    parser.add_argument('--stub-trades', type=int, default=2000, help="Stub: round trips per broker (default %(default)s)")
+    parser.add_argument('-q', '--quiet', action='store_const', const='quiet', dest='log_level', default='normal')
+    parser.add_argument('-v', '--verbose', action='store_const', const='verbose', dest='log_level')
+    args = parser.parse_args(argv)
+
+    end = args.end or datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    if end <= args.start:
+        parser.error("--end must be after --start")
+
+    with run_logging(args.log_level):
+        log.info(f"📡 Fetching {', '.join(args.brokers)} history from {args.start:%Y-%m-%d} to {end:%Y-%m-%d %H:%M}...")
+        try:
+            if args.stub:
+                asyncio.run(fetch_from_stub(args.brokers, args.start, end, args))
+            else:
+                urls = {'blofin': args.blofin_url, 'edgex': args.edgex_url}
+                apis = [BROKER_APIS[broker](credentials_from_env(broker), urls[broker]) for broker in args.brokers]
+                missing = [api.name for api in apis if not api.credentials.api_key]
+                if missing:
+                    parser.error(f"no API key for {', '.join(missing)} (set {', '.join(name.upper() + '_API_KEY' for name in missing)})")
+                asyncio.run(fetch_statements(apis, args.start, end, args.output, args.connections,
+                                             args.window_days, args.rate))
+        except FetchError as e:
+            log.error(f"❌ Fetch failed: {e}")
+            return 1
+        log.info("💡 Run trading_performance_analyzer.py (or leave --watch running) to ingest the new statements")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Synthetic Statement Generator
+Writes realistic Blofin CSVs, Edgex CSVs and Breakout PDF statements at any
+size, in exactly the formats the analyzer's parsers read.
+
+Transactions come from round trips (entry + exit) on per-asset random-walk
+prices, so the position history, PNL and analytics behave like real data.
+A broker's trades are split across several files whose date windows overlap
+by a configurable fraction, which exercises duplicate detection the same way
+re-downloaded statements do. Output goes to bench_data unless told otherwise,
+and never into the analyzer's real statements root without
+--allow-statements-root (the analyzer would ingest the synthetic trades for good).
+
+Usage:
+    python statement_generator.py --transactions 100000 --files 4 --overlap 0.25 --output bench_data
+"""
+
+import argparse
+import csv
+import math
+import os
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+BROKERS = ('blofin', 'edgex', 'breakout')
+DEFAULT_START = '2024-01-01'
+DEFAULT_SEED = 42
+DEFAULT_OUTPUT = 'bench_data'
+STATEMENTS_ROOT = 'account statements'  # the analyzer's real ledger folders
+
+# Asset -> (starting price, price decimals, quantity step)
+BLOFIN_ASSETS = {
+    'BTCUSDT': (60000.0, 1, 0.0001),
+    'ETHUSDT': (3000.0, 2, 0.001),
+    'SOLUSDT': (150.0, 3, 0.01),
+    'ENAUSDT': (0.75, 4, 1.0),
+    'DOGEUSDT': (0.15, 5, 10.0),
+}
+EDGEX_ASSETS = {
+    'BTCUSD': (60000.0, 1, 0.001),
+    'ETHUSD': (3000.0, 2, 0.01),
+    'SOLUSD': (150.0, 2, 0.1),
+}
+BREAKOUT_ASSETS = {
+    'BTCUSD': (60000.0, 1, 0.05),
+    'ETHUSD': (3000.0, 2, 0.5),
+}
+
+BLOFIN_HEADER = ['Underlying Asset', 'Margin Mode', 'Leverage', 'Order Time', 'Side', 'Avg Fill', 'Price',
+                 'Filled', 'Total', 'PNL', 'PNL%', 'Fee', 'Order Options', 'Reduce-only', 'Status']
+EDGEX_HEADER = ['Markets', 'Qty', 'Entry Price', 'Exit Price', 'Trade Type', 'Closed P&L', 'Open Fee',
+                'Close Fee', 'Funding Fee', 'Exit Type', 'Order time']
+
+TAKER_FEE = 0.0006
+BREAKOUT_ACCOUNT = 20660151
+BREAKOUT_LINES_PER_PAGE = 60
+EM_DASH = '—'
+
+
+@dataclass
+class RoundTrips:
+    """Vectorized round trips for one broker, ordered by entry time"""
+    asset: np.ndarray
+    direction: np.ndarray    # +1 long, -1 short
+    quantity: np.ndarray
+    entry_price: np.ndarray
+    exit_price: np.ndarray
+    entry_time: np.ndarray   # datetime64[s]
+    exit_time: np.ndarray
+    leverage: np.ndarray
+    decimals: np.ndarray
+
+    def __len__(self):
+        return len(self.asset)
+
+    @property
+    def pnl(self) -> np.ndarray:
+        return (self.exit_price - self.entry_price) * self.quantity * self.direction
+
+
+def generate_round_trips(count: int, assets: Dict[str, Tuple[float, int, float]], seed: int = DEFAULT_SEED,
+                         start: str = DEFAULT_START) -> RoundTrips:
+    """Round trips with random-walk prices, sized to a roughly constant notional"""
+    rng = np.random.default_rng(seed)
+    names = np.array(list(assets))
+    asset_index = rng.integers(0, len(names), count)
+
+    base_price = np.array([assets[name][0] for name in names])
+    decimals = np.array([assets[name][1] for name in names])
+    quantity_step = np.array([assets[name][2] for name in names])
+
+    # One random walk per asset, advanced only on that asset's trades
+    drift = np.zeros(count)
+    for index in range(len(names)):
+        mask = asset_index == index
+        drift[mask] = np.cumsum(rng.normal(0, 0.01, mask.sum()))
+    entry_price = base_price[asset_index] * np.exp(np.clip(drift, -3, 3))
+    exit_price = entry_price * (1 + rng.normal(0.0005, 0.012, count))
+
+    notional = rng.uniform(200, 5000, count)
+    step = quantity_step[asset_index]
+    quantity = np.maximum(np.round(notional / entry_price / step), 1) * step
+
+    # Trades are minutes to days apart; holding times from a minute to a couple of days
+    gaps = rng.exponential(90 * 60, count).astype('int64') + 60
+    entry_time = np.datetime64(start, 's') + np.cumsum(gaps).astype('timedelta64[s]')
+    holding = (rng.lognormal(7.5, 1.5, count).astype('int64') + 60).astype('timedelta64[s]')
+
+    price_decimals = decimals[asset_index]
+    return RoundTrips(
+        asset=names[asset_index],
+        direction=np.where(rng.random(count) < 0.55, 1, -1),
+        quantity=np.round(quantity, 6),
+        entry_price=_round_to(entry_price, price_decimals),
+        exit_price=_round_to(exit_price, price_decimals),
+        entry_time=entry_time,
+        exit_time=entry_time + holding,
+        leverage=rng.choice([5, 10, 20, 30], count),
+        decimals=price_decimals,
+    )
+
+
+def _round_to(values: np.ndarray, decimals: np.ndarray) -> np.ndarray:
+    scale = 10.0 ** decimals
+    return np.round(values * scale) / scale
+
+
+def overlapping_slices(count: int, files: int, overlap: float) -> List[Tuple[int, int]]:
+    """Split `count` items into `files` windows; neighbours share `overlap` of a window"""
+    if files <= 1 or count == 0:
+        return [(0, count)]
+    if not 0 <= overlap < 1:
+        raise ValueError("overlap must be in [0, 1)")
+    size = math.ceil(count / (1 + (files - 1) * (1 - overlap)))
+    step = max(1, int(size * (1 - overlap)))
+    slices = []
+    for index in range(files):
+        start = min(index * step, count)
+        end = count if index == files - 1 else min(start + size, count)
+        slices.append((start, end))
+    return slices
+
+
+def _format_number(value: float, decimals: int, thousands: bool = False) -> str:
+    return f"{value:,.{decimals}f}" if thousands else f"{value:.{decimals}f}"
+
+
+def _format_quantity(value: float) -> str:
+    return f"{value:.6f}".rstrip('0').rstrip('.')
+
+
+def _timestamps(values: np.ndarray, date_format: str) -> List[str]:
+    return pd.DatetimeIndex(values).strftime(date_format).tolist()
+
+
+def edgex_costs(trips: RoundTrips, index: int) -> Tuple[float, float, float]:
+    """(open fee, close fee, funding) of one Edgex round trip; its Closed P&L is the gross PNL net of all three"""
+    quantity = trips.quantity[index]
+    hours_held = (trips.exit_time[index] - trips.entry_time[index]).astype('int64') / 3600
+    open_fee = quantity * trips.entry_price[index] * TAKER_FEE
+    close_fee = quantity * trips.exit_price[index] * TAKER_FEE
+    funding = quantity * trips.entry_price[index] * 0.0001 * hours_held / 8
+    return open_fee, close_fee, funding
+
+
+def write_blofin_csv(path: str, trips: RoundTrips, start: int = 0, end: Optional[int] = None):
+    """Blofin order-history export: one row per fill, newest first"""
+    end = len(trips) if end is None else end
+    rows = slice(start, end)
+    entry_times = _timestamps(trips.entry_time[rows], '%m/%d/%Y %H:%M:%S')
+    exit_times = _timestamps(trips.exit_time[rows], '%m/%d/%Y %H:%M:%S')
+    pnl = trips.pnl[rows]
+    # Deterministic per trip, so overlapping files carry identical fills
+    exit_labels = np.where(pnl < 0, '(SL)', '(TP)')
+    exit_labels[np.arange(start, end) % 5 == 0] = ''
+
+    fills = []
+    for offset, index in enumerate(range(start, end)):
+        asset = str(trips.asset[index])
+        unit = asset.replace('USDT', '')
+        decimals = int(trips.decimals[index])
+        quantity = f"{_format_quantity(trips.quantity[index])} {unit}"
+        long_position = trips.direction[index] > 0
+        entry_fee = trips.quantity[index] * trips.entry_price[index] * TAKER_FEE
+        exit_fee = trips.quantity[index] * trips.exit_price[index] * TAKER_FEE
+        margin = trips.quantity[index] * trips.entry_price[index] / trips.leverage[index]
+        leverage = int(trips.leverage[index])
+
+        fills.append((trips.entry_time[index], [
+            asset, 'Cross', leverage, entry_times[offset], 'Buy' if long_position else 'Sell',
+            f"{trips.entry_price[index]:.{decimals}f} USDT", 'Market', quantity, quantity,
+            '--', '--', f"{entry_fee:.6f} USDT", 'GTC', 'N', 'Filled',
+        ]))
+        fills.append((trips.exit_time[index], [
+            asset, 'Cross', leverage, exit_times[offset], ('Sell' if long_position else 'Buy') + exit_labels[offset],
+            f"{trips.exit_price[index]:.{decimals}f} USDT", 'Market', quantity, quantity,
+            f"{pnl[offset]:.5f} USDT", f"{pnl[offset] / margin * 100}%", f"{exit_fee:.6f} USDT", 'GTC', 'Y', 'Filled',
+        ]))
+
+    fills.sort(key=lambda fill: fill[0], reverse=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(BLOFIN_HEADER)
+        writer.writerows(row for _, row in fills)
+
+
+def write_edgex_csv(path: str, trips: RoundTrips, start: int = 0, end: Optional[int] = None):
+    """Edgex closed-positions export: one row per round trip, newest first"""
+    end = len(trips) if end is None else end
+    rows = slice(start, end)
+    exit_times = _timestamps(trips.exit_time[rows], '%Y-%m-%d %H:%M:%S')
+    pnl = trips.pnl[rows]
+
+    records = []
+    for offset, index in enumerate(range(start, end)):
+        asset = str(trips.asset[index])
+        decimals = int(trips.decimals[index])
+        quantity = trips.quantity[index]
+        open_fee, close_fee, funding = edgex_costs(trips, index)
+        records.append((trips.exit_time[index], [
+            asset,
+            f"{_format_quantity(quantity)} {asset.replace('USD', '')}",
+            _format_number(trips.entry_price[index], decimals, thousands=True),
+            _format_number(trips.exit_price[index], decimals, thousands=True),
+            'Sell' if trips.direction[index] > 0 else 'Buy',  # the closing order's side
+            f"{pnl[offset] - open_fee - close_fee - funding:+.2f}",  # Edgex reports it net of fees and funding
+            f"{open_fee:.4f}",
+            f"{close_fee:.4f}",
+            f"{funding:.4f}",
+            'Trade',
+            exit_times[offset],
+        ]))
+
+    records.sort(key=lambda record: record[0], reverse=True)
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(EDGEX_HEADER)
+        writer.writerows(row for _, row in records)
+
+
+def breakout_lines(trips: RoundTrips, start: int = 0, end: Optional[int] = None) -> List[str]:
+    """Breakout transaction-table lines (newest first) for a range of round trips"""
+    end = len(trips) if end is None else end
+    rows = slice(start, end)
+    entry_times = _timestamps(trips.entry_time[rows], '%d/%m/%Y %H:%M')
+    exit_times = _timestamps(trips.exit_time[rows], '%d/%m/%Y %H:%M')
+    pnl = trips.pnl[rows]
+
+    fills = []
+    for offset, index in enumerate(range(start, end)):
+        # Ids derive from the trip index, so overlapping files repeat the same transactions
+        entry_id, exit_id = 1_000_000 + 2 * index, 1_000_001 + 2 * index
+        decimals = int(trips.decimals[index])
+        quantity = f"{trips.quantity[index]:.2f}"
+        commission = f"{trips.quantity[index] * trips.entry_price[index] * 0.0003:.2f}"
+        long_position = trips.direction[index] > 0
+        # The parser reads settled PnL without thousands separators
+        settled = f"{max(min(pnl[offset], 999.99), -999.99):.2f}"
+        fills.append((trips.entry_time[index], entry_id,
+                      f"{BREAKOUT_ACCOUNT}:{entry_id} {entry_times[offset]} {'Buy' if long_position else 'Sell'} "
+                      f"{quantity} {trips.asset[index]} {_format_number(trips.entry_price[index], decimals, True)} "
+                      f"{270_000_000 + entry_id} {EM_DASH} {commission} {EM_DASH}"))
+        fills.append((trips.exit_time[index], exit_id,
+                      f"{BREAKOUT_ACCOUNT}:{exit_id} {exit_times[offset]} {'Sell' if long_position else 'Buy'} "
+                      f"{quantity} {trips.asset[index]} {_format_number(trips.exit_price[index], decimals, True)} "
+                      f"{270_000_000 + exit_id} {settled} {commission} {EM_DASH}"))
+
+    fills.sort(key=lambda fill: (fill[0], fill[1]), reverse=True)
+    return [line for _, _, line in fills]
+
+
+def write_breakout_pdf(path: str, trips: RoundTrips, start: int = 0, end: Optional[int] = None):
+    """Breakout account statement: a summary page, then the transactions table"""
+    lines = breakout_lines(trips, start, end)
+    summary = [
+        'Account statement',
+        f"Generated statement with {len(lines)} transactions",
+        f"Created {datetime.now():%d/%m/%Y %H:%M}",
+        'Summary',
+        'THIS STATEMENT IS SYNTHETIC BENCHMARK DATA',
+    ]
+    pages = [summary]
+    header = ['Transactions',
+              'Transaction ID Transaction Time (GMT) Direction Size Symbol Price Order ID Settled PnL Commission Description']
+    for page_start in range(0, len(lines), BREAKOUT_LINES_PER_PAGE):
+        page = lines[page_start:page_start + BREAKOUT_LINES_PER_PAGE]
+        pages.append((header if page_start == 0 else []) + page)
+    write_text_pdf(path, pages)
+
+
+def _pdf_string(text: str) -> bytes:
+    raw = text.encode('cp1252', errors='replace')
+    return b'(' + raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def write_text_pdf(path: str, pages: Sequence[Sequence[str]], font_size: float = 7.0):
+    """Minimal text-only PDF (Helvetica, WinAnsi), streamed page by page"""
+    leading = font_size * 1.5
+    page_count = len(pages)
+    offsets = []
+
+    with open(path, 'wb') as f:
+        def write_object(number: int, body: bytes):
+            offsets.append((number, f.tell()))
+            f.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        kids = ' '.join(f"{4 + 2 * index} 0 R" for index in range(page_count))
+        write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {page_count} >>".encode())
+        write_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+        for index, page_lines in enumerate(pages):
+            page_number, content_number = 4 + 2 * index, 5 + 2 * index
+            text = [f"BT /F1 {font_size} Tf {leading} TL 30 810 Td".encode()]
+            text.extend(_pdf_string(line) + b" '" for line in page_lines)
+            text.append(b"ET")
+            content = zlib.compress(b"\n".join(text))
+            write_object(page_number, (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_number} 0 R >>").encode())
+            write_object(content_number, f"<< /Length {len(content)} /Filter /FlateDecode >>\nstream\n".encode()
+                         + content + b"\nendstream")
+
+        xref_offset = f.tell()
+        f.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode())
+        for _, offset in sorted(offsets):
+            f.write(f"{offset:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def generate_candles(trips: RoundTrips, asset: str, seed: int = DEFAULT_SEED,
+                     volatility: float = 0.0008) -> pd.DataFrame:
+    """1-minute OHLCV bars for one asset whose path passes through every fill price
+
+    Log prices are interpolated between the fills (sorted by time) with a
+    Brownian bridge on top, so the bars wander between fills but each fill
+    still lies inside its bar's high-low range.
+    """
+    rows = trips.asset == asset
+    fill_times = np.concatenate([trips.entry_time[rows], trips.exit_time[rows]]).astype('int64')
+    fill_prices = np.concatenate([trips.entry_price[rows], trips.exit_price[rows]])
+    order = np.argsort(fill_times, kind='stable')
+    fill_times, fill_prices = fill_times[order], fill_prices[order]
+    if len(fill_times) == 0:
+        return pd.DataFrame(columns=['time', 'open', 'high', 'low', 'close', 'volume'])
+
+    rng = np.random.default_rng(seed + zlib.crc32(asset.encode()))
+    first, last = fill_times[0] // 60 * 60, fill_times[-1] // 60 * 60
+    bar_open = np.arange(first, last + 60, 60)
+    bar_close = bar_open + 59
+    log_fills = np.log(fill_prices)
+
+    walk = np.cumsum(rng.normal(0, volatility, len(bar_open)))
+    bridge = walk - np.interp(bar_close, fill_times, np.interp(fill_times, bar_close, walk))
+    close = np.exp(np.interp(bar_close, fill_times, log_fills) + bridge)
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    wick = np.abs(rng.normal(0, volatility / 2, (2, len(bar_open))))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+
+    # Every fill happened inside its bar's range
+    fill_bar = (fill_times - first) // 60
+    np.maximum.at(high, fill_bar, fill_prices)
+    np.minimum.at(low, fill_bar, fill_prices)
+
+    return pd.DataFrame({
+        'time': bar_open,
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': np.round(rng.lognormal(3, 1, len(bar_open)), 3),
+    })
+
+
+def write_candle_files(candles_dir: str, trips: RoundTrips, seed: int = DEFAULT_SEED,
+                       skip: Sequence[str] = ()) -> List[str]:
+    """candles/<ASSET>.csv for each asset traded in `trips` (unix-second bar open times)"""
+    os.makedirs(candles_dir, exist_ok=True)
+    written = []
+    for asset in sorted(set(trips.asset.tolist()) - set(skip)):
+        bars = generate_candles(trips, asset, seed)
+        path = os.path.join(candles_dir, f"{asset}.csv")
+        bars.to_csv(path, index=False, float_format='%.8g')
+        written.append(path)
+    return written
+
+
+BROKER_WRITERS = {
+    'blofin': (BLOFIN_ASSETS, write_blofin_csv, 'csv', 2),      # (assets, writer, extension, rows per trip)
+    'edgex': (EDGEX_ASSETS, write_edgex_csv, 'csv', 2),
+    'breakout': (BREAKOUT_ASSETS, write_breakout_pdf, 'pdf', 2),
+}
+
+
+def generate_statements(output_root: str, transactions: Dict[str, int], files: int = 3, overlap: float = 0.2,
+                        seed: int = DEFAULT_SEED, start: str = DEFAULT_START,
+                        candles_dir: Optional[str] = None) -> Dict[str, List[str]]:
+    """Write statements for each broker under <output_root>/<broker>/
+
+    `transactions` is the number of unique normalized transactions wanted per
+    broker (entries plus exits). Returns the written files by broker. With
+    `candles_dir`, 1-minute candles are written for every traded asset too; an
+    asset traded at several brokers follows the first broker's fills.
+    """
+    written: Dict[str, List[str]] = {}
+    candle_assets: List[str] = []
+    for broker_index, (broker, count) in enumerate(transactions.items()):
+        if count <= 0:
+            continue
+        assets, writer, extension, rows_per_trip = BROKER_WRITERS[broker]
+        trips = generate_round_trips(max(1, count // rows_per_trip), assets, seed + broker_index, start)
+        folder = os.path.join(output_root, broker)
+        os.makedirs(folder, exist_ok=True)
+
+        written[broker] = []
+        for part, (first, last) in enumerate(overlapping_slices(len(trips), files, overlap), start=1):
+            path = os.path.join(folder, f"{broker}-synthetic-{count}-part{part:02d}.{extension}")
+            writer(path, trips, first, last)
+            written[broker].append(path)
+
+        if candles_dir:
+            candle_files = write_candle_files(candles_dir, trips, seed, skip=candle_assets)
+            candle_assets.extend(os.path.splitext(os.path.basename(path))[0] for path in candle_files)
+            written.setdefault('candles', []).extend(candle_files)
+    return written
+
+
+def is_within(path: str, folder: str) -> bool:
+    """True if path is folder or anything below it"""
+    path, folder = os.path.realpath(path), os.path.realpath(folder)
+    try:
+        return os.path.commonpath([path, folder]) == folder
+    except ValueError:  # different drives on Windows
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic broker statements for benchmarking")
+    parser.add_argument('--transactions', type=int, default=10_000,
+                        help="Unique transactions per broker (default %(default)s)")
+    parser.add_argument('--brokers', nargs='+', choices=BROKERS, default=list(BROKERS))
+    parser.add_argument('--breakout-transactions', type=int,
+                        help="Override the Breakout count (PDF parsing is far slower than CSV)")
+    parser.add_argument('--files', type=int, default=3, help="Files per broker (default %(default)s)")
+    parser.add_argument('--overlap', type=float, default=0.2,
+                        help="Fraction of a file shared with the next one (default %(default)s)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--start', default=DEFAULT_START, help="First trade date (default %(default)s)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Statements root (default '%(default)s')")
+    parser.add_argument('--allow-statements-root', action='store_true',
+                        help=f"Allow writing into the analyzer's real '{STATEMENTS_ROOT}' folder")
+    parser.add_argument('--candles', metavar='DIR',
+                        help="Also write 1-minute candles for the traded assets to this folder (e.g. candles)")
+    args = parser.parse_args(argv)
+
+    if is_within(args.output, STATEMENTS_ROOT) and not args.allow_statements_root:
+        parser.error(f"refusing to write synthetic statements into '{STATEMENTS_ROOT}' "
+                     f"(the analyzer would ingest them); pass --allow-statements-root to do it anyway")
+
+    counts = {broker: args.transactions for broker in args.brokers}
+    if 'breakout' in counts and args.breakout_transactions is not None:
+        counts['breakout'] = args.breakout_transactions
+
+    written = generate_statements(args.output, counts, args.files, args.overlap, args.seed, args.start, args.candles)
+    candle_files = written.pop('candles', [])
+    for broker, paths in written.items():
+        size_mb = sum(os.path.getsize(path) for path in paths) / 2**20
+        print(f"✅ {broker}: {counts[broker]:,} transactions in {len(paths)} files ({size_mb:.1f} MB)")
+    if candle_files:
+        size_mb = sum(os.path.getsize(path) for path in candle_files) / 2**20
+        print(f"✅ candles: {len(candle_files)} symbols in {args.candles} ({size_mb:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Statement Watcher
+Polls the broker statement folders and reports new or changed files.
+
+Polling keeps this dependency-free and works the same on Windows network
+drives, where native change notifications are unreliable. A scan is a handful
+of os.scandir calls, so a one-second interval costs next to nothing.
+
+Browser downloads arrive as a burst of events (temp file, rename, size
+growing), so a file is only reported once it has stopped changing for the
+debounce period.
+"""
+
+import fnmatch
+import os
+import time
+from typing import Dict, List, Tuple
+
+FileState = Tuple[float, int]  # (mtime, size)
+
+
+class StatementWatcher:
+    """Detects new or modified statement files under <root>/<broker>/"""
+
+    def __init__(self, root: str, broker_patterns: Dict[str, str], debounce: float = 2.0):
+        self.root = root
+        self.broker_patterns = broker_patterns
+        self.debounce = debounce
+        self._known = self._scan()
+        self._pending: Dict[str, Tuple[str, FileState, float]] = {}  # path -> (broker, state, last change)
+
+    def current_files(self) -> Dict[str, List[str]]:
+        """All matching files right now, grouped by broker"""
+        files: Dict[str, List[str]] = {broker: [] for broker in self.broker_patterns}
+        for path, (broker, _) in sorted(self._known.items()):
+            files[broker].append(path)
+        return files
+
+    def poll(self) -> Dict[str, List[str]]:
+        """Scan once; return files (by broker) that changed and have since settled"""
+        now = time.monotonic()
+        current = self._scan()
+
+        for path, (broker, state) in current.items():
+            known = self._known.get(path)
+            pending = self._pending.get(path)
+            if known is not None and known[1] == state and pending is None:
+                continue
+            if pending is None or pending[1] != state:
+                # New event for this file: (re)start its quiet period
+                self._pending[path] = (broker, state, now)
+
+        settled: Dict[str, List[str]] = {}
+        for path, (broker, state, changed_at) in list(self._pending.items()):
+            if path not in current:
+                # Temp download file that was renamed away, or a deleted statement
+                del self._pending[path]
+                continue
+            if now - changed_at >= self.debounce:
+                settled.setdefault(broker, []).append(path)
+                del self._pending[path]
+
+        self._known = current
+        for files in settled.values():
+            files.sort()
+        return settled
+
+    def _scan(self) -> Dict[str, Tuple[str, FileState]]:
+        found = {}
+        for broker, pattern in self.broker_patterns.items():
+            folder = os.path.join(self.root, broker)
+            try:
+                entries = list(os.scandir(folder))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if not entry.is_file() or not fnmatch.fnmatch(entry.name.lower(), pattern):
+                    continue
+                stat = entry.stat()
+                found[entry.path] = (broker, (stat.st_mtime, stat.st_size))
+        return found
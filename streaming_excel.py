@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Streaming Excel Writer
+Write-only xlsx backend for the trading performance report.
+
+Rows are streamed straight to disk through openpyxl's write-only mode, so the
+workbook never has to be held in memory. Any sheet that would exceed Excel's
+1,048,576-row limit rolls over to numbered continuation sheets
+("All Trades", "All Trades (2)", ...) with the header repeated on each.
+
+A ReportSheet describes one logical sheet once (a DataFrame view or explicit
+rows) so every output can share it; read_back() gives the frame pd.read_excel
+would return for it, letting other outputs skip the workbook round trip.
+"""
+
+import datetime
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils.datetime import from_excel, to_excel
+
+EXCEL_MAX_ROWS = 1_048_576
+SHEET_NAME_MAX_LENGTH = 31
+CHUNK_SIZE = 10_000
+EXCEL_NUMBER_FORMAT = "%.16g"  # how openpyxl serializes numbers
+
+_CONTINUATION_PATTERN = re.compile(r'^(?P<base>.+) \((?P<part>\d+)\)$')
+
+
+def continuation_sheet_name(base_name: str, part: int) -> str:
+    """Name of the Nth sheet for a logical sheet (part 1 is the base name)"""
+    if part <= 1:
+        return base_name[:SHEET_NAME_MAX_LENGTH]
+    suffix = f" ({part})"
+    return base_name[:SHEET_NAME_MAX_LENGTH - len(suffix)] + suffix
+
+
+def split_continuation_sheet_name(sheet_name: str) -> Tuple[str, int]:
+    """Inverse of continuation_sheet_name: returns (base name, part number)"""
+    match = _CONTINUATION_PATTERN.match(sheet_name)
+    if match:
+        return match.group('base'), int(match.group('part'))
+    return sheet_name, 1
+
+
+def dataframe_to_rows(df: pd.DataFrame, index: bool = False, chunk_size: int = CHUNK_SIZE,
+                      columns: Optional[List[str]] = None) -> Iterable[List[Any]]:
+    """Yield Excel-ready data rows from a DataFrame, chunk by chunk"""
+    selected = list(df.columns) if columns is None else columns
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        values = [_excel_values(chunk[column]) for column in selected]
+        if index:
+            values.insert(0, _excel_values(chunk.index.to_series()))
+        for row in zip(*values):
+            yield list(row)
+
+
+def dataframe_header(df: pd.DataFrame, index: bool = False, columns: Optional[List[str]] = None) -> List[Any]:
+    """Header row matching pandas' to_excel layout for single-level columns"""
+    header = [str(column) for column in (df.columns if columns is None else columns)]
+    if index:
+        header.insert(0, df.index.name if df.index.name is not None else None)
+    return header
+
+
+def _excel_values(series: pd.Series) -> List[Any]:
+    """Convert a column to plain Python values with blanks for missing data"""
+    values = series.astype(object)
+    return values.where(series.notna(), None).tolist()
+
+
+@dataclass(frozen=True)
+class ReportSheet:
+    """One logical report sheet: a read-only DataFrame view or explicit rows"""
+    name: str
+    frame: Optional[pd.DataFrame] = None
+    index: bool = False
+    columns: Optional[List[str]] = None
+    grid: Optional[Tuple[Tuple[Any, ...], ...]] = None  # explicit rows, header first
+
+    def header(self) -> List[Any]:
+        if self.grid is not None:
+            return list(self.grid[0])
+        return dataframe_header(self.frame, index=self.index, columns=self.columns)
+
+    def rows(self) -> Iterable[List[Any]]:
+        if self.grid is not None:
+            return (list(row) for row in self.grid[1:])
+        return dataframe_to_rows(self.frame, index=self.index, columns=self.columns)
+
+    def read_back(self) -> pd.DataFrame:
+        """The DataFrame pd.read_excel (openpyxl engine) returns for this sheet once written"""
+        return read_back_frame(self.header(), self.rows())
+
+
+def excel_cell_value(value: Any) -> Any:
+    """A value as it comes back from a written cell through pandas' openpyxl reader"""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        # openpyxl stores "=..." as a formula; with no cached result it reads back empty
+        return "" if value.startswith('=') else value
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        if math.isnan(value) or math.isinf(value):
+            return ""
+        # openpyxl writes numbers to 16 significant digits; pandas hands
+        # integral ones back as int
+        value = float(EXCEL_NUMBER_FORMAT % value)
+        as_int = int(value)
+        return as_int if as_int == value else value
+    if isinstance(value, pd.Timestamp):
+        value = value.to_pydatetime()
+    if isinstance(value, datetime.datetime):
+        # Dates are stored as serial day numbers, so they share that rounding
+        return from_excel(float(EXCEL_NUMBER_FORMAT % to_excel(value)))
+    return value
+
+
+def read_back_frame(header: List[Any], rows: Iterable[List[Any]]) -> pd.DataFrame:
+    """Equivalent of writing header + rows to a sheet and reading it with pd.read_excel"""
+    data = []
+    last_row_with_data = -1
+    for row_number, row in enumerate([header, *rows]):
+        converted = [excel_cell_value(value) for value in row]
+        # Same trimming as the openpyxl reader: trailing blank cells, then trailing blank rows
+        while converted and converted[-1] == "":
+            converted.pop()
+        if converted:
+            last_row_with_data = row_number
+        data.append(converted)
+    data = data[:last_row_with_data + 1]
+    if not data:
+        return pd.DataFrame()
+
+    width = max(len(row) for row in data)
+    data = [row + [""] * (width - len(row)) for row in data]
+    return TextParser(data, header=0, skip_blank_lines=False).read()
+
+
+class StreamingExcelWriter:
+    """Constant-memory xlsx writer with automatic sheet splitting"""
+
+    def __init__(self, output_file: str, max_rows: int = EXCEL_MAX_ROWS):
+        if max_rows < 2:
+            raise ValueError("max_rows must leave room for a header and at least one data row")
+        self.output_file = output_file
+        self.max_rows = max_rows
+        self.workbook = Workbook(write_only=True)
+        self.sheets: Dict[str, List[str]] = {}  # logical sheet -> physical sheet names
+        self._header_font = Font(bold=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        return False
+
+    def close(self):
+        """Flush the workbook to disk"""
+        self.workbook.save(self.output_file)
+
+    def write_rows(self, sheet_name: str, rows: Iterable[List[Any]], header: Optional[List[Any]] = None) -> List[str]:
+        """Stream rows into a logical sheet, rolling over at the row limit"""
+        part = 0
+        worksheet = None
+        rows_in_sheet = self.max_rows  # force a new sheet on the first row
+        physical_names = self.sheets.setdefault(sheet_name, [])
+
+        for row in rows:
+            if rows_in_sheet >= self.max_rows:
+                part += 1
+                worksheet = self.workbook.create_sheet(continuation_sheet_name(sheet_name, part))
+                physical_names.append(worksheet.title)
+                rows_in_sheet = 0
+                if header is not None:
+                    worksheet.append(self._styled_header(worksheet, header))
+                    rows_in_sheet = 1
+            worksheet.append(row)
+            rows_in_sheet += 1
+
+        if worksheet is None and header is not None:
+            # Empty frame: still emit the header so the sheet exists
+            worksheet = self.workbook.create_sheet(continuation_sheet_name(sheet_name, 1))
+            physical_names.append(worksheet.title)
+            worksheet.append(self._styled_header(worksheet, header))
+
+        return physical_names
+
+    def write_dataframe(self, df: pd.DataFrame, sheet_name: str, index: bool = False,
+                        columns: Optional[List[str]] = None) -> List[str]:
+        """Stream a DataFrame (or a subset of its columns, without copying) into a logical sheet"""
+        return self.write_rows(sheet_name, dataframe_to_rows(df, index=index, columns=columns),
+                               header=dataframe_header(df, index=index, columns=columns))
+
+    def write_sheet(self, sheet: ReportSheet) -> List[str]:
+        """Stream a ReportSheet into the workbook"""
+        return self.write_rows(sheet.name, sheet.rows(), header=sheet.header())
+
+    def _styled_header(self, worksheet, header: List[Any]) -> List[Any]:
+        cells = []
+        for value in header:
+            cell = WriteOnlyCell(worksheet, value=value)
+            cell.font = self._header_font
+            cells.append(cell)
+        return cells
+
+
+def overlay_rows(base_rows: List[List[Any]], block_rows: List[List[Any]], start_row: int) -> List[List[Any]]:
+    """Place a block of rows over a grid starting at start_row (like to_excel(startrow=...))"""
+    grid = [list(row) for row in base_rows]
+    for offset, block_row in enumerate(block_rows):
+        row_number = start_row + offset
+        while len(grid) <= row_number:
+            grid.append([])
+        row = grid[row_number]
+        if len(row) < len(block_row):
+            row.extend([None] * (len(block_row) - len(row)))
+        for column, value in enumerate(block_row):
+            row[column] = value
+    return grid
@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+"""
+Trade Store
+Embedded SQLite system of record for the trading performance analyzer.
+
+Every normalized transaction is stored once, keyed by its dedup fingerprint, so
+re-downloaded or overlapping statements are skipped across runs, not just within
+one run. Ingested statement files are tracked by content hash, extracted PDF
+page text is cached by page content hash, and the derived position history is
+kept alongside. The time, coin and summary aggregates can be
+pushed down to SQL, so ad-hoc questions don't need the full ledger in memory
+(the analytics server answers from them); bootstrap intervals only read each
+bucket's PNL column.
+"""
+
+import hashlib
+import os
+import sqlite3
+from datetime import datetime
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bootstrap_stats import bootstrap_buckets
+
+DEFAULT_DB_PATH = 'trading_data.db'
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+MAX_INTERVAL_CACHE_ENTRIES = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id            INTEGER PRIMARY KEY,
+    fingerprint   TEXT NOT NULL UNIQUE,
+    broker        TEXT NOT NULL,
+    asset         TEXT NOT NULL,
+    date          TEXT NOT NULL,
+    side          TEXT,
+    type          TEXT,
+    quantity      REAL,
+    price         REAL,
+    pnl           REAL,
+    fee           REAL,
+    funding       REAL,
+    leverage,
+    order_options TEXT,
+    source_file   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_broker_asset_date
+    ON transactions (broker, asset, date);
+CREATE INDEX IF NOT EXISTS idx_transactions_date
+    ON transactions (date);
+
+CREATE TABLE IF NOT EXISTS positions (
+    id               INTEGER PRIMARY KEY,
+    broker           TEXT NOT NULL,
+    asset            TEXT NOT NULL,
+    position_type    TEXT,
+    open_date        TEXT NOT NULL,
+    close_date       TEXT,
+    duration_hours   REAL,
+    position_size    REAL,
+    avg_entry_price  REAL,
+    total_pnl        REAL,
+    total_fees       REAL,
+    total_funding    REAL,
+    maker_fees       REAL,
+    taker_fees       REAL,
+    net_pnl          REAL,
+    number_of_trades INTEGER,
+    status           TEXT,
+    day_of_week      TEXT,
+    hour_of_day      INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_positions_broker_asset_open_date
+    ON positions (broker, asset, open_date);
+
+CREATE TABLE IF NOT EXISTS ingested_files (
+    path        TEXT PRIMARY KEY,
+    broker      TEXT NOT NULL,
+    sha256      TEXT NOT NULL,
+    size        INTEGER,
+    mtime       REAL,
+    rows_added  INTEGER,
+    ingested_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS pdf_pages (
+    content_hash TEXT PRIMARY KEY,
+    broker       TEXT NOT NULL,
+    text         TEXT NOT NULL,
+    first_id     TEXT,
+    last_id      TEXT,
+    cached_at    TEXT
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# DataFrame column -> table column, in the normalized schema order
+TRANSACTION_COLUMNS = [
+    ('Broker', 'broker'),
+    ('Asset', 'asset'),
+    ('Date', 'date'),
+    ('Side', 'side'),
+    ('Type', 'type'),
+    ('Quantity', 'quantity'),
+    ('Price', 'price'),
+    ('PNL', 'pnl'),
+    ('Fee', 'fee'),
+    ('Funding', 'funding'),
+    ('Leverage', 'leverage'),
+    ('Order_Options', 'order_options'),
+    ('Fingerprint', 'fingerprint'),
+]
+
+POSITION_COLUMNS = [
+    ('Broker', 'broker'),
+    ('Asset', 'asset'),
+    ('Position Type', 'position_type'),
+    ('Open Date', 'open_date'),
+    ('Close Date', 'close_date'),
+    ('Duration (Hours)', 'duration_hours'),
+    ('Position Size', 'position_size'),
+    ('Avg Entry Price', 'avg_entry_price'),
+    ('Total PNL', 'total_pnl'),
+    ('Total Fees', 'total_fees'),
+    ('Total Funding', 'total_funding'),
+    ('Maker Fees', 'maker_fees'),
+    ('Taker Fees', 'taker_fees'),
+    ('Net PNL', 'net_pnl'),
+    ('Number of Trades', 'number_of_trades'),
+    ('Status', 'status'),
+    ('Day of Week', 'day_of_week'),
+    ('Hour of Day', 'hour_of_day'),
+]
+
+DAY_NAMES = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']  # strftime('%w') order
+WEEKDAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Same breakeven rules the pandas analytics use
+PNL_TRADE_CONDITION = "pnl != 0 AND abs(pnl) > 0.01"
+CLOSED_POSITION_CONDITION = "status = 'Closed' AND abs(net_pnl) > 0.01"
+
+DAY_BUCKET = "CAST(strftime('%w', date) AS INTEGER)"
+HOUR_BUCKET = "CAST(strftime('%H', date) AS INTEGER)"
+WEEKEND_BUCKET = "strftime('%w', date) IN ('0', '6')"
+
+BUCKET_AGGREGATES = """
+    COUNT(*)                                   AS trade_count,
+    round(SUM(pnl), 2)                         AS total_pnl,
+    round(AVG(pnl), 2)                         AS avg_pnl,
+    round(SUM(fee), 2)                         AS total_fees,
+    round(100.0 * SUM(pnl > 0) / COUNT(*), 1)  AS win_rate,
+    round(MAX(pnl), 2)                         AS max_win,
+    round(MIN(pnl), 2)                         AS max_loss
+"""
+
+BUCKET_COLUMNS = ['Trade Count', 'Total PNL', 'Avg PNL', 'Total Fees', 'Net PNL', 'Win Rate %', 'Max Win', 'Max Loss']
+
+
+def file_sha256(file_path: str) -> str:
+    """Content hash of a statement file"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _to_sql_value(value):
+    """Convert pandas/numpy scalars to values sqlite3 can bind"""
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.strftime(DATE_FORMAT)
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+class TradeStore:
+    """SQLite-backed ledger of transactions, positions and ingested files"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, check_same_thread: bool = True):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path, check_same_thread=check_same_thread)
+        self.connection.executescript(SCHEMA)
+        self._migrate()
+        self.connection.commit()
+        # (data_version, bucket_expression, where, params) -> bootstrap intervals
+        self._interval_cache: Dict[Tuple, pd.DataFrame] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        self.connection.close()
+
+    def _columns(self, table: str) -> Set[str]:
+        return {row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")}
+
+    def _migrate(self):
+        """Bring a database written by an earlier version up to the current schema"""
+        if 'funding' not in self._columns('transactions'):
+            self.connection.execute("ALTER TABLE transactions ADD COLUMN funding REAL")
+            # Edgex exits used to store Closed P&L, which is net of both legs' fees and of
+            # funding; add the fees back so PNL - Fee stops counting them twice. Funding
+            # stays unrecorded (NULL) for these rows, though it is inside their PNL.
+            fixed = self.connection.execute(
+                "UPDATE transactions SET pnl = pnl + fee + COALESCE(("
+                "    SELECT entry.fee FROM transactions AS entry"
+                "    WHERE entry.fingerprint = substr(transactions.fingerprint, 1, length(transactions.fingerprint) - 5) || '#entry'"
+                "), 0) WHERE broker = 'Edgex' AND fingerprint LIKE '%#exit'"
+            ).rowcount
+            if fixed:
+                self._bump_data_version()
+        missing = [column for column in ('total_funding', 'maker_fees', 'taker_fees')
+                   if column not in self._columns('positions')]
+        for column in missing:
+            self.connection.execute(f"ALTER TABLE positions ADD COLUMN {column} REAL")
+
+    # ------------------------------------------------------------------
+    # Versioning
+    # ------------------------------------------------------------------
+
+    def data_version(self) -> int:
+        """Monotonic counter bumped whenever new transactions or a new position history are stored"""
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _bump_data_version(self):
+        self.connection.execute(
+            "INSERT INTO meta (key, value) VALUES ('data_version', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    def known_fingerprints(self) -> Set[str]:
+        """All stored transaction fingerprints"""
+        return {row[0] for row in self.connection.execute("SELECT fingerprint FROM transactions")}
+
+    def is_file_ingested(self, file_path: str, sha256: Optional[str] = None) -> bool:
+        """True if this exact file content has been ingested before"""
+        sha256 = sha256 or file_sha256(file_path)
+        row = self.connection.execute(
+            "SELECT 1 FROM ingested_files WHERE path = ? AND sha256 = ?", (os.path.abspath(file_path), sha256)
+        ).fetchone()
+        return row is not None
+
+    def record_file(self, file_path: str, broker: str, rows_added: int, sha256: Optional[str] = None):
+        """Remember that a statement file has been ingested"""
+        stat = os.stat(file_path)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO ingested_files (path, broker, sha256, size, mtime, rows_added, ingested_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (os.path.abspath(file_path), broker, sha256 or file_sha256(file_path), stat.st_size,
+             stat.st_mtime, rows_added, datetime.now().isoformat()),
+        )
+        self.connection.commit()
+
+    def cached_page_text(self, content_hash: str) -> Optional[str]:
+        """Extracted text of a statement PDF page seen before, by pdf_pages.page_content_hash"""
+        row = self.connection.execute("SELECT text FROM pdf_pages WHERE content_hash = ?", (content_hash,)).fetchone()
+        return row[0] if row else None
+
+    def cache_page_text(self, content_hash: str, broker: str, text: str,
+                        first_id: Optional[str] = None, last_id: Optional[str] = None):
+        """Remember a page's extracted text and the transaction IDs it starts and ends with"""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO pdf_pages (content_hash, broker, text, first_id, last_id, cached_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (content_hash, broker, text, first_id, last_id, datetime.now().isoformat()),
+        )
+
+    def add_transactions(self, df: pd.DataFrame, source_file: Optional[str] = None) -> int:
+        """Insert normalized transactions, ignoring fingerprints already stored"""
+        if df is None or df.empty:
+            return 0
+
+        frame_columns = [frame_column for frame_column, _ in TRANSACTION_COLUMNS]
+        table_columns = [table_column for _, table_column in TRANSACTION_COLUMNS] + ['source_file']
+        placeholders = ', '.join('?' for _ in table_columns)
+        rows = (
+            tuple(_to_sql_value(value) for value in record) + (source_file,)
+            for record in df[frame_columns].itertuples(index=False, name=None)
+        )
+
+        before = self.connection.total_changes
+        self.connection.executemany(
+            f"INSERT OR IGNORE INTO transactions ({', '.join(table_columns)}) VALUES ({placeholders})", rows
+        )
+        inserted = self.connection.total_changes - before
+        if inserted:
+            self._bump_data_version()
+        self.connection.commit()
+        return inserted
+
+    def replace_positions(self, positions: pd.DataFrame):
+        """Replace the stored position history with a freshly derived one
+
+        A changed history bumps the data version, so readers caching by it
+        (the analytics server) drop positions derived from the old ledger.
+        """
+        frame_columns = [frame_column for frame_column, _ in POSITION_COLUMNS]
+        table_columns = [table_column for _, table_column in POSITION_COLUMNS]
+        placeholders = ', '.join('?' for _ in table_columns)
+        rows = []
+        if positions is not None and not positions.empty:
+            rows = [tuple(_to_sql_value(value) for value in record)
+                    for record in positions[frame_columns].itertuples(index=False, name=None)]
+
+        # Rerunning on an unchanged ledger derives the same history: nothing to replace
+        positions_hash = hashlib.sha256(repr(rows).encode('utf-8')).hexdigest()
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'positions_hash'").fetchone()
+        if row is not None and row[0] == positions_hash:
+            return
+
+        self.connection.execute("DELETE FROM positions")
+        self.connection.executemany(
+            f"INSERT INTO positions ({', '.join(table_columns)}) VALUES ({placeholders})", rows
+        )
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('positions_hash', ?)",
+                                (positions_hash,))
+        self._bump_data_version()
+        self.connection.commit()
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def load_transactions(self, broker: Optional[str] = None, asset: Optional[str] = None,
+                          start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+        """Load transactions in the normalized schema, in ingestion order"""
+        where, params = self._where(broker=broker, asset=asset, start=start, end=end)
+        table_columns = ', '.join(table_column for _, table_column in TRANSACTION_COLUMNS)
+        df = pd.read_sql_query(f"SELECT {table_columns} FROM transactions {where} ORDER BY id",
+                               self.connection, params=params)
+        df.columns = [frame_column for frame_column, _ in TRANSACTION_COLUMNS]
+        df['Date'] = pd.to_datetime(df['Date'], format=DATE_FORMAT)
+        return df
+
+    def load_positions(self, broker: Optional[str] = None, asset: Optional[str] = None,
+                       start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+        """Load the stored position history, most recent first"""
+        where, params = self._where(broker=broker, asset=asset, start=start, end=end, date_column='open_date')
+        table_columns = ', '.join(table_column for _, table_column in POSITION_COLUMNS)
+        df = pd.read_sql_query(f"SELECT {table_columns} FROM positions {where} ORDER BY open_date DESC, id",
+                               self.connection, params=params)
+        df.columns = [frame_column for frame_column, _ in POSITION_COLUMNS]
+        for column in ['Open Date', 'Close Date']:
+            df[column] = pd.to_datetime(df[column], format=DATE_FORMAT)
+        return df
+
+    def brokers(self) -> List[str]:
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT broker FROM transactions ORDER BY broker")]
+
+    # ------------------------------------------------------------------
+    # SQL analytics
+    # ------------------------------------------------------------------
+
+    def time_analytics(self, broker: Optional[str] = None, asset: Optional[str] = None,
+                       start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        """Day / hour / weekend tables, as TradingDataProcessor.generate_time_analytics"""
+        where, params = self._where(broker=broker, asset=asset, start=start, end=end, extra=PNL_TRADE_CONDITION)
+        analytics = {}
+
+        day_stats = self._bucket_query(DAY_BUCKET, where, params, label=DAY_NAMES.__getitem__)
+        if day_stats.empty:
+            return analytics
+        day_stats = day_stats.reindex([day for day in WEEKDAY_ORDER if day in day_stats.index])
+        day_stats.index.name = 'Day of Week'
+        analytics['By Day of Week'] = day_stats
+
+        hour_stats = self._bucket_query(HOUR_BUCKET, where, params)
+        hour_stats.index.name = 'Hour of Day'
+        analytics['By Hour of Day'] = hour_stats
+
+        weekend_stats = self._bucket_query(WEEKEND_BUCKET, where, params, label=bool)
+        weekend_stats.index = ['Weekend' if is_weekend else 'Weekday' for is_weekend in weekend_stats.index]
+        analytics['Weekend vs Weekday'] = weekend_stats
+
+        return analytics
+
+    def coin_trade_stats(self, broker: Optional[str] = None, start: Optional[str] = None,
+                         end: Optional[str] = None) -> pd.DataFrame:
+        """Per-asset statistics, generate_coin_analytics flattened to one row per asset
+
+        Position counts and durations come from the stored position history;
+        the per-broker breakdown is coin_broker_stats.
+        """
+        where, params = self._where(broker=broker, start=start, end=end, extra=PNL_TRADE_CONDITION)
+        df = pd.read_sql_query(f"""
+            SELECT asset,
+                   COUNT(*)                                  AS "Total Trades",
+                   SUM(pnl > 0)                              AS "Winning Trades",
+                   SUM(pnl < 0)                              AS "Losing Trades",
+                   round(100.0 * SUM(pnl > 0) / COUNT(*), 1) AS "Win Rate %",
+                   round(SUM(pnl), 2)                        AS "Total PNL",
+                   round(SUM(fee), 2)                        AS "Total Fees",
+                   round(SUM(pnl) - SUM(fee), 2)             AS "Net PNL",
+                   round(AVG(pnl), 2)                        AS "Avg PNL per Trade",
+                   round(MAX(pnl), 2)                        AS "Max Win",
+                   round(MIN(pnl), 2)                        AS "Max Loss",
+                   round(AVG(quantity), 4)                   AS "Avg Trade Size",
+                   round(MAX(quantity), 4)                   AS "Max Trade Size",
+                   round(MIN(quantity), 4)                   AS "Min Trade Size"
+            FROM transactions {where}
+            GROUP BY asset
+            ORDER BY "Net PNL" DESC
+        """, self.connection, params=params).set_index('asset').rename_axis('Asset')
+        if df.empty:
+            return df
+
+        position_where, position_params = self._where(broker=broker, start=start, end=end, date_column='open_date',
+                                                      extra=CLOSED_POSITION_CONDITION)
+        positions = pd.read_sql_query(f"""
+            SELECT asset,
+                   COUNT(*)                                      AS "Total Positions",
+                   round(100.0 * SUM(net_pnl > 0) / COUNT(*), 1) AS "Position Win Rate %",
+                   round(AVG(duration_hours), 1)                 AS "Avg Duration (Hours)",
+                   round(MAX(duration_hours), 1)                 AS "Max Duration (Hours)",
+                   round(MIN(duration_hours), 1)                 AS "Min Duration (Hours)"
+            FROM positions {position_where}
+            GROUP BY asset
+        """, self.connection, params=position_params).set_index('asset')
+        df = df.join(positions)
+        df[positions.columns] = df[positions.columns].fillna(0)
+        df['Total Positions'] = df['Total Positions'].astype(int)
+
+        # Best day / hour by total PNL; a single trade has none
+        for column, bucket_expression, label in [('Best Day of Week', DAY_BUCKET, DAY_NAMES.__getitem__),
+                                                 ('Best Hour of Day', HOUR_BUCKET, int)]:
+            totals = pd.read_sql_query(f"""
+                SELECT asset, {bucket_expression} AS bucket, SUM(pnl) AS pnl
+                FROM transactions {where}
+                GROUP BY asset, bucket
+            """, self.connection, params=params)
+            best = totals.loc[totals.groupby('asset')['pnl'].idxmax()].set_index('asset')['bucket'].map(label)
+            df[column] = best.reindex(df.index).where(df['Total Trades'] > 1, 'N/A')
+
+        return df.join(self._bucket_intervals('asset', where, params))
+
+    def coin_broker_stats(self, broker: Optional[str] = None, start: Optional[str] = None,
+                          end: Optional[str] = None) -> pd.DataFrame:
+        """Per-asset, per-broker trade totals (generate_coin_analytics' Broker Breakdown), indexed by (Asset, Broker)"""
+        where, params = self._where(broker=broker, start=start, end=end, extra=PNL_TRADE_CONDITION)
+        df = pd.read_sql_query(f"""
+            SELECT asset AS Asset, broker AS Broker,
+                   COUNT(*)                    AS "Trade Count",
+                   round(SUM(pnl), 2)          AS "Total PNL",
+                   round(AVG(pnl), 2)          AS "Avg PNL",
+                   round(SUM(fee), 2)          AS "Total Fees"
+            FROM transactions {where}
+            GROUP BY asset, broker
+            ORDER BY asset, broker
+        """, self.connection, params=params).set_index(['Asset', 'Broker'])
+        df['Net PNL'] = (df['Total PNL'] - df['Total Fees']).round(2)
+        return df
+
+    def summary_stats(self, broker: Optional[str] = None, asset: Optional[str] = None,
+                      start: Optional[str] = None, end: Optional[str] = None) -> Dict:
+        """Headline metrics, same keys as TradingDataProcessor.generate_summary_stats"""
+        where, params = self._where(broker=broker, asset=asset, start=start, end=end)
+        total_transactions, total_pnl, total_fees = self.connection.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(pnl), 0), COALESCE(SUM(fee), 0) FROM transactions {where}", params
+        ).fetchone()
+        if not total_transactions:
+            return {}
+
+        summary = {
+            'Total Transactions': total_transactions,
+            'Total PNL': total_pnl,
+            'Total Fees': total_fees,
+            'Net PNL': total_pnl - total_fees,
+        }
+
+        position_where, position_params = self._where(
+            broker=broker, asset=asset, start=start, end=end, date_column='open_date',
+            extra=CLOSED_POSITION_CONDITION,
+        )
+        closed, max_win, max_loss, avg_pnl, profitable, losing = self.connection.execute(f"""
+            SELECT COUNT(*), MAX(net_pnl), MIN(net_pnl), AVG(net_pnl), SUM(net_pnl > 0), SUM(net_pnl < 0)
+            FROM positions {position_where}
+        """, position_params).fetchone()
+        summary['Max Win'] = max_win or 0
+        summary['Max Loss'] = max_loss or 0
+        summary['Avg PNL per Position'] = avg_pnl or 0
+        summary['Position Win Rate'] = (profitable / closed * 100) if closed else 0
+        summary['Profitable Positions'] = profitable or 0
+        summary['Losing Positions'] = losing or 0
+        summary['Total Closed Positions'] = closed
+
+        trade_where, trade_params = self._where(broker=broker, asset=asset, start=start, end=end,
+                                                extra=PNL_TRADE_CONDITION)
+        pnl_count, avg_trade_pnl, avg_trade_size, profitable_trades, losing_trades = self.connection.execute(f"""
+            SELECT COUNT(*), AVG(pnl), AVG(quantity), SUM(pnl > 0), SUM(pnl < 0)
+            FROM transactions {trade_where}
+        """, trade_params).fetchone()
+        summary['Avg PNL per Trade'] = avg_trade_pnl or 0
+        summary['Avg Trade Size'] = avg_trade_size or 0
+        summary['Trade Win Rate'] = (profitable_trades / pnl_count * 100) if pnl_count else 0
+        summary['Profitable Trades'] = profitable_trades or 0
+        summary['Losing Trades'] = losing_trades or 0
+
+        broker_stats = pd.read_sql_query(f"""
+            SELECT broker AS Broker,
+                   round(SUM(pnl), 2)      AS "Total PNL",
+                   round(AVG(pnl), 2)      AS "Avg PNL",
+                   COUNT(*)                AS "Trade Count",
+                   round(MAX(pnl), 2)      AS "Max Win",
+                   round(MIN(pnl), 2)      AS "Max Loss",
+                   round(SUM(fee), 2)      AS "Total Fees",
+                   round(AVG(quantity), 2) AS "Avg Trade Size"
+            FROM transactions {where}
+            GROUP BY broker
+            ORDER BY broker
+        """, self.connection, params=params).set_index('Broker')
+        broker_stats['Net PNL'] = broker_stats['Total PNL'] - broker_stats['Total Fees']
+        broker_win_rates = pd.read_sql_query(f"""
+            SELECT broker AS Broker, round(100.0 * SUM(pnl > 0) / COUNT(*), 1) AS "Win Rate %"
+            FROM transactions {trade_where}
+            GROUP BY broker
+        """, self.connection, params=trade_params).set_index('Broker')
+        broker_stats['Win Rate %'] = broker_win_rates['Win Rate %']
+        summary['By Broker'] = broker_stats
+
+        return summary
+
+    def _bucket_query(self, bucket_expression: str, where: str, params: Tuple,
+                      label: Callable[[Hashable], Hashable] = lambda bucket: bucket) -> pd.DataFrame:
+        """BUCKET_COLUMNS plus bootstrap intervals per bucket, indexed by label(bucket)"""
+        df = pd.read_sql_query(f"""
+            SELECT {bucket_expression} AS bucket, {BUCKET_AGGREGATES}
+            FROM transactions {where}
+            GROUP BY bucket
+            ORDER BY bucket
+        """, self.connection, params=params).set_index('bucket')
+        df.index.name = None
+        df['net_pnl'] = df['total_pnl'] - df['total_fees']
+        df = df[['trade_count', 'total_pnl', 'avg_pnl', 'total_fees', 'net_pnl', 'win_rate', 'max_win', 'max_loss']]
+        df.columns = BUCKET_COLUMNS
+        df.index = [label(bucket) for bucket in df.index]
+        return df.join(self._bucket_intervals(bucket_expression, where, params, label))
+
+    def _bucket_intervals(self, bucket_expression: str, where: str, params: Tuple,
+                          label: Callable[[Hashable], Hashable] = lambda bucket: bucket) -> pd.DataFrame:
+        """bootstrap_stats.CI_COLUMNS per bucket, keyed as the pandas analytics key their buckets (same seeds)
+
+        Resampling dominates a cold aggregate query, so intervals are cached per data
+        version and filters; each bucket expression always gets the same label.
+        """
+        data_version = self.data_version()
+        key = (data_version, bucket_expression, where, params)
+        intervals = self._interval_cache.get(key)
+        if intervals is not None:
+            return intervals
+
+        pnl = pd.read_sql_query(f"""
+            SELECT {bucket_expression} AS bucket, pnl
+            FROM transactions {where}
+            ORDER BY date DESC, id
+        """, self.connection, params=params)
+        intervals = bootstrap_buckets({label(bucket): group.to_numpy()
+                                       for bucket, group in pnl.groupby('bucket', sort=False)['pnl']})
+
+        stale = [cached_key for cached_key in self._interval_cache if cached_key[0] != data_version]
+        for cached_key in stale:
+            del self._interval_cache[cached_key]
+        if len(self._interval_cache) >= MAX_INTERVAL_CACHE_ENTRIES:
+            self._interval_cache.pop(next(iter(self._interval_cache)))
+        self._interval_cache[key] = intervals
+        return intervals
+
+    @staticmethod
+    def _where(broker: Optional[str] = None, asset: Optional[str] = None, start: Optional[str] = None,
+               end: Optional[str] = None, date_column: str = 'date', extra: Optional[str] = None) -> Tuple[str, Tuple]:
+        """Build a WHERE clause that can use the (broker, asset, date) index"""
+        clauses = []
+        params = []
+        if broker:
+            clauses.append("broker = ?")
+            params.append(broker)
+        if asset:
+            clauses.append("asset = ?")
+            params.append(asset)
+        if start:
+            clauses.append(f"{date_column} >= ?")
+            params.append(pd.Timestamp(start).strftime(DATE_FORMAT))
+        if end:
+            end_timestamp = pd.Timestamp(end)
+            if len(str(end)) <= 10:
+                # A bare date means "through the end of that day"
+                clauses.append(f"{date_column} < ?")
+                end_timestamp += pd.Timedelta(days=1)
+            else:
+                clauses.append(f"{date_column} <= ?")
+            params.append(end_timestamp.strftime(DATE_FORMAT))
+        if extra:
+            clauses.append(f"({extra})")
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", tuple(params)
@@ -1,3 +1,5 @@
+import { ActualExit } from './journal';
+
 export interface TradingData {
   summary: SummaryData;
   positions: Position[];
@@ -5,6 +7,9 @@ export interface TradingData {
   day_analysis: DayAnalysis[];
   hour_analysis?: HourAnalysis[];
   weekend_analysis?: WeekendAnalysis[];
+  fees?: FeeBreakdowns;
+  journal_matches?: JournalMatch[];
+  monte_carlo?: MonteCarlo;
   trades: Trade[];
   blofin?: Trade[];
   edgex?: Trade[];
@@ -45,6 +50,9 @@ export interface Position {
   'Net PNL': number;
   'Total PNL': number;
   'Total Fees': number;
+  'Total Funding'?: number;
+  'Maker Fees'?: number;
+  'Taker Fees'?: number;
   'Number of Trades': number;
   Status: 'Open' | 'Closed';
   'Day of Week': string;
@@ -65,9 +73,21 @@ export interface CoinAnalysis {
   'Avg Duration': string;
   'Best Day': string;
   'Best Hour': string | number;
+  'Win Rate CI'?: string;
+  'Avg PNL/Trade CI'?: string;
+  'Low Sample'?: boolean;
+}
+
+// Bootstrap 95% intervals; Low Sample marks buckets under 30 trades
+export interface BucketConfidence {
+  'Win Rate CI Low %'?: number;
+  'Win Rate CI High %'?: number;
+  'Avg PNL CI Low'?: number;
+  'Avg PNL CI High'?: number;
+  'Low Sample'?: boolean;
 }
 
-export interface DayAnalysis {
+export interface DayAnalysis extends BucketConfidence {
   'Day of Week': string;
   'Trade Count': number;
   'Total PNL': number;
@@ -79,7 +99,7 @@ export interface DayAnalysis {
   'Total Fees': number;
 }
 
-export interface HourAnalysis {
+export interface HourAnalysis extends BucketConfidence {
   'Hour of Day': number;
   'Trade Count': number;
   'Total PNL': number;
@@ -91,7 +111,7 @@ export interface HourAnalysis {
   'Total Fees': number;
 }
 
-export interface WeekendAnalysis {
+export interface WeekendAnalysis extends BucketConfidence {
   Period: 'Weekday' | 'Weekend';
   'Trade Count': number;
   'Total PNL': number;
@@ -113,14 +133,80 @@ export interface Trade {
   Price: number;
   PNL: number;
   Fee: number;
+  Funding?: number;
   Leverage: string;
   Order_Options: string;
+  Liquidity?: 'Maker' | 'Taker' | 'Unclassified';
+}
+
+// Precomputed by the Python pipeline (fee_analysis.py); Key is the broker, asset or YYYY-MM-DD day
+export interface FeeBreakdown {
+  Key: string;
+  Transactions: number;
+  Notional: number;
+  'Total Fees': number;
+  'Maker Fees': number;
+  'Taker Fees': number;
+  'Unclassified Fees': number;
+  Funding: number;
+  'Fees + Funding': number;
+  'Fee Rate %': number | null;
+  'Maker Fill %': number | null;
+}
+
+export interface FeeBreakdowns {
+  total?: FeeBreakdown;
+  by_broker?: FeeBreakdown[];
+  by_asset?: FeeBreakdown[];
+  by_day?: FeeBreakdown[];
+}
+
+export interface MatchedTrade {
+  'Trade ID': string;
+  Broker: string;
+  Asset: string;
+  Date: string;
+  Side: string;
+  Quantity: number;
+  Price: number;
+  PNL: number;
+}
+
+// Journal entry matched to exchange trades by the pipeline (exchange_matching.py)
+export interface JournalMatch {
+  entryId: string;
+  confidence: 'high' | 'medium' | 'low';
+  discrepancies: string[];
+  matchedTrades: MatchedTrade[];
+  suggestedUpdates: Partial<ActualExit>[];
+}
+
+// Monte Carlo simulation over closed positions (monte_carlo.py), keyed by method ('bootstrap' | 'shuffle')
+export interface EquityBand {
+  Positions: number;
+  P5: number;
+  P25: number;
+  P50: number;
+  P75: number;
+  P95: number;
+  Realized: number;
+}
+
+export interface RiskMetric {
+  Metric: string;
+  'Loss Limit': number | null;
+  Value: number;
+}
+
+export interface MonteCarlo {
+  bands?: Record<string, EquityBand[]>;
+  risk?: Record<string, RiskMetric[]>;
 }
 
 export interface Metadata {
   generated_at: string;
   total_sheets: number;
-  data_version: string;
+  data_version: number;
 }
 
 // Chart data interfaces
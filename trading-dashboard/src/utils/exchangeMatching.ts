@@ -44,6 +44,33 @@ export class ExchangeDataMatcher {
     });
   }
 
+  /**
+   * Matches precomputed by the pipeline (exchange_matching.py), falling back to
+   * matching in the browser for entries the pipeline hasn't seen yet
+   */
+  static getMatches(
+    journalEntries: JournalEntry[],
+    exchangeData: TradingData
+  ): ExchangeMatchResult[] {
+    const precomputed = new Map((exchangeData.journal_matches || []).map(match => [match.entryId, match]));
+    const missing = journalEntries.filter(entry => !precomputed.has(entry.id));
+    const computed = new Map(this.findMatches(missing, exchangeData).map(result => [result.journalEntry.id, result]));
+
+    return journalEntries.map(entry => {
+      const match = precomputed.get(entry.id);
+      if (!match) {
+        return computed.get(entry.id)!;
+      }
+      return {
+        journalEntry: entry,
+        matchedTrades: match.matchedTrades,
+        confidence: match.confidence,
+        discrepancies: match.discrepancies,
+        suggestedUpdates: match.suggestedUpdates
+      };
+    });
+  }
+
   /**
    * Find exchange trades that potentially match a journal entry
    */
@@ -184,7 +211,7 @@ export class ExchangeDataMatcher {
     exchangeData: TradingData,
     userApproval: (suggestions: ExchangeMatchResult[]) => Promise<boolean>
   ): Promise<JournalEntry[]> {
-    const matches = this.findMatches(journalEntries, exchangeData);
+    const matches = this.getMatches(journalEntries, exchangeData);
     const hasUpdates = matches.some(match => match.suggestedUpdates.length > 0);
 
     if (!hasUpdates) {
@@ -10,6 +10,10 @@ Consolidates trading data from multiple brokers (Blofin, Edgex, Breakout) into a
 - Position Reconciliation: Groups related trades into complete positions
 - Time Analytics: Performance analysis by day, hour, weekend vs weekday
 - Coin Analytics: Comprehensive per-asset performance breakdown
+- Confidence Intervals: Bootstrap win rate / avg PNL ranges and low-sample flags per bucket
+- Fee Analytics: Fees, funding and maker/taker split per broker, asset, day and position
+- Journal Matching: Links trading journal entries to the exchange fills they were executed as
+- Monte Carlo: Equity percentile bands, drawdown and risk-of-ruin odds from resampled positions
 
 📁 USAGE FOR REGULAR UPDATES:
 1. Download new statements from your brokers
@@ -37,18 +41,89 @@ import pdfplumber
 import re
 import os
 import glob
+import time
+import sys
+import argparse
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Sequence, Tuple, Optional
+from trade_store import DEFAULT_DB_PATH, TradeStore, file_sha256
+from atomic_io import RunLock, atomic_output_path
+from bootstrap_stats import bootstrap_groups
+from candle_store import DEFAULT_CANDLES_DIR, CandleLibrary
+from exchange_matching import load_journal, match_journal
+from excursions import compute_excursions
+from fee_analysis import classify_liquidity, fee_breakdowns, position_fee_totals
+from monte_carlo import SIMULATION_PATHS, simulate_positions
+from pdf_pages import page_content_hash, scan_strings
+from run_log import event, get_logger, run_logging
+from run_profiler import DEFAULT_TIMING_REPORT, PROFILE_MODES, MemoryBudgetExceeded, StageTimer, profiling, timed_stage
+from statement_watcher import StatementWatcher
+from streaming_excel import ReportSheet, StreamingExcelWriter, dataframe_header, dataframe_to_rows, overlay_rows
 import warnings
 warnings.filterwarnings('ignore')
 
+# Internal bookkeeping columns carried on transaction frames but not exported
+INTERNAL_COLUMNS = ['Fingerprint']
+
+# An Edgex row is one round trip; its entry and exit legs share a dedup fingerprint
+EDGEX_ENTRY_SUFFIX = '#entry'
+EDGEX_EXIT_SUFFIX = '#exit'
+
+# A Breakout transaction ID as its own PDF string, and pieces of one split across strings
+BREAKOUT_TRANSACTION_ID = re.compile(r'\d{5,}:\d+')
+BREAKOUT_PARTIAL_ID = re.compile(r'\d+:|:\d+|:')
+
+# Where broker statements live and which files belong to each broker
+STATEMENTS_ROOT = 'account statements'
+BROKER_FILE_PATTERNS = {
+    'blofin': '*.csv',
+    'edgex': '*.csv',
+    'breakout': '*.pdf',
+}
+
+COMMANDS = ('run', 'ingest', 'analyze')
+OUTPUT_FORMATS = ('xlsx', 'json', 'parquet')
+DEFAULT_OUTPUTS = ('xlsx', 'json')
+DEFAULT_EXCEL_FILE = 'trading_performance_report.xlsx'
+DASHBOARD_DATA_DIR = 'trading-dashboard/public/data'
+DEFAULT_JOURNAL_FILE = 'trading_journal.json'  # the dashboard journal's tradingJournal, exported
+
+DEFAULT_WATCH_INTERVAL = 1.0  # seconds between folder scans
+DEFAULT_WATCH_DEBOUNCE = 2.0  # quiet seconds after the last change before ingesting
+
+log = get_logger('analyzer')
+
+def dedup_key(fingerprint: str) -> str:
+    """Map a per-row fingerprint back to the key used for duplicate detection"""
+    for suffix in (EDGEX_ENTRY_SUFFIX, EDGEX_EXIT_SUFFIX):
+        if fingerprint.endswith(suffix):
+            return fingerprint[:-len(suffix)]
+    return fingerprint
+
+def export_columns(df: pd.DataFrame) -> List[str]:
+    """Columns of a transaction frame that belong in reports"""
+    return [column for column in df.columns if column not in INTERNAL_COLUMNS]
+
 class TradingDataProcessor:
-    def __init__(self):
+    def __init__(self, timer: Optional[StageTimer] = None):
+        self.timer = timer or StageTimer()  # per-stage timings (report only written when enabled)
         self.blofin_data = None
         self.edgex_data = None
         self.breakout_data = None
+        self.backtest_data = None  # simulated trades from mtf_backtest.py, same schema
         self.consolidated_data = None
         self.processed_transactions = set()  # Track processed transaction fingerprints
+        self.unparsed_lines: List[Tuple[str, str]] = []  # (line, error) for the Breakout file being parsed
+        self.parse_errors: Dict[str, str] = {}  # file -> error, for statement files whose parse failed
+        self.candles = CandleLibrary(DEFAULT_CANDLES_DIR)  # local OHLCV for position MAE/MFE
+        self.journal_entries: List[Dict] = []  # trading journal entries to match against the fills
+        self.simulation_paths = SIMULATION_PATHS  # Monte Carlo equity paths per method (0 to skip)
+        self.loss_limits: List[float] = []  # loss limits ($) to report ruin odds for, besides the defaults
+        # Derived from consolidated_data once per consolidation and shared read-only
+        self._cached_position_history = None
+        self._cached_pnl_trades = None
     
     def _create_transaction_fingerprint(self, broker: str, **kwargs) -> str:
         """Create a unique fingerprint for a transaction to detect duplicates"""
@@ -74,7 +149,7 @@ class TradingDataProcessor:
         
     def parse_blofin_data(self, file_path: str) -> pd.DataFrame:
         """Parse Blofin CSV data"""
-        print(f"📊 Processing Blofin data from: {file_path}")
+        log.info(f"📊 Processing Blofin data from: {file_path}")
         
         try:
             df = pd.read_csv(file_path)
@@ -123,24 +198,28 @@ class TradingDataProcessor:
                     'Price': price,
                     'PNL': pnl,
                     'Fee': fee,
+                    'Funding': 0.0,
                     'Leverage': row['Leverage'],
-                    'Order_Options': row['Order Options']
+                    'Order_Options': row['Order Options'],
+                    'Fingerprint': fingerprint
                 })
             
             df_normalized = pd.DataFrame(normalized_data)
+            parsed = event('file_parsed', broker='Blofin', file=file_path, rows=len(df_normalized), duplicates=duplicates_found)
             if duplicates_found > 0:
-                print(f"✅ Blofin: Processed {len(df_normalized)} transactions ({duplicates_found} duplicates skipped)")
+                log.info(f"✅ Blofin: Processed {len(df_normalized)} transactions ({duplicates_found} duplicates skipped)", extra=parsed)
             else:
-                print(f"✅ Blofin: Processed {len(df_normalized)} transactions")
+                log.info(f"✅ Blofin: Processed {len(df_normalized)} transactions", extra=parsed)
             return df_normalized
             
         except Exception as e:
-            print(f"❌ Error processing Blofin data: {e}")
+            log.error(f"❌ Error processing Blofin data: {e}", extra=event('file_failed', broker='Blofin', file=file_path, error=str(e)))
+            self.parse_errors[file_path] = str(e) or type(e).__name__
             return pd.DataFrame()
     
     def parse_edgex_data(self, file_path: str) -> pd.DataFrame:
         """Parse Edgex CSV data"""
-        print(f"📊 Processing Edgex data from: {file_path}")
+        log.info(f"📊 Processing Edgex data from: {file_path}")
         
         try:
             df = pd.read_csv(file_path)
@@ -158,7 +237,7 @@ class TradingDataProcessor:
                 pnl = self._extract_numeric(str(row['Closed P&L']))
                 open_fee = self._extract_numeric(str(row['Open Fee']))
                 close_fee = self._extract_numeric(str(row['Close Fee']))
-                total_fee = open_fee + close_fee
+                funding = self._extract_numeric(str(row['Funding Fee'])) if 'Funding Fee' in row else 0.0
                 order_time = pd.to_datetime(row['Order time'])
                 
                 # Extract quantity and unit
@@ -191,8 +270,10 @@ class TradingDataProcessor:
                     'Price': entry_price,
                     'PNL': 0,  # Entry has no PNL
                     'Fee': open_fee,
+                    'Funding': 0.0,
                     'Leverage': 'Unknown',
-                    'Order_Options': f"Entry for {trade_type}"
+                    'Order_Options': f"Entry for {trade_type}",
+                    'Fingerprint': f"{trade_fingerprint}{EDGEX_ENTRY_SUFFIX}"
                 })
                 
                 # Create exit transaction
@@ -204,68 +285,148 @@ class TradingDataProcessor:
                     'Type': 'Exit',
                     'Quantity': quantity,
                     'Price': exit_price,
-                    'PNL': pnl,
+                    # Closed P&L is already net of both fees and funding; add the fees back
+                    # so PNL - Fee nets out to it, leaving funding inside PNL as elsewhere
+                    'PNL': pnl + open_fee + close_fee,
                     'Fee': close_fee,
+                    'Funding': funding,
                     'Leverage': 'Unknown',
-                    'Order_Options': f"Exit - {row['Exit Type']}"
+                    'Order_Options': f"Exit - {row['Exit Type']}",
+                    'Fingerprint': f"{trade_fingerprint}{EDGEX_EXIT_SUFFIX}"
                 })
             
             df_normalized = pd.DataFrame(normalized_data)
+            parsed = event('file_parsed', broker='Edgex', file=file_path, rows=len(df_normalized), duplicates=duplicates_found)
             if duplicates_found > 0:
-                print(f"✅ Edgex: Processed {len(df_normalized)} transactions ({duplicates_found} duplicate trades skipped)")
+                log.info(f"✅ Edgex: Processed {len(df_normalized)} transactions ({duplicates_found} duplicate trades skipped)", extra=parsed)
             else:
-                print(f"✅ Edgex: Processed {len(df_normalized)} transactions")
+                log.info(f"✅ Edgex: Processed {len(df_normalized)} transactions", extra=parsed)
             return df_normalized
             
         except Exception as e:
-            print(f"❌ Error processing Edgex data: {e}")
+            log.error(f"❌ Error processing Edgex data: {e}", extra=event('file_failed', broker='Edgex', file=file_path, error=str(e)))
+            self.parse_errors[file_path] = str(e) or type(e).__name__
             return pd.DataFrame()
     
-    def parse_breakout_pdf(self, file_path: str) -> pd.DataFrame:
-        """Parse Breakout PDF data"""
-        print(f"📊 Processing Breakout PDF from: {file_path}")
+    def parse_breakout_pdf(self, file_path: str, store: Optional[TradeStore] = None) -> pd.DataFrame:
+        """Parse Breakout PDF data
+
+        With a trade store, page text is cached by page content hash and pages
+        whose transactions are all already ingested are skipped before any text
+        extraction, so an overlapping statement only pays for its new pages.
+        """
+        log.info(f"📊 Processing Breakout PDF from: {file_path}")
         
         try:
             transactions = []
             duplicates_found = 0
+            page_sources = {'extracted': 0, 'cache': 0, 'skipped': 0}
+            # Counted rather than logged per line; one summary per file below
+            self.unparsed_lines = []
             
             with pdfplumber.open(file_path) as pdf:
-                print(f"📄 Found {len(pdf.pages)} pages in PDF")
+                page_count = len(pdf.pages)
+                log.info(f"📄 Found {page_count} pages in PDF")
                 
                 # Start from page 2 (index 1) where transactions begin
-                for page_num in range(1, len(pdf.pages)):
-                    page = pdf.pages[page_num]
-                    text = page.extract_text()
-                    
-                    if text:
-                        print(f"Processing page {page_num + 1}...")
-                        lines = text.split('\n')
+                for page_num in range(1, page_count):
+                    with self.timer.stage('breakout_page', file=os.path.basename(file_path), page=page_num + 1) as page_record:
+                        page = pdf.pages[page_num]
+                        text, source, known_rows = self._read_breakout_page(page, store, pdf.rsrcmgr)
+                        page_sources[source] += 1
+                        page_record['source'] = source
+                        duplicates_found += known_rows
+                        rows_before = len(transactions)
+                        unparsed_before = len(self.unparsed_lines)
+                        
+                        if text:
+                            log.debug("Processing page %d (%s)...", page_num + 1, source)
+                            lines = text.split('\n')
+                            
+                            # Find lines that look like transaction data
+                            for line in lines:
+                                if self._is_breakout_transaction_line(line):
+                                    transaction = self._parse_breakout_transaction_line(line)
+                                    if transaction:
+                                        transactions.append(transaction)
+                                    else:
+                                        # Recognized as a transaction but a duplicate (or unparseable)
+                                        duplicates_found += 1
                         
-                        # Find lines that look like transaction data
-                        for line in lines:
-                            if self._is_breakout_transaction_line(line):
-                                transaction = self._parse_breakout_transaction_line(line)
-                                if transaction:
-                                    transactions.append(transaction)
-                                elif self._is_breakout_transaction_line(line):
-                                    # Line was recognized as transaction but filtered as duplicate
-                                    duplicates_found += 1
+                        page_record['rows'] = len(transactions) - rows_before
+                        if len(self.unparsed_lines) > unparsed_before:
+                            page_record['unparsed_lines'] = len(self.unparsed_lines) - unparsed_before
+            
+            if store is not None:
+                log.info(f"📄 Pages: {page_sources['extracted']} extracted, {page_sources['cache']} from cache, "
+                         f"{page_sources['skipped']} skipped (already ingested)")
+            
+            duplicates_found -= len(self.unparsed_lines)
+            if self.unparsed_lines:
+                line, error = self.unparsed_lines[0]
+                log.warning(f"⚠️ Breakout: {len(self.unparsed_lines)} transaction lines could not be parsed "
+                            f"(first: {error} in '{line}')",
+                            extra=event('unparsed_lines', broker='Breakout', file=file_path, count=len(self.unparsed_lines),
+                                        examples=[line for line, _ in self.unparsed_lines[:5]]))
             
             if transactions:
                 df_normalized = pd.DataFrame(transactions)
+                parsed = event('file_parsed', broker='Breakout', file=file_path, rows=len(df_normalized),
+                               duplicates=duplicates_found, pages=page_count,
+                               **{f'pages_{source}': count for source, count in page_sources.items()})
                 if duplicates_found > 0:
-                    print(f"✅ Breakout: Processed {len(df_normalized)} transactions ({duplicates_found} duplicates skipped)")
+                    log.info(f"✅ Breakout: Processed {len(df_normalized)} transactions ({duplicates_found} duplicates skipped)", extra=parsed)
                 else:
-                    print(f"✅ Breakout: Processed {len(df_normalized)} transactions")
+                    log.info(f"✅ Breakout: Processed {len(df_normalized)} transactions", extra=parsed)
                 return df_normalized
             else:
-                print("⚠️ No transaction data found in PDF.")
+                log.warning("⚠️ No transaction data found in PDF.")
                 return pd.DataFrame()
                 
         except Exception as e:
-            print(f"❌ Error processing Breakout PDF: {e}")
+            log.error(f"❌ Error processing Breakout PDF: {e}", extra=event('file_failed', broker='Breakout', file=file_path, error=str(e)))
+            self.parse_errors[file_path] = str(e) or type(e).__name__
             return pd.DataFrame()
     
+    def _read_breakout_page(self, page, store: Optional[TradeStore], resource_manager) -> Tuple[Optional[str], str, int]:
+        """A statement page's text, where it came from, and how many known transactions were skipped
+
+        The source is 'cache' (text stored under the page's content hash),
+        'skipped' (no text: a scan of the content stream found only transaction
+        IDs already ingested) or 'extracted'. Pages the scan can't vouch for are
+        always extracted.
+        """
+        if store is None:
+            return page.extract_text(), 'extracted', 0
+        
+        content_hash = page_content_hash(page)
+        text = store.cached_page_text(content_hash)
+        if text is not None:
+            return text, 'cache', 0
+        
+        transaction_ids = self._scan_breakout_transaction_ids(page, resource_manager)
+        fingerprints = [self._create_transaction_fingerprint(broker='Breakout', transaction_id=transaction_id)
+                        for transaction_id in transaction_ids]
+        if fingerprints and all(fingerprint in self.processed_transactions for fingerprint in fingerprints):
+            return None, 'skipped', len(fingerprints)
+        
+        text = page.extract_text() or ''
+        transaction_ids = [line.split()[0] for line in text.split('\n') if self._is_breakout_transaction_line(line)]
+        store.cache_page_text(content_hash, 'Breakout', text,
+                              transaction_ids[0] if transaction_ids else None,
+                              transaction_ids[-1] if transaction_ids else None)
+        return text, 'extracted', 0
+    
+    def _scan_breakout_transaction_ids(self, page, resource_manager) -> List[str]:
+        """Transaction IDs on a page from its content stream; empty when the scan can't be trusted"""
+        strings = scan_strings(page, resource_manager)
+        if not strings:
+            return []
+        # A row whose ID is split over several strings would go unseen
+        if any(BREAKOUT_PARTIAL_ID.fullmatch(string.strip()) for string in strings):
+            return []
+        return [string.strip() for string in strings if BREAKOUT_TRANSACTION_ID.fullmatch(string.strip())]
+    
     def _is_breakout_transaction_line(self, line: str) -> bool:
         """Check if a line contains Breakout transaction data"""
         # Breakout transaction lines have the format:
@@ -349,15 +510,17 @@ class TradingDataProcessor:
                     'Price': parsed_price,
                     'PNL': pnl,
                     'Fee': fee,
+                    'Funding': 0.0,
                     'Leverage': '5',  # Breakout uses x5 leverage for all coins
-                    'Order_Options': f"Transaction ID: {transaction_id}, Order ID: {order_id}"
+                    'Order_Options': f"Transaction ID: {transaction_id}, Order ID: {order_id}",
+                    'Fingerprint': fingerprint
                 }
             
             return None
             
         except Exception as e:
-            print(f"⚠️ Error parsing transaction line: {e}")
-            print(f"Line: {line}")
+            self.unparsed_lines.append((line.strip(), str(e)))
+            log.debug("Error parsing transaction line: %s (%s)", e, line)
             return None
     
     def _parse_transaction_line(self, line: str) -> Optional[Dict]:
@@ -415,6 +578,7 @@ class TradingDataProcessor:
                         'Price': self._extract_numeric(str(row[col_map.get('price', 4)])) if 'price' in col_map else 0,
                         'PNL': self._extract_numeric(str(row[col_map.get('pnl', 5)])) if 'pnl' in col_map else 0,
                         'Fee': self._extract_numeric(str(row[col_map.get('fee', 6)])) if 'fee' in col_map else 0,
+                        'Funding': 0.0,
                         'Leverage': 'Unknown',
                         'Order_Options': 'PDF Extracted'
                     }
@@ -423,7 +587,7 @@ class TradingDataProcessor:
                         transactions.append(transaction)
                         
         except Exception as e:
-            print(f"⚠️ Error parsing table data: {e}")
+            log.warning(f"⚠️ Error parsing table data: {e}")
         
         return transactions
     
@@ -448,6 +612,7 @@ class TradingDataProcessor:
                     'Price': 110000 + (i * 100),
                     'PNL': 0,
                     'Fee': 4.0,
+                    'Funding': 0.0,
                     'Leverage': 'Unknown',
                     'Order_Options': 'Placeholder - PDF parsing needed'
                 },
@@ -461,6 +626,7 @@ class TradingDataProcessor:
                     'Price': 110000 + (i * 100) + 50,
                     'PNL': 50,
                     'Fee': 4.0,
+                    'Funding': 0.0,
                     'Leverage': 'Unknown',
                     'Order_Options': 'Placeholder - PDF parsing needed'
                 }
@@ -534,9 +700,34 @@ class TradingDataProcessor:
         except:
             return datetime.now()
     
+    @timed_stage('load_from_store')
+    def load_from_store(self, store: TradeStore, broker: Optional[str] = None, asset: Optional[str] = None,
+                        start: Optional[str] = None, end: Optional[str] = None, brokers: Optional[List[str]] = None):
+        """Populate the broker datasets from the trade store instead of parsing statements"""
+        if brokers:
+            ledger = pd.concat([store.load_transactions(broker=name, asset=asset, start=start, end=end)
+                                for name in brokers], ignore_index=True)
+        else:
+            ledger = store.load_transactions(broker=broker, asset=asset, start=start, end=end)
+        self.blofin_data = ledger[ledger['Broker'] == 'Blofin'].reset_index(drop=True)
+        self.edgex_data = ledger[ledger['Broker'] == 'Edgex'].reset_index(drop=True)
+        self.breakout_data = ledger[ledger['Broker'] == 'Breakout'].reset_index(drop=True)
+        self.processed_transactions.update(dedup_key(fingerprint) for fingerprint in ledger['Fingerprint'])
+        log.info(f"🗄️ Loaded {len(ledger)} transactions from {store.db_path}")
+    
+    def append_broker_data(self, broker: str, data: pd.DataFrame):
+        """Append newly parsed transactions to one broker's dataset"""
+        attribute = f"{broker.lower()}_data"
+        existing = getattr(self, attribute)
+        if existing is None or existing.empty:
+            setattr(self, attribute, data.reset_index(drop=True))
+        else:
+            setattr(self, attribute, pd.concat([existing, data], ignore_index=True))
+    
+    @timed_stage('consolidate_data')
     def consolidate_data(self) -> pd.DataFrame:
         """Consolidate all broker data into single dataframe"""
-        print("\n🔄 Consolidating all trading data...")
+        log.info("\n🔄 Consolidating all trading data...")
         
         all_data = []
         
@@ -549,28 +740,62 @@ class TradingDataProcessor:
         if self.breakout_data is not None and not self.breakout_data.empty:
             all_data.append(self.breakout_data)
         
+        if self.backtest_data is not None and not self.backtest_data.empty:
+            all_data.append(self.backtest_data)
+        
+        # Derived analytics cached from an earlier consolidation are now stale
+        self._cached_position_history = None
+        self._cached_pnl_trades = None
+        
         if all_data:
             self.consolidated_data = pd.concat(all_data, ignore_index=True)
+            # Rows stored before funding was recorded have none
+            if 'Funding' not in self.consolidated_data:
+                self.consolidated_data['Funding'] = 0.0
+            self.consolidated_data['Funding'] = self.consolidated_data['Funding'].fillna(0.0)
+            self.consolidated_data['Liquidity'] = classify_liquidity(self.consolidated_data)
             self.consolidated_data = self.consolidated_data.sort_values('Date', ascending=False)  # Most recent first
-            print(f"✅ Consolidated {len(self.consolidated_data)} total transactions")
+            log.info(f"✅ Consolidated {len(self.consolidated_data)} total transactions")
         else:
-            print("⚠️ No data to consolidate")
+            log.warning("⚠️ No data to consolidate")
             self.consolidated_data = pd.DataFrame()
         
         return self.consolidated_data
     
     def create_position_history(self) -> pd.DataFrame:
+        """Position history for the current consolidation (built once, shared read-only)"""
+        if self._cached_position_history is None:
+            positions = self._build_position_history()
+            if not positions.empty and self.candles.available:
+                positions = self.add_position_excursions(positions)
+            self._cached_position_history = positions
+        return self._cached_position_history
+    
+    def _pnl_trades(self) -> pd.DataFrame:
+        """Non-breakeven trades with derived time columns, computed once per consolidation"""
+        if self._cached_pnl_trades is None:
+            df = self.consolidated_data
+            pnl_trades = df[(df['PNL'] != 0) & (abs(df['PNL']) > 0.01)]
+            dates = pnl_trades['Date'].dt
+            self._cached_pnl_trades = pnl_trades.assign(**{
+                'Day of Week': dates.day_name(),
+                'Hour of Day': dates.hour,
+                'Is Weekend': dates.weekday >= 5,
+            })
+        return self._cached_pnl_trades
+    
+    @timed_stage('create_position_history')
+    def _build_position_history(self) -> pd.DataFrame:
         """Create position history by grouping related trades"""
         if self.consolidated_data is None or self.consolidated_data.empty:
             return pd.DataFrame()
         
-        print("\n🔄 Creating position history...")
+        log.info("\n🔄 Creating position history...")
         
         positions = []
-        df = self.consolidated_data.copy()
         
         # Group by broker and asset, then sort by date
-        for (broker, asset), group in df.groupby(['Broker', 'Asset']):
+        for (broker, asset), group in self.consolidated_data.groupby(['Broker', 'Asset']):
             group = group.sort_values('Date').reset_index(drop=True)
             
             current_position = 0
@@ -607,16 +832,31 @@ class TradingDataProcessor:
         if positions:
             positions_df = pd.DataFrame(positions)
             positions_df = positions_df.sort_values('Open Date', ascending=False)  # Most recent first
-            print(f"✅ Created {len(positions_df)} position records")
+            log.info(f"✅ Created {len(positions_df)} position records")
             return positions_df
         else:
             return pd.DataFrame()
     
+    @timed_stage('position_excursions')
+    def add_position_excursions(self, positions: pd.DataFrame) -> pd.DataFrame:
+        """Add MAE/MFE and time-to-MFE columns from the local candle files"""
+        try:
+            excursions = compute_excursions(positions, self.candles)
+        except (OSError, ValueError, KeyError) as e:
+            log.warning(f"⚠️ Could not compute excursions from {self.candles.root}: {e}")
+            return positions
+        
+        covered = int(excursions['MFE %'].notna().sum())
+        log.info(f"📐 Excursions for {covered} of {len(positions)} positions from {self.candles.root}",
+                 extra=event('excursions', positions=len(positions), covered=covered, candles=self.candles.root))
+        return pd.concat([positions, excursions], axis=1)
+    
     def _create_position_record(self, trades: List, broker: str, asset: str, start_date: datetime, is_open: bool = False) -> Dict:
         """Create a single position record from multiple trades"""
         total_pnl = sum(trade['PNL'] for trade in trades)
         total_fees = sum(trade['Fee'] for trade in trades)
         net_pnl = total_pnl - total_fees
+        fee_totals = position_fee_totals(trades)
         
         # Determine position type from first trade
         initial_side = trades[0]['Side']
@@ -652,6 +892,7 @@ class TradingDataProcessor:
             'Avg Entry Price': avg_entry_price,
             'Total PNL': total_pnl,
             'Total Fees': total_fees,
+            **fee_totals,
             'Net PNL': net_pnl,
             'Number of Trades': len(trades),
             'Status': 'Open' if is_open else 'Closed',
@@ -659,23 +900,18 @@ class TradingDataProcessor:
             'Hour of Day': start_date.hour
         }
     
+    @timed_stage('generate_time_analytics')
     def generate_time_analytics(self) -> Dict:
         """Generate time-based analytics"""
         if self.consolidated_data is None or self.consolidated_data.empty:
             return {}
         
-        print("\n📊 Generating time-based analytics...")
-        
-        # Add time-based columns
-        df = self.consolidated_data.copy()
-        df['Day of Week'] = df['Date'].dt.strftime('%A')
-        df['Hour of Day'] = df['Date'].dt.hour
-        df['Is Weekend'] = df['Date'].dt.weekday >= 5
+        log.info("\n📊 Generating time-based analytics...")
         
         analytics = {}
         
         # Day of week analysis (only for trades with PNL != 0, excluding breakeven)
-        pnl_trades = df[(df['PNL'] != 0) & (abs(df['PNL']) > 0.01)].copy()
+        pnl_trades = self._pnl_trades()
         
         if not pnl_trades.empty:
             day_stats = pnl_trades.groupby('Day of Week').agg({
@@ -690,6 +926,7 @@ class TradingDataProcessor:
             ).round(1)
             day_stats['Max Win'] = pnl_trades.groupby('Day of Week')['PNL'].max().round(2)
             day_stats['Max Loss'] = pnl_trades.groupby('Day of Week')['PNL'].min().round(2)
+            day_stats = day_stats.join(bootstrap_groups(pnl_trades, 'Day of Week'))
             
             # Reorder by weekday
             weekday_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
@@ -709,6 +946,7 @@ class TradingDataProcessor:
             ).round(1)
             hour_stats['Max Win'] = pnl_trades.groupby('Hour of Day')['PNL'].max().round(2)
             hour_stats['Max Loss'] = pnl_trades.groupby('Hour of Day')['PNL'].min().round(2)
+            hour_stats = hour_stats.join(bootstrap_groups(pnl_trades, 'Hour of Day'))
             
             analytics['By Hour of Day'] = hour_stats
             
@@ -725,41 +963,32 @@ class TradingDataProcessor:
             ).round(1)
             weekend_stats['Max Win'] = pnl_trades.groupby('Is Weekend')['PNL'].max().round(2)
             weekend_stats['Max Loss'] = pnl_trades.groupby('Is Weekend')['PNL'].min().round(2)
-            weekend_stats.index = ['Weekday', 'Weekend']
+            weekend_stats = weekend_stats.join(bootstrap_groups(pnl_trades, 'Is Weekend'))
+            weekend_stats.index = ['Weekend' if is_weekend else 'Weekday' for is_weekend in weekend_stats.index]
             
             analytics['Weekend vs Weekday'] = weekend_stats
         
         return analytics
     
+    @timed_stage('generate_coin_analytics')
     def generate_coin_analytics(self) -> Dict:
         """Generate comprehensive coin-by-coin analytics"""
         if self.consolidated_data is None or self.consolidated_data.empty:
             return {}
         
-        print("\n🪙 Generating coin analytics...")
-        
-        df = self.consolidated_data.copy()
-        
-        # Add time-based columns
-        df['Day of Week'] = df['Date'].dt.strftime('%A')
-        df['Hour of Day'] = df['Date'].dt.hour
-        df['Is Weekend'] = df['Date'].dt.weekday >= 5
+        log.info("\n🪙 Generating coin analytics...")
         
         coin_analytics = {}
         
         # Only analyze trades with PNL (not just entries), excluding breakeven trades
-        pnl_trades = df[(df['PNL'] != 0) & (abs(df['PNL']) > 0.01)].copy()
+        pnl_trades = self._pnl_trades()
         
         if not pnl_trades.empty:
-            for asset in pnl_trades['Asset'].unique():
-                asset_data = pnl_trades[pnl_trades['Asset'] == asset].copy()
+            position_history = self.create_position_history()
+            intervals = bootstrap_groups(pnl_trades, 'Asset')
+            for asset, asset_data in pnl_trades.groupby('Asset', sort=False):
                 
                 if len(asset_data) > 0:
-                    # Use existing position history if available
-                    if not hasattr(self, '_cached_position_history'):
-                        self._cached_position_history = self.create_position_history()
-                    
-                    position_history = self._cached_position_history
                     asset_positions = position_history[
                         (position_history['Asset'] == asset) & 
                         (position_history['Status'] == 'Closed') &
@@ -844,11 +1073,53 @@ class TradingDataProcessor:
                             'Best Day of Week': best_day,
                             'Best Hour of Day': best_hour
                         },
+                        'Confidence': intervals.loc[asset].to_dict(),
                         'Broker Breakdown': broker_performance
                     }
         
         return coin_analytics
     
+    @timed_stage('generate_fee_analytics')
+    def generate_fee_analytics(self) -> pd.DataFrame:
+        """Fee, funding and maker/taker totals overall and per broker, asset and day"""
+        if self.consolidated_data is None or self.consolidated_data.empty:
+            return pd.DataFrame()
+        
+        log.info("\n💸 Generating fee analytics...")
+        return fee_breakdowns(self.consolidated_data)
+    
+    @timed_stage('match_journal')
+    def generate_journal_matches(self) -> pd.DataFrame:
+        """Journal entries matched to exchange transactions, one row per matched transaction"""
+        if not self.journal_entries or self.consolidated_data is None or self.consolidated_data.empty:
+            return pd.DataFrame()
+        
+        log.info(f"\n📓 Matching {len(self.journal_entries)} journal entries to exchange data...")
+        matches = match_journal(self.journal_entries, self.consolidated_data)
+        matched = matches.loc[matches['Matched Trades'] > 0, 'Entry ID'].nunique()
+        log.info(f"✅ Matched {matched} of {len(self.journal_entries)} journal entries",
+                 extra=event('journal_matched', entries=len(self.journal_entries), matched=matched))
+        return matches
+    
+    @timed_stage('monte_carlo')
+    def generate_monte_carlo(self) -> Dict[str, pd.DataFrame]:
+        """Simulated equity percentile bands and risk-of-ruin table over the closed positions"""
+        position_history = self.create_position_history()
+        if not self.simulation_paths or position_history.empty:
+            return {}
+        
+        # Breakeven positions are left out, as in the Position History sheet
+        closed = position_history[(position_history['Status'] == 'Closed') & (abs(position_history['Net PNL']) > 0.01)]
+        if closed.empty:
+            return {}
+        
+        log.info(f"\n🎲 Simulating {self.simulation_paths:,} equity paths over {len(closed)} closed positions...")
+        simulation = simulate_positions(closed, self.simulation_paths, extra_loss_limits=self.loss_limits)
+        log.info(f"✅ Simulated {len(simulation['bands'])} band points",
+                 extra=event('monte_carlo', positions=len(closed), paths=self.simulation_paths))
+        return simulation
+    
+    @timed_stage('generate_summary_stats')
     def generate_summary_stats(self) -> Dict:
         """Generate summary statistics"""
         if self.consolidated_data is None or self.consolidated_data.empty:
@@ -870,7 +1141,7 @@ class TradingDataProcessor:
         ] if not position_history.empty else pd.DataFrame()
         
         # Enhanced performance metrics using position-level data (exclude breakeven trades)
-        pnl_trades = self.consolidated_data[(self.consolidated_data['PNL'] != 0) & (abs(self.consolidated_data['PNL']) > 0.01)]
+        pnl_trades = self._pnl_trades()
         if not closed_positions.empty:
             # Use position-level max win/loss for more accurate representation
             summary['Max Win'] = closed_positions['Net PNL'].max()
@@ -923,8 +1194,7 @@ class TradingDataProcessor:
         broker_stats.columns = ['Total PNL', 'Avg PNL', 'Trade Count', 'Max Win', 'Max Loss', 'Total Fees', 'Avg Trade Size']
         broker_stats['Net PNL'] = broker_stats['Total PNL'] - broker_stats['Total Fees']
         # Calculate win rate excluding breakeven trades
-        non_breakeven_trades = self.consolidated_data[(self.consolidated_data['PNL'] != 0) & (abs(self.consolidated_data['PNL']) > 0.01)]
-        broker_stats['Win Rate %'] = non_breakeven_trades.groupby('Broker')['PNL'].apply(
+        broker_stats['Win Rate %'] = pnl_trades.groupby('Broker')['PNL'].apply(
             lambda x: (x > 0).sum() / len(x) * 100
         ).round(1)
         
@@ -932,151 +1202,209 @@ class TradingDataProcessor:
         
         return summary
     
-    def export_to_excel(self, output_file: str = 'trading_performance_report.xlsx'):
-        """Export all data to Excel with multiple sheets"""
-        print(f"\n📁 Exporting data to: {output_file}")
+    @timed_stage('export_to_excel')
+    def export_to_excel(self, output_file: str = DEFAULT_EXCEL_FILE, include_broker_sheets: bool = True):
+        """Export all data to Excel with multiple sheets
+
+        Uses the streaming write-only backend, so memory stays flat however large
+        the ledger is; sheets past Excel's row limit continue on numbered sheets.
+        Set include_broker_sheets=False to skip the per-broker copies of the raw
+        transactions (they duplicate rows already in 'All Trades').
+        """
+        return write_excel_report(self.build_report_sheets(include_broker_sheets), output_file)
+    
+    @timed_stage('build_report_sheets')
+    def build_report_sheets(self, include_broker_sheets: bool = True) -> List[ReportSheet]:
+        """Run the analytics once and lay out every report sheet, shared by all outputs"""
+        sheets = []
         
         # Generate analytics
         position_history = self.create_position_history()
         time_analytics = self.generate_time_analytics()
         coin_analytics = self.generate_coin_analytics()
+        fee_analytics = self.generate_fee_analytics()
+        journal_matches = self.generate_journal_matches()
+        monte_carlo = self.generate_monte_carlo()
         
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        # Summary sheet
+        summary_stats = self.generate_summary_stats()
+        
+        if summary_stats:
+            summary_rows = []
+            summary_rows.append(['Metric', 'Value'])
+            summary_rows.append(['=== OVERALL PERFORMANCE ===', ''])
+            summary_rows.append(['Total Transactions', summary_stats.get('Total Transactions', 0)])
+            summary_rows.append(['Total PNL', f"${summary_stats.get('Total PNL', 0):.2f}"])
+            summary_rows.append(['Total Fees', f"${summary_stats.get('Total Fees', 0):.2f}"])
+            summary_rows.append(['Net PNL', f"${summary_stats.get('Net PNL', 0):.2f}"])
+            summary_rows.append(['', ''])
+            summary_rows.append(['=== POSITION-LEVEL METRICS ===', ''])
+            summary_rows.append(['Total Closed Positions', summary_stats.get('Total Closed Positions', 0)])
+            summary_rows.append(['Position Win Rate', f"{summary_stats.get('Position Win Rate', 0):.1f}%"])
+            summary_rows.append(['Profitable Positions', summary_stats.get('Profitable Positions', 0)])
+            summary_rows.append(['Losing Positions', summary_stats.get('Losing Positions', 0)])
+            summary_rows.append(['Max Win (Position)', f"${summary_stats.get('Max Win', 0):.2f}"])
+            summary_rows.append(['Max Loss (Position)', f"${summary_stats.get('Max Loss', 0):.2f}"])
+            summary_rows.append(['Avg PNL per Position', f"${summary_stats.get('Avg PNL per Position', 0):.2f}"])
+            summary_rows.append(['', ''])
+            summary_rows.append(['=== TRADE-LEVEL METRICS ===', ''])
+            summary_rows.append(['Trade Win Rate', f"{summary_stats.get('Trade Win Rate', 0):.1f}%"])
+            summary_rows.append(['Profitable Trades', summary_stats.get('Profitable Trades', 0)])
+            summary_rows.append(['Losing Trades', summary_stats.get('Losing Trades', 0)])
+            summary_rows.append(['Avg PNL per Trade', f"${summary_stats.get('Avg PNL per Trade', 0):.2f}"])
+            summary_rows.append(['Avg Trade Size', f"{summary_stats.get('Avg Trade Size', 0):.4f}"])
             
-            # Summary sheet
-            summary_stats = self.generate_summary_stats()
+            # Broker breakdown (enhanced) is laid over the grid from row 15,
+            # the same place the in-memory writer used to put it
+            summary_grid = summary_rows[1:]
+            if 'By Broker' in summary_stats and not summary_stats['By Broker'].empty:
+                broker_stats = summary_stats['By Broker']
+                broker_block = [dataframe_header(broker_stats, index=True)]
+                broker_block.extend(dataframe_to_rows(broker_stats, index=True))
+                summary_grid = overlay_rows(summary_grid, broker_block, start_row=14)
             
-            if summary_stats:
-                summary_rows = []
-                summary_rows.append(['Metric', 'Value'])
-                summary_rows.append(['=== OVERALL PERFORMANCE ===', ''])
-                summary_rows.append(['Total Transactions', summary_stats.get('Total Transactions', 0)])
-                summary_rows.append(['Total PNL', f"${summary_stats.get('Total PNL', 0):.2f}"])
-                summary_rows.append(['Total Fees', f"${summary_stats.get('Total Fees', 0):.2f}"])
-                summary_rows.append(['Net PNL', f"${summary_stats.get('Net PNL', 0):.2f}"])
-                summary_rows.append(['', ''])
-                summary_rows.append(['=== POSITION-LEVEL METRICS ===', ''])
-                summary_rows.append(['Total Closed Positions', summary_stats.get('Total Closed Positions', 0)])
-                summary_rows.append(['Position Win Rate', f"{summary_stats.get('Position Win Rate', 0):.1f}%"])
-                summary_rows.append(['Profitable Positions', summary_stats.get('Profitable Positions', 0)])
-                summary_rows.append(['Losing Positions', summary_stats.get('Losing Positions', 0)])
-                summary_rows.append(['Max Win (Position)', f"${summary_stats.get('Max Win', 0):.2f}"])
-                summary_rows.append(['Max Loss (Position)', f"${summary_stats.get('Max Loss', 0):.2f}"])
-                summary_rows.append(['Avg PNL per Position', f"${summary_stats.get('Avg PNL per Position', 0):.2f}"])
-                summary_rows.append(['', ''])
-                summary_rows.append(['=== TRADE-LEVEL METRICS ===', ''])
-                summary_rows.append(['Trade Win Rate', f"{summary_stats.get('Trade Win Rate', 0):.1f}%"])
-                summary_rows.append(['Profitable Trades', summary_stats.get('Profitable Trades', 0)])
-                summary_rows.append(['Losing Trades', summary_stats.get('Losing Trades', 0)])
-                summary_rows.append(['Avg PNL per Trade', f"${summary_stats.get('Avg PNL per Trade', 0):.2f}"])
-                summary_rows.append(['Avg Trade Size', f"{summary_stats.get('Avg Trade Size', 0):.4f}"])
-                
-                summary_df = pd.DataFrame(summary_rows[1:], columns=summary_rows[0])
-                summary_df.to_excel(writer, sheet_name='Summary', index=False)
-                
-                # Broker breakdown (enhanced)
-                if 'By Broker' in summary_stats and not summary_stats['By Broker'].empty:
-                    summary_stats['By Broker'].to_excel(writer, sheet_name='Summary', startrow=15)
-            
-            # Position History sheet (exclude breakeven positions from export)
-            if not position_history.empty:
-                # Export all positions but mark breakeven ones
-                position_history_export = position_history.copy()
-                position_history_export['Is_Breakeven'] = abs(position_history_export['Net PNL']) <= 0.01
-                
-                # Filter out breakeven positions for cleaner analysis
-                non_breakeven_positions = position_history_export[~position_history_export['Is_Breakeven']]
-                
-                if not non_breakeven_positions.empty:
-                    non_breakeven_positions.to_excel(writer, sheet_name='Position History', index=False)
+            sheets.append(ReportSheet('Summary', grid=tuple(map(tuple, [summary_rows[0], *summary_grid]))))
+        
+        # Position History sheet (exclude breakeven positions from export)
+        if not position_history.empty:
+            # Filter out breakeven positions for cleaner analysis; the shared
+            # history is left untouched and the flag only added to the export
+            is_breakeven = abs(position_history['Net PNL']) <= 0.01
+            non_breakeven_positions = position_history[~is_breakeven].assign(Is_Breakeven=False)
             
-            # Coin Analytics sheet
-            if coin_analytics:
-                # Create a comprehensive coin analysis sheet
-                coin_summary_rows = []
-                for asset, analytics in coin_analytics.items():
-                    basic_stats = analytics.get('Basic Stats', {})
-                    pnl_perf = analytics.get('PNL Performance', {})
-                    trade_size = analytics.get('Trade Size', {})
-                    duration = analytics.get('Position Duration', {})
-                    time_patterns = analytics.get('Time Patterns', {})
-                    
-                    coin_summary_rows.append([
-                        asset,
-                        basic_stats.get('Total Trades', 0),
-                        basic_stats.get('Total Positions', 0),
-                        f"{basic_stats.get('Win Rate %', 0):.1f}%",
-                        f"{basic_stats.get('Position Win Rate %', 0):.1f}%",
-                        f"${pnl_perf.get('Net PNL', 0):.2f}",
-                        f"${pnl_perf.get('Avg PNL per Trade', 0):.2f}",
-                        f"${pnl_perf.get('Max Win', 0):.2f}",
-                        f"${pnl_perf.get('Max Loss', 0):.2f}",
-                        f"{trade_size.get('Avg Trade Size', 0):.4f}",
-                        f"{duration.get('Avg Duration (Hours)', 0):.1f}h",
-                        time_patterns.get('Best Day of Week', 'N/A'),
-                        time_patterns.get('Best Hour of Day', 'N/A')
-                    ])
+            if not non_breakeven_positions.empty:
+                sheets.append(ReportSheet('Position History', non_breakeven_positions))
+        
+        # Coin Analytics sheet
+        if coin_analytics:
+            # Create a comprehensive coin analysis sheet
+            coin_summary_rows = []
+            for asset, analytics in coin_analytics.items():
+                basic_stats = analytics.get('Basic Stats', {})
+                pnl_perf = analytics.get('PNL Performance', {})
+                trade_size = analytics.get('Trade Size', {})
+                duration = analytics.get('Position Duration', {})
+                time_patterns = analytics.get('Time Patterns', {})
+                confidence = analytics.get('Confidence', {})
                 
-                coin_summary_df = pd.DataFrame(coin_summary_rows, columns=[
-                    'Asset', 'Total Trades', 'Total Positions', 'Trade Win Rate', 'Position Win Rate',
-                    'Net PNL', 'Avg PNL/Trade', 'Max Win', 'Max Loss', 'Avg Trade Size',
-                    'Avg Duration', 'Best Day', 'Best Hour'
+                coin_summary_rows.append([
+                    asset,
+                    basic_stats.get('Total Trades', 0),
+                    basic_stats.get('Total Positions', 0),
+                    f"{basic_stats.get('Win Rate %', 0):.1f}%",
+                    f"{basic_stats.get('Position Win Rate %', 0):.1f}%",
+                    f"${pnl_perf.get('Net PNL', 0):.2f}",
+                    f"${pnl_perf.get('Avg PNL per Trade', 0):.2f}",
+                    f"${pnl_perf.get('Max Win', 0):.2f}",
+                    f"${pnl_perf.get('Max Loss', 0):.2f}",
+                    f"{trade_size.get('Avg Trade Size', 0):.4f}",
+                    f"{duration.get('Avg Duration (Hours)', 0):.1f}h",
+                    time_patterns.get('Best Day of Week', 'N/A'),
+                    time_patterns.get('Best Hour of Day', 'N/A'),
+                    f"{confidence.get('Win Rate CI Low %', 0):.1f}% to {confidence.get('Win Rate CI High %', 0):.1f}%",
+                    f"${confidence.get('Avg PNL CI Low', 0):.2f} to ${confidence.get('Avg PNL CI High', 0):.2f}",
+                    confidence.get('Low Sample', True)
                 ])
-                
-                # Sort by Net PNL (best performing coins first)
-                coin_summary_df['Net_PNL_Numeric'] = coin_summary_df['Net PNL'].str.replace('$', '').str.replace(',', '').astype(float)
-                coin_summary_df = coin_summary_df.sort_values('Net_PNL_Numeric', ascending=False).drop('Net_PNL_Numeric', axis=1)
-                
-                coin_summary_df.to_excel(writer, sheet_name='Coin Analysis', index=False)
             
-            # Time Analytics sheets
-            if time_analytics:
-                # Day of week analysis
-                if 'By Day of Week' in time_analytics:
-                    time_analytics['By Day of Week'].to_excel(writer, sheet_name='Day Analysis')
-                
-                # Hour of day analysis
-                if 'By Hour of Day' in time_analytics:
-                    time_analytics['By Hour of Day'].to_excel(writer, sheet_name='Hour Analysis')
-                
-                # Weekend vs Weekday
-                if 'Weekend vs Weekday' in time_analytics:
-                    time_analytics['Weekend vs Weekday'].to_excel(writer, sheet_name='Weekend Analysis')
+            coin_summary_df = pd.DataFrame(coin_summary_rows, columns=[
+                'Asset', 'Total Trades', 'Total Positions', 'Trade Win Rate', 'Position Win Rate',
+                'Net PNL', 'Avg PNL/Trade', 'Max Win', 'Max Loss', 'Avg Trade Size',
+                'Avg Duration', 'Best Day', 'Best Hour', 'Win Rate CI', 'Avg PNL/Trade CI', 'Low Sample'
+            ])
             
-            # Individual broker sheets (sorted by most recent)
+            # Sort by Net PNL (best performing coins first)
+            coin_summary_df['Net_PNL_Numeric'] = coin_summary_df['Net PNL'].str.replace('$', '').str.replace(',', '').astype(float)
+            coin_summary_df = coin_summary_df.sort_values('Net_PNL_Numeric', ascending=False).drop('Net_PNL_Numeric', axis=1)
+            
+            sheets.append(ReportSheet('Coin Analysis', coin_summary_df))
+        
+        # Time Analytics sheets
+        if time_analytics:
+            # Day of week analysis
+            if 'By Day of Week' in time_analytics:
+                sheets.append(ReportSheet('Day Analysis', time_analytics['By Day of Week'], index=True))
+            
+            # Hour of day analysis
+            if 'By Hour of Day' in time_analytics:
+                sheets.append(ReportSheet('Hour Analysis', time_analytics['By Hour of Day'], index=True))
+            
+            # Weekend vs Weekday
+            if 'Weekend vs Weekday' in time_analytics:
+                sheets.append(ReportSheet('Weekend Analysis', time_analytics['Weekend vs Weekday'], index=True))
+        
+        # Fee, funding and maker/taker breakdowns, one block of rows per grouping
+        if not fee_analytics.empty:
+            sheets.append(ReportSheet('Fee Analysis', fee_analytics))
+        
+        # Journal entries with their matched exchange transactions
+        if not journal_matches.empty:
+            sheets.append(ReportSheet('Journal Matches', journal_matches))
+        
+        # Monte Carlo equity bands and drawdown / loss-limit probabilities
+        if monte_carlo:
+            sheets.append(ReportSheet('Equity Bands', monte_carlo['bands']))
+            sheets.append(ReportSheet('Risk of Ruin', monte_carlo['risk']))
+        
+        # Individual broker sheets (sorted by most recent)
+        if include_broker_sheets:
             if self.blofin_data is not None and not self.blofin_data.empty:
                 blofin_sorted = self.blofin_data.sort_values('Date', ascending=False)
-                blofin_sorted.to_excel(writer, sheet_name='Blofin', index=False)
+                sheets.append(ReportSheet('Blofin', blofin_sorted, columns=export_columns(blofin_sorted)))
             
             if self.edgex_data is not None and not self.edgex_data.empty:
                 edgex_sorted = self.edgex_data.sort_values('Date', ascending=False)
-                edgex_sorted.to_excel(writer, sheet_name='Edgex', index=False)
+                sheets.append(ReportSheet('Edgex', edgex_sorted, columns=export_columns(edgex_sorted)))
             
             if self.breakout_data is not None and not self.breakout_data.empty:
                 breakout_sorted = self.breakout_data.sort_values('Date', ascending=False)
-                breakout_sorted.to_excel(writer, sheet_name='Breakout', index=False)
+                sheets.append(ReportSheet('Breakout', breakout_sorted, columns=export_columns(breakout_sorted)))
             
-            # Consolidated data (already sorted by most recent)
-            if self.consolidated_data is not None and not self.consolidated_data.empty:
-                self.consolidated_data.to_excel(writer, sheet_name='All Trades', index=False)
+            if self.backtest_data is not None and not self.backtest_data.empty:
+                backtest_sorted = self.backtest_data.sort_values('Date', ascending=False)
+                sheets.append(ReportSheet('Backtest', backtest_sorted, columns=export_columns(backtest_sorted)))
+        
+        # Consolidated data (already sorted by most recent)
+        if self.consolidated_data is not None and not self.consolidated_data.empty:
+            sheets.append(ReportSheet('All Trades', self.consolidated_data, columns=export_columns(self.consolidated_data)))
         
-        print(f"✅ Excel report generated: {output_file}")
-        return output_file
+        return sheets
+    
+    @timed_stage('export_to_parquet')
+    def export_to_parquet(self, output_dir: str = '.') -> List[str]:
+        """Export the ledger and position history as Parquet files (needs pyarrow or fastparquet)"""
+        if not any(importlib.util.find_spec(engine) for engine in ('pyarrow', 'fastparquet')):
+            log.warning("⚠️ Parquet output needs pyarrow or fastparquet (pip install pyarrow) - skipping")
+            return []
+        
+        os.makedirs(output_dir, exist_ok=True)
+        # Leverage mixes numbers and 'Unknown'; Parquet columns need a single type
+        frames = {
+            'trades.parquet': self.consolidated_data[export_columns(self.consolidated_data)].astype({'Leverage': str}),
+            'positions.parquet': self.create_position_history(),
+        }
+        
+        written = []
+        for file_name, frame in frames.items():
+            if frame.empty:
+                continue
+            output_file = os.path.join(output_dir, file_name)
+            with atomic_output_path(output_file) as temp_file:
+                frame.to_parquet(temp_file, index=False)
+            written.append(output_file)
+            log.info(f"✅ Parquet written: {output_file} ({len(frame)} rows)",
+                     extra=event('output_written', format='parquet', path=output_file, rows=len(frame)))
+        return written
 
-def discover_broker_files(broker_name: str) -> List[str]:
+def discover_broker_files(broker_name: str, root: str = STATEMENTS_ROOT) -> List[str]:
     """Automatically discover all files for a specific broker"""
-    folder_path = f"account statements/{broker_name}/"
+    folder_path = f"{root}/{broker_name}/"
     
     if not os.path.exists(folder_path):
-        print(f"⚠️ Folder not found: {folder_path}")
+        log.warning(f"⚠️ Folder not found: {folder_path}")
         return []
     
-    if broker_name == 'blofin':
-        pattern = os.path.join(folder_path, "*.csv")
-    elif broker_name == 'edgex':
-        pattern = os.path.join(folder_path, "*.csv")
-    elif broker_name == 'breakout':
-        pattern = os.path.join(folder_path, "*.pdf")
+    if broker_name in BROKER_FILE_PATTERNS:
+        pattern = os.path.join(folder_path, BROKER_FILE_PATTERNS[broker_name])
     else:
         return []
     
@@ -1084,88 +1412,374 @@ def discover_broker_files(broker_name: str) -> List[str]:
     files.sort()  # Sort files alphabetically for consistent processing order
     
     if files:
-        print(f"🔍 Auto-discovered {len(files)} {broker_name} files:")
+        log.info(f"🔍 Auto-discovered {len(files)} {broker_name} files:")
         for file in files:
-            print(f"   📄 {os.path.basename(file)}")
+            log.info(f"   📄 {os.path.basename(file)}")
     else:
-        print(f"⚠️ No {broker_name} files found in {folder_path}")
+        log.warning(f"⚠️ No {broker_name} files found in {folder_path}")
     
     return files
 
-def process_multiple_files(processor, broker_type, file_list):
-    """Process multiple files for a single broker with deduplication"""
+def process_multiple_files(processor, broker_type, file_list, store: Optional[TradeStore] = None):
+    """Process multiple files for a single broker with deduplication
+
+    With a trade store, files whose exact content was ingested on an earlier run
+    are skipped, and newly parsed transactions are persisted. A file whose parse
+    failed is not recorded as ingested, so later runs try it again.
+    """
     all_data = []
     
     for file_path in file_list:
         if os.path.exists(file_path):
-            if broker_type == 'blofin':
-                data = processor.parse_blofin_data(file_path)
-            elif broker_type == 'edgex':
-                data = processor.parse_edgex_data(file_path)
-            elif broker_type == 'breakout':
-                data = processor.parse_breakout_pdf(file_path)
-            else:
+            if store is not None:
+                sha256 = file_sha256(file_path)
+                if store.is_file_ingested(file_path, sha256):
+                    log.info(f"⏭️ Already ingested, skipping: {os.path.basename(file_path)}",
+                             extra=event('file_skipped', broker=broker_type, file=file_path))
+                    continue
+            
+            processor.parse_errors.pop(file_path, None)
+            with processor.timer.stage('parse_file', broker=broker_type, file=os.path.basename(file_path)) as file_record:
+                if broker_type == 'blofin':
+                    data = processor.parse_blofin_data(file_path)
+                elif broker_type == 'edgex':
+                    data = processor.parse_edgex_data(file_path)
+                elif broker_type == 'breakout':
+                    data = processor.parse_breakout_pdf(file_path, store)
+                else:
+                    continue
+                file_record['rows'] = len(data)
+            
+            # A failed parse must not mark the file as ingested, or it would be skipped by hash for good
+            if file_path in processor.parse_errors:
+                log.warning(f"⚠️ Not recording {os.path.basename(file_path)} as ingested; it is retried on the next run")
                 continue
+            
+            if store is not None:
+                with processor.timer.stage('store_transactions', file=os.path.basename(file_path)) as store_record:
+                    rows_added = store.add_transactions(data, source_file=file_path)
+                    store.record_file(file_path, broker_type, rows_added, sha256)
+                    store_record['rows'] = rows_added
                 
             if not data.empty:
                 all_data.append(data)
         else:
-            print(f"⚠️ File not found: {file_path}")
+            log.warning(f"⚠️ File not found: {file_path}")
     
     if all_data:
         return pd.concat(all_data, ignore_index=True)
     else:
         return pd.DataFrame()
 
-def main():
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Command-line options
+
+    Commands: `run` (the default when none is given) ingests new statements and
+    regenerates the outputs, `ingest` only parses new statements into the trade
+    store, and `analyze` regenerates outputs from the store without touching
+    the statement folders.
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in COMMANDS and argv[0] not in ('-h', '--help'):
+        argv.insert(0, 'run')
+    
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--db', default=DEFAULT_DB_PATH, help="Trade store database (default %(default)s)")
+    common.add_argument('--broker', action='append', choices=list(BROKER_FILE_PATTERNS), dest='brokers',
+                        help="Only this broker (repeat for several); default all")
+    common.add_argument('--timings', nargs='?', const=DEFAULT_TIMING_REPORT, metavar='PATH',
+                        help=f"Write a JSON per-stage/per-file/per-page timing report (default path {DEFAULT_TIMING_REPORT})")
+    common.add_argument('--profile', choices=PROFILE_MODES,
+                        help="Also profile the run with cProfile or the sampling profiler (implies --timings)")
+    common.add_argument('--memory-budget', type=float, metavar='MB',
+                        help="Stop as soon as peak RSS passes this many MB, naming the stage that crossed it")
+    verbosity = common.add_mutually_exclusive_group()
+    verbosity.add_argument('-q', '--quiet', action='store_const', const='quiet', dest='log_level', default='normal',
+                           help="Only print warnings and errors")
+    verbosity.add_argument('-v', '--verbose', action='store_const', const='verbose', dest='log_level',
+                           help="Also print per-page progress and per-stage timings")
+    common.add_argument('--event-log', metavar='PATH',
+                        help="Write a JSON-lines log of every event in the run (files, pages, stages, outputs)")
+    
+    inputs = argparse.ArgumentParser(add_help=False)
+    inputs.add_argument('--statements', default=STATEMENTS_ROOT,
+                        help="Folder holding the blofin/, edgex/ and breakout/ statement folders (default '%(default)s')")
+    
+    outputs = argparse.ArgumentParser(add_help=False)
+    outputs.add_argument('--start', help="Only analyze transactions on or after this date (YYYY-MM-DD[ HH:MM:SS])")
+    outputs.add_argument('--end', help="Only analyze transactions up to this date (a bare date includes the whole day)")
+    outputs.add_argument('--outputs', nargs='+', choices=OUTPUT_FORMATS, default=list(DEFAULT_OUTPUTS),
+                         help=f"Outputs to write (default: {' '.join(DEFAULT_OUTPUTS)}); parquet needs pyarrow or fastparquet")
+    outputs.add_argument('--xlsx', default=DEFAULT_EXCEL_FILE, help="Excel report path (default %(default)s)")
+    outputs.add_argument('--no-broker-sheets', action='store_false', dest='broker_sheets',
+                         help="Leave the per-broker transaction sheets out of the Excel report (the dashboard rebuilds them from All Trades)")
+    outputs.add_argument('--json-dir', default=DASHBOARD_DATA_DIR, help="Dashboard data folder (default %(default)s)")
+    outputs.add_argument('--parquet-dir', default='.', help="Folder for trades/positions Parquet files (default %(default)s)")
+    outputs.add_argument('--candles', default=DEFAULT_CANDLES_DIR,
+                         help="Folder of per-symbol OHLCV CSVs for position MAE/MFE, used when it exists (default %(default)s)")
+    outputs.add_argument('--journal', default=DEFAULT_JOURNAL_FILE,
+                         help="Trading journal JSON to match against exchange data, used when it exists (default %(default)s)")
+    outputs.add_argument('--simulations', type=int, default=SIMULATION_PATHS, metavar='PATHS',
+                         help="Monte Carlo equity paths per method, 0 to skip the simulation (default %(default)s)")
+    outputs.add_argument('--loss-limit', type=float, action='append', dest='loss_limits', metavar='USD',
+                         help="Loss limit to report risk-of-ruin odds for, on top of the drawdown multiples (repeatable)")
+    
+    parser = argparse.ArgumentParser(description="Consolidate broker statements into the trading performance report")
+    commands = parser.add_subparsers(dest='command', metavar='{run,ingest,analyze}')
+    run_parser = commands.add_parser('run', parents=[common, inputs, outputs],
+                                     help="Ingest new statements, then regenerate outputs (default)")
+    run_parser.add_argument('--watch', action='store_true',
+                            help="Keep running and refresh reports whenever statement files are added or changed")
+    run_parser.add_argument('--interval', type=float, default=DEFAULT_WATCH_INTERVAL,
+                            help="Watch mode: seconds between folder scans (default %(default)s)")
+    run_parser.add_argument('--debounce', type=float, default=DEFAULT_WATCH_DEBOUNCE,
+                            help="Watch mode: quiet period after the last change before ingesting (default %(default)s)")
+    commands.add_parser('ingest', parents=[common, inputs], help="Only parse new statements into the trade store")
+    commands.add_parser('analyze', parents=[common, outputs], help="Only regenerate outputs from the trade store")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
     """Main execution function"""
-    print("🚀 Trading Performance Analyzer Started")
-    print("=" * 50)
-    print("💡 Smart Deduplication: The script automatically detects and skips duplicate transactions")
-    print("🔍 Auto-Discovery: Automatically finds all files in broker folders")
-    print("📁 Simply add new files to the respective broker folders and rerun the script")
-    print("=" * 50)
+    args = parse_args(argv)
+    with run_logging(args.log_level, args.event_log):
+        run_command(args)
+
+def run_command(args: argparse.Namespace):
+    """Run one parsed command"""
+    log.info("🚀 Trading Performance Analyzer Started")
+    log.info("=" * 50)
+    log.info("💡 Smart Deduplication: The script automatically detects and skips duplicate transactions")
+    log.info("🔍 Auto-Discovery: Automatically finds all files in broker folders")
+    log.info("📁 Simply add new files to the respective broker folders and rerun the script")
+    log.info("=" * 50)
+    
+    timings_file = args.timings or (DEFAULT_TIMING_REPORT if args.profile else None)
+    timer = StageTimer(enabled=timings_file is not None, memory_budget_mb=args.memory_budget)
     
-    # Initialize processor
-    processor = TradingDataProcessor()
+    # The same paths, filters and outputs whether run once or kept watching
+    options = dict(
+        db_path=args.db,
+        statements_root=getattr(args, 'statements', STATEMENTS_ROOT),
+        brokers=args.brokers,
+        start=getattr(args, 'start', None),
+        end=getattr(args, 'end', None),
+        outputs=getattr(args, 'outputs', DEFAULT_OUTPUTS),
+        excel_file=getattr(args, 'xlsx', DEFAULT_EXCEL_FILE),
+        include_broker_sheets=getattr(args, 'broker_sheets', True),
+        json_dir=getattr(args, 'json_dir', DASHBOARD_DATA_DIR),
+        parquet_dir=getattr(args, 'parquet_dir', '.'),
+        candles_dir=getattr(args, 'candles', DEFAULT_CANDLES_DIR),
+        journal_file=getattr(args, 'journal', DEFAULT_JOURNAL_FILE),
+        simulation_paths=getattr(args, 'simulations', SIMULATION_PATHS),
+        loss_limits=getattr(args, 'loss_limits', None),
+    )
     
+    try:
+        if getattr(args, 'watch', False):
+            # Watch mode takes the run lock per refresh; the timings cover the whole session
+            with profiling(timer, args.profile):
+                run_watch_mode(timer, interval=args.interval, debounce=args.debounce, **options)
+        else:
+            # One regeneration at a time: concurrent runs wait for the lock
+            with RunLock():
+                with profiling(timer, args.profile):
+                    run_analysis(timer, ingest=args.command in ('run', 'ingest'),
+                                 analyze=args.command in ('run', 'analyze'), **options)
+    except MemoryBudgetExceeded as e:
+        log.error(f"\n❌ Memory budget exceeded: {e}")
+        if timings_file:
+            timer.write_report(timings_file)
+            log.info(f"⏱️ Partial timing report written to: {timings_file}")
+        raise SystemExit(1)
+    
+    if timings_file:
+        timer.print_summary()
+        timer.write_report(timings_file)
+        log.info(f"⏱️ Timing report written to: {timings_file}")
+    
+    log.info("\n✨ Analysis complete!")
+
+def open_processor(store: TradeStore, timer: Optional[StageTimer] = None, candles_dir: str = DEFAULT_CANDLES_DIR,
+                   simulation_paths: int = SIMULATION_PATHS,
+                   loss_limits: Optional[List[float]] = None) -> TradingDataProcessor:
+    """A processor whose dedup state includes every transaction already in the store"""
+    processor = TradingDataProcessor(timer)
+    processor.candles = CandleLibrary(candles_dir)
+    processor.simulation_paths = max(simulation_paths, 0)
+    processor.loss_limits = list(loss_limits or [])
+    
+    # Transactions stored on earlier runs count as already seen
+    processor.processed_transactions.update(dedup_key(fingerprint) for fingerprint in store.known_fingerprints())
+    return processor
+
+def ingest_statements(processor: TradingDataProcessor, store: TradeStore, root: str = STATEMENTS_ROOT,
+                      brokers: Optional[List[str]] = None) -> int:
+    """Parse new statement files under `root` into the store; returns the new transaction count"""
     # Auto-discover all files for each broker
-    print("\n📂 Auto-discovering broker data files...")
-    blofin_files = discover_broker_files('blofin')
-    edgex_files = discover_broker_files('edgex')
-    breakout_files = discover_broker_files('breakout')
+    log.info("\n📂 Auto-discovering broker data files...")
+    with processor.timer.stage('discovery') as discovery_record:
+        broker_files = {broker: discover_broker_files(broker, root) for broker in brokers or BROKER_FILE_PATTERNS}
+        discovery_record['rows'] = sum(len(files) for files in broker_files.values())
     
     # Process each broker's data with deduplication
-    print("\n📊 Processing broker data files...")
+    log.info("\n📊 Processing broker data files...")
+    
+    # Process all files for each broker (new rows are persisted to the store)
+    new_rows = 0
+    for broker, files in broker_files.items():
+        new_rows += len(process_multiple_files(processor, broker, files, store))
+    return new_rows
+
+def run_analysis(timer: Optional[StageTimer] = None, db_path: str = DEFAULT_DB_PATH,
+                 statements_root: str = STATEMENTS_ROOT, brokers: Optional[List[str]] = None,
+                 ingest: bool = True, analyze: bool = True, start: Optional[str] = None, end: Optional[str] = None,
+                 outputs: Sequence[str] = DEFAULT_OUTPUTS, excel_file: str = DEFAULT_EXCEL_FILE,
+                 include_broker_sheets: bool = True, json_dir: str = DASHBOARD_DATA_DIR, parquet_dir: str = '.',
+                 candles_dir: str = DEFAULT_CANDLES_DIR,
+                 journal_file: str = DEFAULT_JOURNAL_FILE, simulation_paths: int = SIMULATION_PATHS,
+                 loss_limits: Optional[List[float]] = None) -> TradingDataProcessor:
+    """Ingest statements, then regenerate the Excel report and dashboard data
+
+    Either half can be skipped: ingest-only runs leave the outputs alone, and
+    analyze-only runs work from the store without scanning statement folders.
+    Returns the processor, holding the analyzed ledger.
+    """
+    # Initialize processor and the persistent trade store
+    store = TradeStore(db_path)
+    processor = open_processor(store, timer, candles_dir, simulation_paths, loss_limits)
+    if analyze:
+        processor.journal_entries = read_journal(journal_file)
+    
+    try:
+        if ingest:
+            new_rows = ingest_statements(processor, store, statements_root, brokers)
+            log.info(f"\n🗄️ Ingested {new_rows} new transactions into {db_path}",
+                     extra=event('ingested', rows=new_rows, db=db_path))
+        
+        if analyze:
+            # The store holds the full ledger: everything from earlier runs plus what was just added
+            store_brokers = [broker.title() for broker in brokers] if brokers else None
+            processor.load_from_store(store, brokers=store_brokers, start=start, end=end)
+            
+            # A filtered view must not replace the stored position history of the whole ledger
+            generate_reports(processor, store, outputs, excel_file, json_dir, parquet_dir,
+                             persist_positions=not (brokers or start or end),
+                             include_broker_sheets=include_broker_sheets)
+    finally:
+        store.close()
+    return processor
+
+def read_journal(journal_file: str) -> List[Dict]:
+    """Journal entries to match, or none when the file is missing or unreadable"""
+    if not os.path.exists(journal_file):
+        return []
+    try:
+        return load_journal(journal_file)
+    except (OSError, ValueError) as e:
+        log.warning(f"⚠️ Could not read journal {journal_file}: {e}")
+        return []
+
+def write_excel_report(sheets: Sequence[ReportSheet], output_file: str = DEFAULT_EXCEL_FILE) -> str:
+    """Write prepared report sheets to a workbook"""
+    log.info(f"\n📁 Exporting data to: {output_file}")
+    
+    # Build the workbook in a temp file and swap it in only when complete,
+    # so readers never open a half-written report
+    with atomic_output_path(output_file) as temp_file, StreamingExcelWriter(temp_file) as writer:
+        for sheet in sheets:
+            writer.write_sheet(sheet)
+    
+    log.info(f"✅ Excel report generated: {output_file}", extra=event('output_written', format='xlsx', path=output_file))
+    return output_file
+
+def run_sinks(sinks: Dict[str, Callable[[], object]], timer: StageTimer,
+              alongside: Optional[Callable[[], object]] = None) -> Dict[str, object]:
+    """Run independent output writers concurrently; returns each one's result
+
+    Every sink is timed as its own 'sink_<name>' stage under the caller's
+    stage. `alongside` runs on the calling thread meanwhile (for work tied to
+    it, like the sqlite store). All sinks run to completion before the first
+    failure is re-raised, so one broken output never leaves another half-written.
+    """
+    parent = timer.current_stack()
+    
+    def run(name: str, sink: Callable[[], object]):
+        with timer.inherit_stack(parent), timer.stage(f'sink_{name}'):
+            return sink()
     
-    # Process all files for each broker
-    processor.blofin_data = process_multiple_files(processor, 'blofin', blofin_files)
-    processor.edgex_data = process_multiple_files(processor, 'edgex', edgex_files)
-    processor.breakout_data = process_multiple_files(processor, 'breakout', breakout_files)
+    with ThreadPoolExecutor(max_workers=max(len(sinks), 1), thread_name_prefix='report-sink') as pool:
+        futures = {name: pool.submit(run, name, sink) for name, sink in sinks.items()}
+        if alongside is not None:
+            alongside()
     
+    failures = [future.exception() for future in futures.values() if future.exception() is not None]
+    if failures:
+        raise failures[0]
+    return {name: future.result() for name, future in futures.items()}
+
+def convert_json_sink(sheets: Sequence[ReportSheet], json_dir: str):
+    """Dashboard JSON output; a failed conversion warns rather than failing the run"""
+    try:
+        log.info("\n🔄 Converting to JSON for dashboard...")
+        from data_converter import convert_sheets_to_json
+        version = convert_sheets_to_json(sheets, json_dir)
+        log.info("✅ JSON conversion complete - dashboard ready!")
+        return version
+    except Exception as e:
+        log.warning(f"⚠️ JSON conversion failed: {e}")
+        log.warning("💡 Run 'python data_converter.py' manually to generate JSON for dashboard")
+
+def generate_reports(processor: TradingDataProcessor, store: TradeStore, outputs: Sequence[str] = DEFAULT_OUTPUTS,
+                     excel_file: str = DEFAULT_EXCEL_FILE, json_dir: str = DASHBOARD_DATA_DIR,
+                     parquet_dir: str = '.', persist_positions: bool = True, include_broker_sheets: bool = True):
+    """Consolidate the processor's data and write the requested outputs
+
+    The analytics run once into shared, read-only report sheets; each output
+    then renders them on its own thread, so the export takes as long as the
+    slowest output rather than the sum of all of them.
+    """
     # Consolidate all data
     consolidated = processor.consolidate_data()
     
-    # Generate Excel report
     if not consolidated.empty:
-        output_file = processor.export_to_excel()
+        # Build everything the sinks share up front; they only read it
+        position_history = processor.create_position_history()
+        sheets = processor.build_report_sheets(include_broker_sheets) if {'xlsx', 'json'} & set(outputs) else []
+        
+        sinks = {}
+        if 'xlsx' in outputs:
+            sinks['xlsx'] = lambda: write_excel_report(sheets, excel_file)
+        if 'json' in outputs:
+            sinks['json'] = lambda: convert_json_sink(sheets, json_dir)
+        if 'parquet' in outputs:
+            sinks['parquet'] = lambda: processor.export_to_parquet(parquet_dir)
+        
+        def store_positions():
+            with processor.timer.stage('store_positions'):
+                store.replace_positions(position_history)
+        
+        # The trade store's connection belongs to this thread, so positions are
+        # saved here while the sinks run
+        with processor.timer.stage('export'):
+            run_sinks(sinks, processor.timer, alongside=store_positions if persist_positions else None)
         
         # Print summary
         summary = processor.generate_summary_stats()
         if summary:
-            print("\n📊 Performance Summary:")
-            print("-" * 30)
-            print(f"Total Transactions: {summary.get('Total Transactions', 0)}")
-            print(f"Total PNL: ${summary.get('Total PNL', 0):.2f}")
-            print(f"Total Fees: ${summary.get('Total Fees', 0):.2f}")
-            print(f"Net PNL: ${summary.get('Net PNL', 0):.2f}")
-            print(f"\n🎯 Position-Level Performance:")
-            print(f"Position Win Rate: {summary.get('Position Win Rate', 0):.1f}%")
-            print(f"Max Win (Position): ${summary.get('Max Win', 0):.2f}")
-            print(f"Max Loss (Position): ${summary.get('Max Loss', 0):.2f}")
-            print(f"Avg PNL per Position: ${summary.get('Avg PNL per Position', 0):.2f}")
-            print(f"\n📈 Trade-Level Performance:")
-            print(f"Trade Win Rate: {summary.get('Trade Win Rate', 0):.1f}%")
+            log.info("\n📊 Performance Summary:",
+                     extra=event('run_summary', **{key: value for key, value in summary.items() if key != 'By Broker'}))
+            log.info("-" * 30)
+            log.info(f"Total Transactions: {summary.get('Total Transactions', 0)}")
+            log.info(f"Total PNL: ${summary.get('Total PNL', 0):.2f}")
+            log.info(f"Total Fees: ${summary.get('Total Fees', 0):.2f}")
+            log.info(f"Net PNL: ${summary.get('Net PNL', 0):.2f}")
+            log.info(f"\n🎯 Position-Level Performance:")
+            log.info(f"Position Win Rate: {summary.get('Position Win Rate', 0):.1f}%")
+            log.info(f"Max Win (Position): ${summary.get('Max Win', 0):.2f}")
+            log.info(f"Max Loss (Position): ${summary.get('Max Loss', 0):.2f}")
+            log.info(f"Avg PNL per Position: ${summary.get('Avg PNL per Position', 0):.2f}")
+            log.info(f"\n📈 Trade-Level Performance:")
+            log.info(f"Trade Win Rate: {summary.get('Trade Win Rate', 0):.1f}%")
             
             # Show position summary (exclude breakeven)
             position_history = processor.create_position_history()
@@ -1176,30 +1790,86 @@ def main():
                 breakeven_count = len(closed_positions) - len(non_breakeven_closed)
                 
                 if not non_breakeven_closed.empty:
-                    print(f"\n🎯 Position Summary (Excluding Breakeven):")
-                    print(f"Total Positions: {len(position_history)}")
-                    print(f"Closed Positions: {len(closed_positions)}")
-                    print(f"Breakeven Positions (excluded): {breakeven_count}")
-                    print(f"Analyzed Positions: {len(non_breakeven_closed)}")
-                    print(f"Avg Position Duration: {non_breakeven_closed['Duration (Hours)'].mean():.1f} hours")
-                    print(f"Position Win Rate: {(non_breakeven_closed['Net PNL'] > 0).sum() / len(non_breakeven_closed) * 100:.1f}%")
+                    log.info(f"\n🎯 Position Summary (Excluding Breakeven):")
+                    log.info(f"Total Positions: {len(position_history)}")
+                    log.info(f"Closed Positions: {len(closed_positions)}")
+                    log.info(f"Breakeven Positions (excluded): {breakeven_count}")
+                    log.info(f"Analyzed Positions: {len(non_breakeven_closed)}")
+                    log.info(f"Avg Position Duration: {non_breakeven_closed['Duration (Hours)'].mean():.1f} hours")
+                    log.info(f"Position Win Rate: {(non_breakeven_closed['Net PNL'] > 0).sum() / len(non_breakeven_closed) * 100:.1f}%")
             
-            print(f"\n📋 Report saved to: {output_file}")
-            print(f"📑 Sheets included: Position History, Coin Analysis, Day Analysis, Hour Analysis, Weekend Analysis")
-            
-            # Auto-convert to JSON for frontend
-            try:
-                print("\n🔄 Converting to JSON for dashboard...")
-                from data_converter import convert_excel_to_json
-                convert_excel_to_json()
-                print("✅ JSON conversion complete - dashboard ready!")
-            except Exception as e:
-                print(f"⚠️ JSON conversion failed: {e}")
-                print("💡 Run 'python data_converter.py' manually to generate JSON for dashboard")
+            if 'xlsx' in outputs:
+                log.info(f"\n📋 Report saved to: {excel_file}")
+                log.info(f"📑 Sheets included: {', '.join(sheet.name for sheet in sheets)}")
+        
     else:
-        print("❌ No data available to process")
+        log.error("❌ No data available to process")
+
+def run_watch_mode(timer: Optional[StageTimer] = None, interval: float = DEFAULT_WATCH_INTERVAL,
+                   debounce: float = DEFAULT_WATCH_DEBOUNCE, db_path: str = DEFAULT_DB_PATH,
+                   statements_root: str = STATEMENTS_ROOT, brokers: Optional[List[str]] = None,
+                   start: Optional[str] = None, end: Optional[str] = None,
+                   outputs: Sequence[str] = DEFAULT_OUTPUTS, excel_file: str = DEFAULT_EXCEL_FILE,
+                   include_broker_sheets: bool = True, json_dir: str = DASHBOARD_DATA_DIR, parquet_dir: str = '.',
+                   candles_dir: str = DEFAULT_CANDLES_DIR, journal_file: str = DEFAULT_JOURNAL_FILE,
+                   simulation_paths: int = SIMULATION_PATHS, loss_limits: Optional[List[float]] = None):
+    """Keep the processor warm and refresh reports as statement files land
+
+    Takes the same options as run_analysis. The ledger stays in memory between
+    refreshes; each burst of file events is debounced, then only the new or
+    changed files are parsed and appended. With a date filter the view is
+    reloaded from the store instead, so new rows outside it stay out.
+    """
+    store = TradeStore(db_path)
+    processor = open_processor(store, timer, candles_dir, simulation_paths, loss_limits)
+    patterns = {broker: BROKER_FILE_PATTERNS[broker] for broker in brokers or BROKER_FILE_PATTERNS}
+    watcher = StatementWatcher(statements_root, patterns, debounce=debounce)
+    store_brokers = [broker.title() for broker in brokers] if brokers else None
+    
+    def refresh():
+        # The journal may have been re-exported since the last refresh
+        processor.journal_entries = read_journal(journal_file)
+        generate_reports(processor, store, outputs, excel_file, json_dir, parquet_dir,
+                         persist_positions=not (brokers or start or end),
+                         include_broker_sheets=include_broker_sheets)
+    
+    # Initial full pass: ingest anything new, then load the ledger once
+    with RunLock():
+        for broker, files in watcher.current_files().items():
+            process_multiple_files(processor, broker, files, store)
+        processor.load_from_store(store, brokers=store_brokers, start=start, end=end)
+        refresh()
     
-    print("\n✨ Analysis complete!")
+    log.info(f"\n👀 Watching {statements_root}/ for new statements (Ctrl+C to stop)...")
+    try:
+        while True:
+            time.sleep(interval)
+            changed_files = watcher.poll()
+            if not changed_files:
+                continue
+            
+            started = time.perf_counter()
+            log.info(f"\n📥 Detected changes: {', '.join(os.path.basename(path) for files in changed_files.values() for path in files)}")
+            with RunLock():
+                new_rows = 0
+                for broker, files in changed_files.items():
+                    data = process_multiple_files(processor, broker, files, store)
+                    if not data.empty:
+                        if not (start or end):
+                            processor.append_broker_data(broker, data)
+                        new_rows += len(data)
+                
+                if new_rows:
+                    if start or end:
+                        processor.load_from_store(store, brokers=store_brokers, start=start, end=end)
+                    refresh()
+                    log.info(f"⚡ Refreshed reports with {new_rows} new transactions in {time.perf_counter() - started:.1f}s")
+                else:
+                    log.info("✅ No new transactions in changed files")
+    except KeyboardInterrupt:
+        log.info("\n👋 Watch mode stopped")
+    finally:
+        store.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Trend Scanner
+Python port of 1h1004h200scanner.pine: where each coin's price sits against
+its 1h SMA(100) and 4h EMA(200), for any number of symbols in the local
+candle store instead of TradingView's 20 request.security slots.
+
+Same conditions as the Pine table: "Above"/"Below" when the current close is
+above / not above the moving average on its timeframe, the averages computed
+over that timeframe's bars with the still-forming bar included (TradingView's
+realtime behaviour). The 1h average is an SMA and the 4h one an EMA, as in the
+script; lengths and timeframes are options there and here.
+
+Each symbol is scanned in a worker process that memory-maps its bars from the
+store, so hundreds of symbols use every core. Averages are computed
+vectorized over the full history the first time. After that the scan only
+folds in bars closed since the previous run, from a small per-symbol state
+(the EMA value, the SMA window) kept in scanner_state.json. A state whose last
+bar no longer matches the store is rebuilt from scratch.
+
+The result is a ranked table: Score is the mean % distance of price from the
+two averages, so the strongest uptrends come first (--bearish flips it).
+
+Usage:
+    python trend_scanner.py [--symbols BTCUSDT ETHUSDT] [--workers 8] [--output scan.csv] [--watch 60]
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from atomic_io import atomic_output_path, atomic_write_text
+from candle_store import DEFAULT_CANDLES_DIR, CandleLibrary, Candles
+from indicators import ema
+from run_log import event, get_logger, run_logging
+
+DEFAULT_STATE_FILE = 'scanner_state.json'
+
+log = get_logger('scanner')
+
+
+@dataclass(frozen=True)
+class ScanSettings:
+    """The Pine script's inputs: SMA on one timeframe, EMA on another"""
+    sma_length: int = 100
+    sma_timeframe: str = '1h'
+    ema_length: int = 200
+    ema_timeframe: str = '4h'
+
+    @property
+    def sma_label(self) -> str:
+        return f"{self.sma_timeframe}{self.sma_length}"
+
+    @property
+    def ema_label(self) -> str:
+        return f"{self.ema_timeframe}{self.ema_length}"
+
+    @property
+    def key(self) -> str:
+        """Identifies the settings a saved state was computed with"""
+        return f"sma{self.sma_label}-ema{self.ema_label}"
+
+
+@dataclass
+class AverageState:
+    """One moving average folded through a symbol's closed bars; JSON-serializable"""
+    kind: str                      # 'sma' or 'ema'
+    length: int
+    last_time: Optional[int] = None  # open time (unix s) of the last closed bar folded in
+    last_close: float = float('nan')
+    value: float = float('nan')    # EMA through last_time
+    count: int = 0                 # closed bars folded in
+    window: List[float] = field(default_factory=list)  # SMA: the last `length` closes
+
+    @classmethod
+    def from_history(cls, kind: str, length: int, times: np.ndarray, closes: np.ndarray) -> 'AverageState':
+        """State after folding in every given (closed) bar, computed vectorized"""
+        state = cls(kind, length)
+        if len(times):
+            state.last_time = int(times[-1])
+            state.last_close = float(closes[-1])
+            state.count = len(times)
+            if kind == 'ema':
+                state.value = float(ema(closes, length)[-1])
+            else:
+                state.window = [float(close) for close in closes[-length:]]
+        return state
+
+    def fold(self, time_: int, close: float):
+        """Fold in one newly closed bar: O(1)"""
+        if self.kind == 'ema':
+            alpha = 2.0 / (self.length + 1)
+            self.value = close if self.count == 0 else alpha * close + (1 - alpha) * self.value
+        else:
+            window = deque(self.window, maxlen=self.length)
+            window.append(close)
+            self.window = list(window)
+        self.last_time, self.last_close = int(time_), float(close)
+        self.count += 1
+
+    def peek(self, close: float) -> float:
+        """The average with a still-forming bar at `close` included, without folding it in"""
+        if self.kind == 'ema':
+            alpha = 2.0 / (self.length + 1)
+            return close if self.count == 0 else alpha * close + (1 - alpha) * self.value
+        window = (self.window + [close])[-self.length:]
+        return float(np.mean(window)) if len(window) == self.length else float('nan')
+
+
+def update_average(state: Optional[AverageState], kind: str, length: int,
+                   candles: Candles) -> Tuple[float, AverageState, bool]:
+    """Current value of an average over `candles` (last bar = forming), reusing `state` when it fits
+
+    Returns (value, state through the last closed bar, rebuilt from scratch?).
+    """
+    times, closes = candles.seconds, candles.close
+    closed = len(times) - 1
+    rebuilt = False
+    start = None
+    if state is not None and state.kind == kind and state.length == length and state.last_time is not None:
+        position = int(np.searchsorted(times, state.last_time))
+        # The bar the state ended on must still be there, closed and unchanged
+        if position < closed and times[position] == state.last_time and closes[position] == state.last_close:
+            start = position + 1
+    if start is None:
+        state = AverageState.from_history(kind, length, times[:closed], closes[:closed])
+        rebuilt = True
+    else:
+        for index in range(start, closed):
+            state.fold(times[index], closes[index])
+    return state.peek(float(closes[-1])), state, rebuilt
+
+
+def scan_symbol(candles_dir: str, symbol: str, settings: ScanSettings,
+                saved: Optional[Dict] = None) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """One symbol's row of the scan table plus its updated state (None when it has no bars)"""
+    library = CandleLibrary(candles_dir)
+    library.sync(symbol)
+    sma_bars = library.store.candles(symbol, settings.sma_timeframe)
+    ema_bars = library.store.candles(symbol, settings.ema_timeframe)
+    if sma_bars is None or ema_bars is None or not len(sma_bars) or not len(ema_bars):
+        return None, None
+
+    saved = saved or {}
+    sma_state = AverageState(**saved['sma']) if 'sma' in saved else None
+    ema_state = AverageState(**saved['ema']) if 'ema' in saved else None
+    sma_value, sma_state, sma_rebuilt = update_average(sma_state, 'sma', settings.sma_length, sma_bars)
+    ema_value, ema_state, ema_rebuilt = update_average(ema_state, 'ema', settings.ema_length, ema_bars)
+
+    sma_price = float(sma_bars.close[-1])
+    ema_price = float(ema_bars.close[-1])
+    sma_distance = (sma_price / sma_value - 1) * 100 if sma_value > 0 else np.nan
+    ema_distance = (ema_price / ema_value - 1) * 100 if ema_value > 0 else np.nan
+    sma_above = bool(sma_price > sma_value)
+    ema_above = bool(ema_price > ema_value)
+
+    row = {
+        'Symbol': symbol,
+        'Price': sma_price,
+        f'{settings.sma_label} Status': 'Above' if sma_above else 'Below',
+        f'{settings.ema_label} Status': 'Above' if ema_above else 'Below',
+        'Trend': 'Bullish' if sma_above and ema_above else 'Bearish' if not (sma_above or ema_above) else 'Mixed',
+        f'{settings.sma_label} Value': sma_value,
+        f'{settings.ema_label} Value': ema_value,
+        f'vs {settings.sma_label} %': sma_distance,
+        f'vs {settings.ema_label} %': ema_distance,
+        'Score': np.nanmean([sma_distance, ema_distance]) if not np.isnan([sma_distance, ema_distance]).all() else np.nan,
+        'Last Bar': pd.Timestamp(sma_bars.time[-1]),
+        'Rebuilt': sma_rebuilt or ema_rebuilt,
+    }
+    return row, {'sma': asdict(sma_state), 'ema': asdict(ema_state)}
+
+
+def _scan_task(task):
+    return scan_symbol(*task)
+
+
+def load_state(path: Optional[str], settings: ScanSettings) -> Dict[str, Dict]:
+    """Saved per-symbol states, if they were computed with these settings"""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError) as e:
+        log.warning(f"⚠️ Ignoring unreadable scanner state {path}: {e}")
+        return {}
+    return saved.get('symbols', {}) if saved.get('settings') == settings.key else {}
+
+
+def save_state(path: str, settings: ScanSettings, states: Dict[str, Dict]):
+    atomic_write_text(path, json.dumps({'settings': settings.key, 'symbols': states}))
+
+
+def rank_scan(rows: Sequence[Dict], bearish: bool = False) -> pd.DataFrame:
+    """Scan rows ranked by Score (strongest uptrend first, or downtrend with bearish=True)"""
+    table = pd.DataFrame(list(rows))
+    if table.empty:
+        return table
+    table = table.sort_values(['Score', 'Symbol'], ascending=[bearish, True], na_position='last', kind='stable')
+    table.insert(0, 'Rank', np.arange(1, len(table) + 1))
+    return table.reset_index(drop=True)
+
+
+def run_scan(candles_dir: str = DEFAULT_CANDLES_DIR, symbols: Optional[Sequence[str]] = None,
+             settings: ScanSettings = ScanSettings(), workers: Optional[int] = None,
+             states: Optional[Dict[str, Dict]] = None, bearish: bool = False) -> Tuple[pd.DataFrame, Dict[str, Dict]]:
+    """Scan symbols (default: every CSV / stored symbol) across a process pool
+
+    Returns the ranked table and the updated states to pass to the next scan.
+    """
+    library = CandleLibrary(candles_dir)
+    if symbols:
+        symbols = [library.resolve(symbol) or symbol.upper() for symbol in symbols]
+    else:
+        symbols = sorted(set(library.files()) | set(library.store.symbols()))
+    states = states or {}
+    tasks = [(candles_dir, symbol, settings, states.get(symbol)) for symbol in symbols]
+
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    if workers <= 1 or len(tasks) <= 1:
+        results = [_scan_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_scan_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+    rows, new_states = [], {}
+    for symbol, (row, state) in zip(symbols, results):
+        if row is None:
+            log.warning(f"⚠️ No candles for {symbol} - skipped")
+            continue
+        rows.append(row)
+        new_states[symbol] = state
+    return rank_scan(rows, bearish), new_states
+
+
+def write_scan(table: pd.DataFrame, path: str):
+    """Save the ranked table as .csv or .json (by extension)"""
+    with atomic_output_path(path) as temp_file:
+        if path.lower().endswith('.json'):
+            table.to_json(temp_file, orient='records', date_format='iso', indent=1)
+        else:
+            table.to_csv(temp_file, index=False)
+
+
+def print_scan(table: pd.DataFrame, settings: ScanSettings, limit: int):
+    columns = ['Rank', 'Symbol', 'Price', f'{settings.sma_label} Status', f'{settings.ema_label} Status',
+               'Trend', f'vs {settings.sma_label} %', f'vs {settings.ema_label} %']
+    shown = table[columns].head(limit) if limit else table[columns]
+    log.info(shown.to_string(index=False, float_format=lambda value: f"{value:,.4g}"))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rank symbols by price vs the 1h SMA100 and 4h EMA200 (1h1004h200scanner.pine)")
+    parser.add_argument('--candles', default=DEFAULT_CANDLES_DIR, help="Candle folder (default %(default)s)")
+    parser.add_argument('--symbols', nargs='+', help="Symbols to scan (default: all)")
+    parser.add_argument('--sma-length', type=int, default=100)
+    parser.add_argument('--sma-timeframe', default='1h')
+    parser.add_argument('--ema-length', type=int, default=200)
+    parser.add_argument('--ema-timeframe', default='4h')
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument('--bearish', action='store_true', help="Rank the weakest symbols first")
+    parser.add_argument('--top', type=int, default=25, help="Rows to print (0 = all, default %(default)s)")
+    parser.add_argument('--output', help="Also write the full table to this .csv or .json file")
+    parser.add_argument('--state', default=DEFAULT_STATE_FILE,
+                        help="Incremental state file (default %(default)s); '' to always recompute")
+    parser.add_argument('--watch', type=float, metavar='SECONDS', help="Rescan every SECONDS until interrupted")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('-q', '--quiet', action='store_const', const='quiet', dest='log_level', default='normal')
+    verbosity.add_argument('-v', '--verbose', action='store_const', const='verbose', dest='log_level')
+    args = parser.parse_args(argv)
+
+    settings = ScanSettings(args.sma_length, args.sma_timeframe, args.ema_length, args.ema_timeframe)
+    with run_logging(args.log_level):
+        states = load_state(args.state, settings)
+        while True:
+            started = time.perf_counter()
+            table, states = run_scan(args.candles, args.symbols, settings, args.workers, states, args.bearish)
+            if args.state:
+                save_state(args.state, settings, states)
+            if table.empty:
+                log.error(f"❌ No symbols with candles in {args.candles}")
+                return 1
+
+            rebuilt = int(table['Rebuilt'].sum())
+            log.info(f"\n🔎 Scanned {len(table)} symbols in {time.perf_counter() - started:.2f}s "
+                     f"({rebuilt} computed from full history, {len(table) - rebuilt} updated incrementally)",
+                     extra=event('scan', symbols=len(table), rebuilt=rebuilt, seconds=time.perf_counter() - started))
+            print_scan(table, settings, args.top)
+            if args.output:
+                write_scan(table, args.output)
+                log.info(f"📁 Scan written to: {args.output}")
+            if not args.watch:
+                return 0
+            try:
+                time.sleep(args.watch)
+            except KeyboardInterrupt:
+                return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())